@@ -1,6 +1,11 @@
-#!/bin/bash 
+#!/bin/bash
 #jupyter
 jupyter notebook --ip=0.0.0.0 --port=8888 --allow-root \
   --NotebookApp.token='' --NotebookApp.password='' &
 
-uvicorn src.api.main:app --host 0.0.0.0 --port=8000 --reload
+if [ "$SERVE_MODE" = "production" ]; then
+  # Pre-forked workers sharing the models loaded once (WEB_WORKERS, default: one per core)
+  python src/api/serve.py --host 0.0.0.0 --port 8000
+else
+  uvicorn src.api.main:app --host 0.0.0.0 --port=8000 --reload
+fi
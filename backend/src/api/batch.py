@@ -0,0 +1,316 @@
+import asyncio
+import codecs
+import csv
+import json
+import os
+import tempfile
+import time
+from datetime import datetime
+from typing import AsyncIterator, Callable, Dict, List, Optional
+
+# Marks the end of a result stream
+_DONE = object()
+
+
+class TokenBucket:
+    """
+    Asyncio rate limiter: `rate` tokens per second, bursts up to `capacity`.
+
+    acquire() waits until enough tokens have accumulated. A rate of 0 (or
+    None) disables limiting.
+    """
+
+    def __init__(self, rate: Optional[float], capacity: Optional[float] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.rate = rate or 0
+        self.capacity = capacity or max(1.0, self.rate)
+        self.clock = clock
+        self.tokens = self.capacity
+        self.updated = clock()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, tokens: float = 1):
+        if self.rate <= 0:
+            return
+        # Waiters are served in arrival order
+        async with self._lock:
+            while True:
+                now = self.clock()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                await asyncio.sleep((tokens - self.tokens) / self.rate)
+
+
+async def spool(chunks: AsyncIterator[bytes], max_memory: int = 1 << 20) -> tempfile.SpooledTemporaryFile:
+    """
+    Copy a request body into a file that moves to disk past `max_memory` bytes.
+
+    The body has to be read before a streaming response starts: while it
+    streams, the server's disconnect listener consumes incoming messages.
+    """
+    body = tempfile.SpooledTemporaryFile(max_size=max_memory)
+    async for chunk in chunks:
+        body.write(chunk)
+    body.seek(0)
+    return body
+
+
+async def file_chunks(body, size: int = 1 << 16) -> AsyncIterator[bytes]:
+    """Read a file in chunks of `size` bytes"""
+    while True:
+        chunk = body.read(size)
+        if not chunk:
+            break
+        yield chunk
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Split a stream of byte chunks into decoded, non-empty lines"""
+    buffer = b''
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b'\n')
+        for line in lines:
+            line = line.strip()
+            if line:
+                yield line.decode('utf-8-sig')
+    if buffer.strip():
+        yield buffer.strip().decode('utf-8-sig')
+
+
+def _location(latitude, longitude) -> Dict[str, float]:
+    return {"latitude": float(latitude), "longitude": float(longitude)}
+
+
+async def parse_ndjson(lines: AsyncIterator[str]) -> AsyncIterator[Dict[str, float]]:
+    """Locations from NDJSON lines of {"latitude": .., "longitude": ..}"""
+    async for line in lines:
+        item = json.loads(line)
+        yield _location(item["latitude"], item["longitude"])
+
+
+async def parse_csv(lines: AsyncIterator[str]) -> AsyncIterator[Dict[str, float]]:
+    """Locations from CSV lines with a latitude/longitude (or lat/lon) header"""
+    columns = None
+    async for line in lines:
+        row = next(csv.reader([line]))
+        if columns is None:
+            header = [name.strip().lower() for name in row]
+            lat_name = 'latitude' if 'latitude' in header else 'lat'
+            lon_name = 'longitude' if 'longitude' in header else 'lon'
+            columns = header.index(lat_name), header.index(lon_name)
+            continue
+        yield _location(row[columns[0]], row[columns[1]])
+
+
+async def parse_json_array(chunks: AsyncIterator[bytes], max_item: int = 1 << 20) -> AsyncIterator[Dict[str, float]]:
+    """
+    Locations from a JSON array of {"latitude": .., "longitude": ..}, decoded
+    one element at a time, so the array is never held in memory. Elements
+    longer than `max_item` characters are rejected.
+    """
+    decoder = json.JSONDecoder()
+    text = codecs.getincrementaldecoder('utf-8-sig')()
+    buffer, state = '', 'start'
+
+    def drain(final: bool) -> List:
+        """Decode the complete elements at the start of the buffer"""
+        nonlocal buffer, state
+        items, pos = [], 0
+        while True:
+            while pos < len(buffer) and buffer[pos] in ' \t\r\n':
+                pos += 1
+            if pos == len(buffer):
+                break
+            char = buffer[pos]
+            if state == 'start':
+                if char != '[':
+                    raise ValueError("Expected a JSON array")
+                state, pos = 'first', pos + 1
+            elif state == 'first' and char == ']':
+                state, pos = 'done', pos + 1
+            elif state in ('first', 'next'):
+                try:
+                    item, end = decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError:
+                    if final or len(buffer) - pos > max_item:
+                        raise
+                    break
+                # A number at the end of the buffer may go on in the next chunk
+                if end == len(buffer) and not final:
+                    break
+                items.append(item)
+                state, pos = 'separator', end
+            elif state == 'separator':
+                if char not in ',]':
+                    raise ValueError(f"Expected ',' or ']' in the JSON array, got {char!r}")
+                state, pos = 'next' if char == ',' else 'done', pos + 1
+            else:
+                raise ValueError("Unexpected data after the JSON array")
+        buffer = buffer[pos:]
+        return items
+
+    async for chunk in chunks:
+        buffer += text.decode(chunk)
+        for item in drain(False):
+            yield _location(item["latitude"], item["longitude"])
+    buffer += text.decode(b'', final=True)
+    for item in drain(True):
+        yield _location(item["latitude"], item["longitude"])
+    if state != 'done':
+        raise ValueError("Incomplete JSON array")
+
+
+class BatchPredictionEngine:
+    """
+    Predictions for many locations.
+
+    Data for the locations is collected concurrently, at most
+    `max_concurrency` at a time and at most `rate` locations per second
+    (token bucket with bursts of `burst`). run() predicts all collected
+    records together with a single vectorized call; stream() yields each
+    result as soon as it is ready. Every result of one call is predicted by
+    the same model version, even if a retrain publishes a new one meanwhile.
+    """
+
+    def __init__(self, weather_client, predictor, max_concurrency: int = None,
+                 rate: float = None, burst: float = None, max_in_flight: int = None):
+        """
+        Args:
+            weather_client: AsyncWeatherAPIClient used to collect the data
+            predictor: AirPollutionPredictor with trained models
+            max_concurrency: Locations collected at once (BATCH_MAX_CONCURRENCY, default 16)
+            rate: Locations started per second (BATCH_RATE_PER_SECOND, default 10; 0 disables)
+            burst: Token bucket capacity (BATCH_BURST, default `rate`)
+            max_in_flight: Locations of a stream that are read but whose
+                result has not been sent yet (default 4 * max_concurrency)
+        """
+        self.weather_client = weather_client
+        self.predictor = predictor
+        self.max_concurrency = max_concurrency or int(os.getenv('BATCH_MAX_CONCURRENCY', '16'))
+        rate = float(os.getenv('BATCH_RATE_PER_SECOND', '10')) if rate is None else rate
+        burst = burst or float(os.getenv('BATCH_BURST', '0')) or None
+        self.limiter = TokenBucket(rate, burst)
+        self.max_in_flight = max_in_flight or 4 * self.max_concurrency
+        self._semaphore = None
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    async def collect(self, location: Dict[str, float]) -> Optional[Dict]:
+        """Collect the data of one location under the concurrency and rate limits"""
+        async with self.semaphore:
+            await self.limiter.acquire()
+            return await self.weather_client.collect_comprehensive_data(
+                location["latitude"], location["longitude"]
+            )
+
+    async def collect_many(self, locations: List[Dict[str, float]]) -> List:
+        """Collect all locations; failed ones give their exception, in input order"""
+        return await asyncio.gather(
+            *(self.collect(location) for location in locations), return_exceptions=True
+        )
+
+    async def run(self, locations: List[Dict[str, float]]) -> List[Dict]:
+        """
+        Collect and predict all locations.
+
+        Returns one result per location whose data could be collected, in
+        input order; locations that failed carry an "error" instead.
+        """
+        collected = await self.collect_many(locations)
+
+        records = [item for item in collected if item and not isinstance(item, BaseException)]
+        version = self.predictor.active_version
+        predictions = iter(version.predict_batch(records) if version else [{} for _ in records])
+
+        results = []
+        for location, item in zip(locations, collected):
+            if isinstance(item, BaseException):
+                results.append({
+                    "location": location,
+                    "error": str(item),
+                    "timestamp": datetime.now().isoformat()
+                })
+            elif item:
+                results.append({
+                    "location": location,
+                    "predictions": next(predictions),
+                    "model_version": version.version_id if version else None,
+                    "timestamp": datetime.now().isoformat()
+                })
+        return results
+
+    async def predict_location(self, index: int, location: Dict[str, float], version=None) -> Dict:
+        """Collect and predict one location of a stream with `version` (default: the active one)"""
+        result = {"index": index, "location": location}
+        try:
+            item = await self.collect(location)
+            version = version or self.predictor.active_version
+            if item and version:
+                result["predictions"] = version.predict(item)
+                result["model_version"] = version.version_id
+            elif item:
+                result["error"] = "No trained models available"
+            else:
+                result["error"] = "Failed to collect weather data"
+        except Exception as e:
+            result["error"] = str(e)
+        result["timestamp"] = datetime.now().isoformat()
+        return result
+
+    async def stream(self, locations: AsyncIterator[Dict[str, float]]) -> AsyncIterator[Dict]:
+        """
+        Yield one result per location, in completion order.
+
+        Locations are read from `locations` only while fewer than
+        `max_in_flight` results are pending, so memory does not depend on
+        the size of the input. Results carry the input "index". Invalid
+        input ends the stream with an "error" line.
+        """
+        window = asyncio.Semaphore(self.max_in_flight)
+        results = asyncio.Queue()
+        tasks = set()
+        version = self.predictor.active_version
+
+        async def process(index: int, location: Dict[str, float]):
+            results.put_nowait(await self.predict_location(index, location, version))
+
+        async def feed():
+            index = 0
+            try:
+                async for location in locations:
+                    await window.acquire()
+                    task = asyncio.ensure_future(process(index, location))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+                    index += 1
+                while tasks:
+                    await asyncio.wait(set(tasks))
+            except Exception as e:
+                while tasks:
+                    await asyncio.wait(set(tasks))
+                results.put_nowait({"index": index, "error": f"Invalid input: {e}"})
+            finally:
+                results.put_nowait(_DONE)
+
+        feeder = asyncio.ensure_future(feed())
+        try:
+            while True:
+                result = await results.get()
+                if result is _DONE:
+                    break
+                if "location" in result:
+                    window.release()
+                yield result
+        finally:
+            # The client went away or the stream is done
+            feeder.cancel()
+            for task in list(tasks):
+                task.cancel()
@@ -0,0 +1,126 @@
+import asyncio
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+# Add the src directory to the path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from data_collection.circuit_breaker import CircuitBreaker
+
+# Keys describing where and when data was sampled, not sampled values
+METADATA_KEYS = ('location', 'collected_at')
+
+
+def has_values(data) -> bool:
+    """Whether satellite data (one point's dict, or a list of them) holds a sampled value"""
+    if data is None:
+        return False
+    if isinstance(data, list):
+        return any(has_values(item) for item in data)
+    if isinstance(data, dict):
+        return any(has_values(value) for key, value in data.items() if key not in METADATA_KEYS)
+    return True
+
+
+class SatelliteEnrichment:
+    """
+    Satellite data for a prediction, within the request's latency budget.
+
+    start() begins collecting in a small thread pool, so it runs while the
+    weather data is collected. result() waits for it until `budget` seconds
+    after the request started and otherwise drops it; a dropped call keeps
+    running and fills the satellite cache for later requests. Only calls
+    that fail count toward the circuit breaker (a dropped call counts when
+    it finishes), so slow but working enrichment stays on; repeated failures
+    open it, and enrichment is not attempted until it lets a trial request
+    through. While `max_workers` calls are still running, new ones are
+    skipped.
+    """
+
+    def __init__(self, earth_client, budget: float = None, breaker: CircuitBreaker = None,
+                 max_workers: int = 4):
+        """
+        Args:
+            earth_client: GoogleEarthClient the data is collected with
+            budget: Seconds from the start of a request until satellite data
+                is dropped (PREDICT_LATENCY_BUDGET, default 1.0)
+            breaker: Circuit breaker (default: open after 3 consecutive
+                failed calls, retry after a minute)
+            max_workers: Satellite calls in progress at once; more are skipped
+        """
+        self.earth_client = earth_client
+        self.budget = float(os.getenv('PREDICT_LATENCY_BUDGET', '1.0')) if budget is None else budget
+        self.breaker = breaker or CircuitBreaker(failure_threshold=3, reset_timeout=60)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='satellite')
+        self.max_workers = max_workers
+        self.in_flight = 0
+        self.dropped = 0
+        self.skipped_busy = 0
+
+    def _submit(self, fn, *args) -> Optional[asyncio.Future]:
+        if self.in_flight >= self.max_workers:
+            self.skipped_busy += 1
+            return None
+        if not self.breaker.allow():
+            return None
+        self.in_flight += 1
+        pending = asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+        pending.add_done_callback(self._finished)
+        return pending
+
+    def _finished(self, future: asyncio.Future):
+        self.in_flight -= 1
+
+    def _record_late(self, future: asyncio.Future):
+        """Breaker outcome of a call that finished after its request dropped it"""
+        if future.cancelled():
+            return
+        if future.exception() is not None:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+
+    def start(self, lat: float, lon: float) -> Optional[asyncio.Future]:
+        """Start collecting, or None while the breaker is open or all workers are busy"""
+        return self._submit(self.earth_client.get_comprehensive_satellite_data, lat, lon)
+
+    def start_batch(self, points: List[Tuple[float, float]]) -> Optional[asyncio.Future]:
+        """start() for many points, sampled together; the result is a list per point"""
+        return self._submit(self.earth_client.get_comprehensive_satellite_batch, points)
+
+    async def result(self, pending: Optional[asyncio.Future], started: float) -> Tuple[Optional[Dict], str]:
+        """
+        The collected data (or None) and what happened: 'used', 'no_data',
+        'failed', 'over_budget', 'circuit_open' or 'busy'.
+
+        Args:
+            pending: Future returned by start()
+            started: time.perf_counter() at the start of the request
+        """
+        if pending is None:
+            return None, 'circuit_open' if self.breaker.state != 'closed' else 'busy'
+        remaining = max(0.0, started + self.budget - time.perf_counter())
+        try:
+            data = await asyncio.wait_for(asyncio.shield(pending), timeout=remaining)
+        except asyncio.TimeoutError:
+            # Left to finish in the background (filling the cache); whether
+            # it failed is only known then
+            pending.add_done_callback(self._record_late)
+            self.dropped += 1
+            return None, 'over_budget'
+        except Exception as e:
+            print(f"Satellite data collection failed: {e}")
+            self.breaker.record_failure()
+            return None, 'failed'
+        self.breaker.record_success()
+        return data, 'used' if has_values(data) else 'no_data'
+
+    def stats(self) -> Dict[str, int]:
+        return dict(self.breaker.stats(), dropped=self.dropped, in_flight=self.in_flight,
+                    skipped_busy=self.skipped_busy)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,240 @@
+import asyncio
+import io
+import math
+import os
+import time
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+
+# Categorical features, taken from the nearest anchor
+CATEGORICAL_COLUMNS = ['weather_condition_encoded']
+
+
+def _cell_count(extent: float, resolution: float) -> float:
+    """Cells along an axis, as a float (inf when the resolution is too fine to count)"""
+    cells = round(extent / resolution, 9)
+    if not math.isfinite(cells):
+        return math.inf
+    return float(max(1, math.ceil(cells)))
+
+
+class GridSpec:
+    """
+    Cells of a bounding box at a resolution in degrees.
+
+    Rows run from the northern to the southern edge and columns from west to
+    east (raster order); latitudes and longitudes are the cell centres.
+    Grids of more than `max_cells` cells are rejected before anything is
+    allocated for them.
+    """
+
+    def __init__(self, min_lat: float, min_lon: float, max_lat: float, max_lon: float,
+                 resolution: float, max_cells: Optional[int] = None):
+        if not (min_lat < max_lat and min_lon < max_lon):
+            raise ValueError("Bounding box must have min_latitude < max_latitude and min_longitude < max_longitude")
+        if not resolution > 0:
+            raise ValueError("Resolution must be positive")
+        rows = _cell_count(max_lat - min_lat, resolution)
+        cols = _cell_count(max_lon - min_lon, resolution)
+        if max_cells is not None and rows * cols > max_cells:
+            raise ValueError(f"Grid of {rows:.0f}x{cols:.0f} cells exceeds the limit of {max_cells}")
+        self.bounds = (min_lat, min_lon, max_lat, max_lon)
+        self.resolution = resolution
+        self.rows = int(rows)
+        self.cols = int(cols)
+        self.lats = max_lat - (np.arange(self.rows) + 0.5) * resolution
+        self.lons = min_lon + (np.arange(self.cols) + 0.5) * resolution
+
+    @property
+    def shape(self):
+        return self.rows, self.cols
+
+    def anchors(self, per_axis: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Anchor latitudes and longitudes: up to `per_axis` evenly spaced cell centres per axis"""
+        lats = np.linspace(self.lats[0], self.lats[-1], min(per_axis, self.rows))
+        lons = np.linspace(self.lons[0], self.lons[-1], min(per_axis, self.cols))
+        return lats, lons
+
+
+def _axis_weights(anchors: np.ndarray, points: np.ndarray):
+    """Neighbouring anchor indices and the weight of the second, for linear interpolation"""
+    if len(anchors) == 1:
+        zeros = np.zeros(len(points), dtype=int)
+        return zeros, zeros, np.zeros(len(points))
+    # Work in increasing order; latitudes run north to south
+    sign = 1 if anchors[-1] > anchors[0] else -1
+    a, p = anchors * sign, points * sign
+    upper = np.clip(np.searchsorted(a, p, side='right'), 1, len(a) - 1)
+    lower = upper - 1
+    weight = np.clip((p - a[lower]) / (a[upper] - a[lower]), 0, 1)
+    return lower, upper, weight
+
+
+def bilinear(values: np.ndarray, anchor_lats: np.ndarray, anchor_lons: np.ndarray,
+             lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    """
+    Interpolate (n_anchor_lats, n_anchor_lons, n_features) anchor values
+    onto the (len(lats), len(lons)) grid.
+    """
+    y0, y1, ty = _axis_weights(anchor_lats, lats)
+    x0, x1, tx = _axis_weights(anchor_lons, lons)
+    ty = ty[:, None, None]
+    tx = tx[None, :, None]
+    top = values[y0][:, x0] * (1 - tx) + values[y0][:, x1] * tx
+    bottom = values[y1][:, x0] * (1 - tx) + values[y1][:, x1] * tx
+    return top * (1 - ty) + bottom * ty
+
+
+def nearest(values: np.ndarray, anchor_lats: np.ndarray, anchor_lons: np.ndarray,
+            lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    """Value of the nearest anchor for every cell of the grid"""
+    y = np.abs(lats[:, None] - anchor_lats[None, :]).argmin(axis=1)
+    x = np.abs(lons[:, None] - anchor_lons[None, :]).argmin(axis=1)
+    return values[y][:, x]
+
+
+class GridResult:
+    """Predictions of a grid as a (targets, rows, cols) float32 array"""
+
+    def __init__(self, spec: GridSpec, targets: List[str], values: np.ndarray, model_version: str,
+                 anchors: int, anchors_collected: int, data_sources: List[str],
+                 timings: Dict[str, float]):
+        self.spec = spec
+        self.targets = targets
+        self.values = values
+        self.model_version = model_version
+        self.anchors = anchors
+        self.anchors_collected = anchors_collected
+        self.data_sources = data_sources
+        self.timings = timings
+
+    def to_bytes(self, fmt: str = 'npy') -> bytes:
+        """`npy`: NumPy .npy file; `raw`: little-endian float32 values in C order"""
+        if fmt == 'raw':
+            return self.values.astype('<f4', copy=False).tobytes()
+        buffer = io.BytesIO()
+        np.save(buffer, self.values, allow_pickle=False)
+        return buffer.getvalue()
+
+    def headers(self) -> Dict[str, str]:
+        return {
+            "X-Grid-Targets": ",".join(self.targets),
+            "X-Grid-Shape": ",".join(str(n) for n in self.values.shape),
+            "X-Grid-Bounds": ",".join(str(v) for v in self.spec.bounds),
+            "X-Grid-Resolution": str(self.spec.resolution),
+            "X-Grid-Anchors": f"{self.anchors_collected}/{self.anchors}",
+            "X-Model-Version": self.model_version,
+            "X-Data-Sources": ",".join(self.data_sources),
+            "X-Timings-Ms": ",".join(f"{k}={v:.1f}" for k, v in self.timings.items()),
+        }
+
+
+class GridPredictionEngine:
+    """
+    Pollution maps of a bounding box.
+
+    Upstream data is collected only at a coarse set of anchor cells (through
+    the batch engine's concurrency and rate limits, with satellite data
+    sampled for all anchors at once within the latency budget). The anchor
+    features are interpolated bilinearly onto every cell, the location
+    features are set to the cell's own coordinates, and all cells are
+    predicted with one vectorized call per model.
+    """
+
+    def __init__(self, batch_engine, satellite_enrichment, predictor, max_cells: int = None,
+                 max_anchors: int = None):
+        """
+        Args:
+            batch_engine: BatchPredictionEngine used to collect the anchors
+            satellite_enrichment: SatelliteEnrichment for the anchors' satellite data
+            predictor: AirPollutionPredictor with trained models
+            max_cells: Largest grid accepted (GRID_MAX_CELLS, default 250000)
+            max_anchors: Most anchors per axis accepted (GRID_MAX_ANCHORS,
+                default 16); each anchor is one upstream weather collection
+        """
+        self.batch_engine = batch_engine
+        self.satellite_enrichment = satellite_enrichment
+        self.predictor = predictor
+        self.max_cells = max_cells or int(os.getenv('GRID_MAX_CELLS', '250000'))
+        self.max_anchors = max_anchors or int(os.getenv('GRID_MAX_ANCHORS', '16'))
+
+    def check(self, spec: GridSpec, anchors_per_axis: int = 4):
+        if spec.rows * spec.cols > self.max_cells:
+            raise ValueError(f"Grid of {spec.rows}x{spec.cols} cells exceeds the limit of {self.max_cells}")
+        if not 1 <= anchors_per_axis <= self.max_anchors:
+            raise ValueError(f"anchors must be between 1 and {self.max_anchors}")
+
+    async def predict(self, spec: GridSpec, anchors_per_axis: int = 4) -> Optional[GridResult]:
+        """Predict every cell of the grid, or None if no anchor could be collected"""
+        self.check(spec, anchors_per_axis)
+        started = time.perf_counter()
+        timings = {}
+        anchor_lats, anchor_lons = spec.anchors(anchors_per_axis)
+        points = [(float(lat), float(lon)) for lat in anchor_lats for lon in anchor_lons]
+
+        satellite = self.satellite_enrichment.start_batch(points)
+        collected = await self.batch_engine.collect_many(
+            [{"latitude": lat, "longitude": lon} for lat, lon in points]
+        )
+        timings["weather_api"] = (time.perf_counter() - started) * 1000
+
+        records = [item if item and not isinstance(item, BaseException) else None for item in collected]
+        valid = [i for i, item in enumerate(records) if item]
+
+        data_sources = ["weather_api"]
+        satellite_data, satellite_status = await self.satellite_enrichment.result(satellite, started)
+        if satellite is not None:
+            timings["satellite_data"] = (time.perf_counter() - started) * 1000
+        if not valid:
+            return None
+        if satellite_status == "used":
+            for item, sample in zip(records, satellite_data):
+                if item and sample:
+                    item.update(sample)
+            data_sources.append("satellite_data")
+
+        # Interpolating and predicting many cells is CPU work; keep it off the event loop
+        version = self.predictor.active_version
+        loop = asyncio.get_running_loop()
+        values = await loop.run_in_executor(
+            None, self.predict_cells, version, spec, anchor_lats, anchor_lons, records, timings
+        )
+        timings["total"] = (time.perf_counter() - started) * 1000
+
+        return GridResult(spec, version.inference.targets, values, version.version_id,
+                          len(points), len(valid), data_sources, timings)
+
+    def predict_cells(self, version, spec: GridSpec, anchor_lats: np.ndarray, anchor_lons: np.ndarray,
+                      records: List[Optional[Dict]], timings: Dict[str, float]) -> np.ndarray:
+        """
+        (targets, rows, cols) predictions from the records collected at the
+        anchors, row-major over (anchor_lats, anchor_lons); None for the
+        anchors that could not be collected.
+        """
+        started = time.perf_counter()
+        inference = version.inference
+        valid = [i for i, item in enumerate(records) if item]
+        X = inference.fill_matrix([records[i] for i in valid])
+
+        # Anchors that could not be collected take the mean of the others
+        anchor_values = np.repeat(X.mean(axis=0, keepdims=True), len(records), axis=0)
+        anchor_values[valid] = X
+        anchor_values = anchor_values.reshape(len(anchor_lats), len(anchor_lons), -1)
+
+        grid = bilinear(anchor_values, anchor_lats, anchor_lons, spec.lats, spec.lons)
+        columns = {name: i for i, name in enumerate(inference.feature_columns)}
+        for name in CATEGORICAL_COLUMNS:
+            if name in columns:
+                i = columns[name]
+                grid[:, :, i] = nearest(anchor_values[:, :, i], anchor_lats, anchor_lons, spec.lats, spec.lons)
+        if 'latitude' in columns:
+            grid[:, :, columns['latitude']] = spec.lats[:, None]
+        if 'longitude' in columns:
+            grid[:, :, columns['longitude']] = spec.lons[None, :]
+        timings["interpolation"] = (time.perf_counter() - started) * 1000
+
+        started = time.perf_counter()
+        predictions = inference.predict_matrix(grid.reshape(spec.rows * spec.cols, -1))
+        values = np.stack([predictions[t].reshape(spec.shape) for t in inference.targets]).astype(np.float32)
+        timings["prediction"] = (time.perf_counter() - started) * 1000
+        return values
@@ -0,0 +1,311 @@
+import itertools
+import json
+import multiprocessing
+import os
+import queue
+import sys
+import tempfile
+import threading
+import time
+import traceback
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+# Add the src directory to the path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from ml_models.observation import Observation, as_observations
+
+# Progress messages of the jobs running in this worker go here
+_progress_queue = None
+
+
+def _init_worker(progress_queue):
+    global _progress_queue
+    _progress_queue = progress_queue
+
+
+def _report(job_id: str, stage: str, fraction: float):
+    if _progress_queue is not None:
+        _progress_queue.put((job_id, stage, fraction, time.time()))
+
+
+def run_training_job(job_id: str, predictor_config: Dict, records: List[Observation],
+                     store_path: Optional[str], mode: str = 'full', base_version: Optional[str] = None,
+                     window_days: float = 7) -> Dict:
+    """
+    Train and save a predictor in a worker.
+
+    'full' trains a fresh predictor on `records` followed by everything in
+    the observation store at `store_path` (read in chunks). 'incremental'
+    loads `base_version` and updates it with `records` and the observations
+    stored after it was trained; gradient boosting models are refitted on
+    the last `window_days` of observations. It falls back to a full
+    training when the version cannot be loaded or does not record what it
+    was trained on. Returns the metrics with the timestamp the model
+    version was saved under, which the serving process then loads.
+    """
+    from ml_models.model_proto import AirPollutionPredictor
+    from data_collection.observation_store import ObservationStore
+
+    _report(job_id, 'started', 0.0)
+    predictor = AirPollutionPredictor(**predictor_config)
+    predictor.progress_callback = lambda stage, fraction: _report(job_id, stage, fraction)
+    store = ObservationStore(store_path, memory_limit=0) if store_path else None
+
+    chunks = [records] if records else []
+    if mode == 'incremental' and base_version and predictor.load_models(base_version):
+        trained_through = predictor.active_version.trained_through
+        if trained_through:
+            window_start = (datetime.fromisoformat(trained_through) - timedelta(days=window_days)).isoformat()
+            if store is not None:
+                chunks = itertools.chain(chunks, store.iter_chunks(after=trained_through))
+            history = store.iter_chunks(after=window_start, until=trained_through) if store is not None else []
+            results = predictor.train_incremental(chunks, history)
+            return {'results': results, 'model_version': predictor.version_id, 'mode': 'incremental'}
+        print(f"Version {base_version} does not record its training data, training from scratch")
+        predictor = AirPollutionPredictor(**predictor_config)
+        predictor.progress_callback = lambda stage, fraction: _report(job_id, stage, fraction)
+
+    if store is not None:
+        chunks = itertools.chain(chunks, store.iter_chunks())
+    results = predictor.train_models_chunked(chunks)
+    return {'results': results, 'model_version': predictor.version_id, 'mode': 'full'}
+
+
+class TrainingJob:
+    """State of one training job as reported by the status endpoint"""
+
+    def __init__(self, job_id: str, kind: str, mode: str = 'full'):
+        self.job_id = job_id
+        self.kind = kind
+        self.mode = mode  # full | incremental (as requested; set to the mode used when done)
+        self.status = 'pending'  # pending | collecting | queued | running | completed | failed
+        self.stage = None
+        self.progress = 0.0
+        self.data_points = 0
+        self.results = None
+        self.model_version = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+    @property
+    def duration(self) -> Optional[float]:
+        if self.started_at is None:
+            return None
+        return (self.finished_at or time.time()) - self.started_at
+
+    def to_dict(self) -> Dict:
+        def iso(ts):
+            return datetime.fromtimestamp(ts).isoformat() if ts else None
+        return {
+            'job_id': self.job_id,
+            'kind': self.kind,
+            'mode': self.mode,
+            'status': self.status,
+            'stage': self.stage,
+            'progress': round(self.progress, 3),
+            'data_points': self.data_points,
+            'results': self.results,
+            'model_version': self.model_version,
+            'error': self.error,
+            'created_at': iso(self.created_at),
+            'started_at': iso(self.started_at),
+            'finished_at': iso(self.finished_at),
+            'duration_seconds': self.duration,
+        }
+
+
+class TrainingJobManager:
+    """
+    Runs training jobs outside the serving process.
+
+    Jobs are fitted one at a time (by default) on a process pool, so the
+    CPU-bound fit never holds the event loop or the GIL of the API process.
+    Workers report progress over a queue that a thread drains into the job
+    records. `executor='thread'` runs the jobs on a thread instead, as an
+    in-process stand-in where worker processes are not wanted.
+
+    `on_complete(job)` is called on a manager thread after a job succeeds,
+    e.g. to load the new models into the serving predictor.
+
+    With `state_path`, every job state change is also written to a JSON file
+    there, so API workers in other processes can report jobs they did not
+    start.
+    """
+
+    def __init__(self, predictor_config: Dict, max_workers: int = 1, executor: str = None,
+                 on_complete: Optional[Callable[[TrainingJob], None]] = None, max_jobs: int = 100,
+                 state_path: Optional[str] = None, window_days: float = None):
+        self.predictor_config = predictor_config
+        # History that incremental jobs refit gradient boosting models on
+        self.window_days = window_days or float(os.getenv('INCREMENTAL_WINDOW_DAYS', '7'))
+        self.max_workers = max_workers
+        self.executor_kind = executor or os.getenv('TRAIN_EXECUTOR', 'process')
+        if self.executor_kind not in ('process', 'thread'):
+            raise ValueError(f"Unknown training executor: {self.executor_kind}")
+        self.on_complete = on_complete
+        self.max_jobs = max_jobs
+        self.state_path = state_path
+        if state_path:
+            os.makedirs(state_path, exist_ok=True)
+        self.jobs: 'OrderedDict[str, TrainingJob]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor: Optional[Executor] = None
+        self._progress = None
+        self._drainer = None
+
+    def _get_executor(self) -> Executor:
+        """Start the pool and the progress thread on first use"""
+        if self._executor is None:
+            if self.executor_kind == 'process':
+                # Spawned workers do not inherit the server's threads, sockets or locks
+                context = multiprocessing.get_context('spawn')
+                self._progress = context.Queue()
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers, mp_context=context,
+                    initializer=_init_worker, initargs=(self._progress,)
+                )
+            else:
+                self._progress = queue.Queue()
+                _init_worker(self._progress)
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                    thread_name_prefix='training')
+            self._drainer = threading.Thread(target=self._drain_progress, daemon=True)
+            self._drainer.start()
+        return self._executor
+
+    def _drain_progress(self):
+        while True:
+            message = self._progress.get()
+            if message is None:
+                return
+            job_id, stage, fraction, at = message
+            job = self.jobs.get(job_id)
+            if job is None or job.status in ('completed', 'failed'):
+                continue
+            if stage == 'started':
+                job.status = 'running'
+                job.started_at = at
+            job.stage = stage
+            job.progress = max(job.progress, fraction)
+            try:
+                self._save(job)
+            except OSError as e:
+                # Keep draining; the next message or the final status writes it again
+                print(f"Could not save the state of job {job_id}: {e}")
+
+    def _job_path(self, job_id: str) -> str:
+        return os.path.join(self.state_path, f"{job_id}.json")
+
+    def _save(self, job: TrainingJob):
+        """
+        Write the job state for other processes (atomically). The progress
+        drainer and the job's done callback both save from their own thread.
+        """
+        if not self.state_path:
+            return
+        with self._lock:
+            fd, tmp_path = tempfile.mkstemp(dir=self.state_path, prefix=f"{job.job_id}.", suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'w') as f:
+                    json.dump(vars(job), f)
+                os.replace(tmp_path, self._job_path(job.job_id))
+            except BaseException:
+                os.remove(tmp_path)
+                raise
+
+    def _load(self, job_id: str) -> Optional[TrainingJob]:
+        """State of a job another process started"""
+        if not self.state_path or not all(c in '0123456789abcdef' for c in job_id):
+            return None
+        try:
+            with open(self._job_path(job_id)) as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return None
+        job = TrainingJob(state['job_id'], state['kind'])
+        vars(job).update(state)
+        return job
+
+    def set_status(self, job: TrainingJob, status: str):
+        job.status = status
+        self._save(job)
+
+    def create(self, kind: str, mode: str = 'full') -> TrainingJob:
+        """Register a new job, before its data is ready"""
+        job = TrainingJob(uuid.uuid4().hex, kind, mode)
+        with self._lock:
+            self.jobs[job.job_id] = job
+            # Forget the oldest finished jobs
+            while len(self.jobs) > self.max_jobs:
+                oldest = next((j for j in self.jobs.values() if j.status in ('completed', 'failed')), None)
+                if oldest is None:
+                    break
+                del self.jobs[oldest.job_id]
+                if self.state_path and os.path.exists(self._job_path(oldest.job_id)):
+                    os.remove(self._job_path(oldest.job_id))
+        self._save(job)
+        return job
+
+    def submit(self, job: TrainingJob, records: Optional[List] = None,
+               store_path: Optional[str] = None, store_size: int = 0,
+               base_version: Optional[str] = None) -> Future:
+        """
+        Queue `job` to train on `records` plus the observations stored at
+        `store_path`; an incremental job updates `base_version`
+        """
+        records = as_observations(records or [])
+        job.data_points = len(records) + store_size
+        self.set_status(job, 'queued')
+        future = self._get_executor().submit(
+            run_training_job, job.job_id, self.predictor_config, records, store_path,
+            job.mode, base_version, self.window_days
+        )
+        future.add_done_callback(lambda f: self._finish(job, f))
+        return future
+
+    def fail(self, job: TrainingJob, error: str):
+        job.error = error
+        job.finished_at = time.time()
+        self.set_status(job, 'failed')
+
+    def _finish(self, job: TrainingJob, future: Future):
+        try:
+            outcome = future.result()
+        except Exception as e:
+            traceback.print_exc()
+            self.fail(job, f"{type(e).__name__}: {e}")
+            return
+
+        job.results = outcome['results']
+        job.model_version = outcome['model_version']
+        job.mode = outcome.get('mode', job.mode)
+        if not job.results:
+            self.fail(job, "No data to train on")
+            return
+        try:
+            if self.on_complete is not None:
+                self.on_complete(job)
+        except Exception as e:
+            self.fail(job, f"Loading the trained models failed: {e}")
+            return
+        job.finished_at = time.time()
+        job.started_at = job.started_at or job.finished_at
+        job.stage = None
+        job.progress = 1.0
+        self.set_status(job, 'completed')
+
+    def get(self, job_id: str) -> Optional[TrainingJob]:
+        return self.jobs.get(job_id) or self._load(job_id)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._progress.put(None)
+            self._executor = None
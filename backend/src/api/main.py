@@ -1,5 +1,6 @@
 # src/api/main.py
-from fastapi import FastAPI, BackgroundTasks, HTTPException
+from fastapi import FastAPI, BackgroundTasks, HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import Dict, List, Optional
@@ -9,13 +10,20 @@ import sys
 from datetime import datetime
 import asyncio
 import json
+import time
 
 # Add the src directory to the path
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
-from data_collection.weather_api import WeatherAPIClient
+from data_collection.weather_api import AsyncWeatherAPIClient
 from data_collection.google_earth import GoogleEarthClient
+from data_collection.observation_store import ObservationStore
+from data_collection.spatial_index import SpatialIndex
 from ml_models.model_proto import AirPollutionPredictor
+from api.batch import BatchPredictionEngine, spool, file_chunks, iter_lines, parse_ndjson, parse_csv, parse_json_array
+from api.jobs import TrainingJob, TrainingJobManager
+from api.enrichment import SatelliteEnrichment
+from api.grid import GridSpec, GridPredictionEngine
 
 app = FastAPI(title="Air Pollution Prediction API", version="1.0.0")
 
@@ -29,23 +37,76 @@ app.add_middleware(
 )
 
 # Global instances
-weather_client = WeatherAPIClient()
+weather_client = AsyncWeatherAPIClient()
 earth_client = GoogleEarthClient()
 predictor = AirPollutionPredictor()
+batch_engine = BatchPredictionEngine(weather_client, predictor)
+satellite_enrichment = SatelliteEnrichment(earth_client)
+grid_engine = GridPredictionEngine(batch_engine, satellite_enrichment, predictor)
 
-# In-memory storage for collected data (in production, use a proper database)
-collected_data = []
+# Collected data, logged to disk by day; only the latest records stay in memory,
+# and those of the last OBSERVATION_INDEX_MAX_AGE seconds are indexed by location
+observation_index = SpatialIndex(max_age=float(os.getenv('OBSERVATION_INDEX_MAX_AGE', '3600')))
+collected_data = ObservationStore(index=observation_index)
+
+# /predict can reuse observations collected within this distance (km) and
+# age (seconds) instead of collecting again; off unless a distance is set
+OBSERVATION_REUSE_KM = float(os.getenv('OBSERVATION_REUSE_KM', '0'))
+OBSERVATION_REUSE_MAX_AGE = float(os.getenv('OBSERVATION_REUSE_MAX_AGE', '600'))
+
+def load_trained_models(job: TrainingJob):
+    """Serve the models a finished training job saved"""
+    predictor.load_models(job.model_version)
+    print(f"Training job {job.job_id} completed: {job.results}")
+
+# Training runs in a worker process, off the event loop
+training_jobs = TrainingJobManager(predictor.config(), on_complete=load_trained_models,
+                                   state_path=os.getenv('TRAINING_JOBS_PATH', 'data/jobs'))
+
+# Saved models are loaded in a thread after startup; see ensure_models_loaded()
+models_loading: Optional[asyncio.Future] = None
+
+# How /retrain updates the models by default: "incremental" or "full"
+RETRAIN_MODE = os.getenv('RETRAIN_MODE', 'incremental')
+
+# Seconds between checks for models saved by other workers (0 disables)
+MODEL_RELOAD_INTERVAL = float(os.getenv('MODEL_RELOAD_INTERVAL', '30'))
+
+async def ensure_models_loaded() -> bool:
+    """Wait for the startup load, or load the latest models off the event loop"""
+    if predictor.active_version is not None:
+        return True
+    loop = asyncio.get_running_loop()
+    if models_loading is not None and not models_loading.done():
+        await asyncio.shield(models_loading)
+    if predictor.active_version is None:
+        await loop.run_in_executor(None, predictor.load_models)
+    return predictor.active_version is not None
 
 # Pydantic models for request/response
 class LocationRequest(BaseModel):
     latitude: float
     longitude: float
+    reuse_nearby: bool = True  # Predict from fresh nearby observations when reuse is enabled
 
 class PredictionResponse(BaseModel):
     predictions: Dict[str, float]
     location: Dict[str, float]
     timestamp: str
     data_sources: List[str]
+    model_version: Optional[str] = None
+    timings: Dict[str, float] = {}
+    skipped_sources: Dict[str, str] = {}
+    nearby_observations: List[Dict] = []
+
+class GridRequest(BaseModel):
+    min_latitude: float
+    min_longitude: float
+    max_latitude: float
+    max_longitude: float
+    resolution: float = 0.01  # Cell size in degrees
+    anchors: int = 4  # Anchor cells per axis where upstream data is collected (at most GRID_MAX_ANCHORS)
+    format: str = "npy"  # "npy" or "raw" (float32 little-endian)
 
 class TrainingRequest(BaseModel):
     locations: List[Dict[str, float]]
@@ -56,6 +117,8 @@ class HealthResponse(BaseModel):
     timestamp: str
     models_loaded: bool
     data_points: int
+    cache: Dict[str, Dict[str, int]] = {}
+    earth_engine: Dict = {}
 
 class RootRespose(BaseModel):
     message: str
@@ -70,9 +133,12 @@ async def root():
         "version": "1.0.0",
         "endpoints": [
             "/predict",
+            "/predict/grid",
             "/train",
+            "/train/{job_id}",
             "/health",
-            "/data-collection"
+            "/data-collection",
+            "/data-collection/region"
         ]
     }
 
@@ -83,47 +149,106 @@ async def health_check():
         status="healthy",
         timestamp=datetime.now().isoformat(),
         models_loaded=len(predictor.models) > 0,
-        data_points=len(collected_data)
+        data_points=len(collected_data),
+        cache=dict(weather_client.cache.stats(), satellite=earth_client.cache.stats(),
+                   observations=collected_data.stats()),
+        earth_engine=dict(earth_client.breaker.stats(), status=earth_client.status,
+                          predict_enrichment=satellite_enrichment.stats())
+    )
+
+async def predict_from_nearby(lat: float, lon: float, started: float) -> Optional[PredictionResponse]:
+    """
+    Prediction from the observations collected near a location recently,
+    weighted by inverse distance, or None if there are none
+    """
+    nearby = observation_index.nearby(lat, lon, OBSERVATION_REUSE_KM, OBSERVATION_REUSE_MAX_AGE, limit=4)
+    timings = {"nearby_lookup": (time.perf_counter() - started) * 1000}
+    if not nearby or not await ensure_models_loaded():
+        return None
+    
+    version = predictor.active_version
+    predict_started = time.perf_counter()
+    neighbour_predictions = version.predict_batch([observation for _, observation in nearby])
+    # Within 10 m, observations count as being at the location
+    weights = [1 / max(distance, 0.01) for distance, _ in nearby]
+    predictions = {
+        target: sum(w * p[target] for w, p in zip(weights, neighbour_predictions)) / sum(weights)
+        for target in neighbour_predictions[0]
+    }
+    timings["prediction"] = (time.perf_counter() - predict_started) * 1000
+    
+    return PredictionResponse(
+        predictions=predictions,
+        location={"latitude": lat, "longitude": lon},
+        timestamp=datetime.now().isoformat(),
+        data_sources=["nearby_observations"],
+        model_version=version.version_id,
+        timings=dict(timings, total=(time.perf_counter() - started) * 1000),
+        nearby_observations=[
+            {"location": observation.location, "distance_km": round(distance, 4),
+             "collected_at": observation.collected_at}
+            for distance, observation in nearby
+        ]
     )
 
 @app.post("/predict", response_model=PredictionResponse)
 async def predict_pollution(request: LocationRequest):
     """
     Predict air pollution for a given location
+    
+    With OBSERVATION_REUSE_KM set, uses observations collected within that
+    distance and OBSERVATION_REUSE_MAX_AGE when there are any (unless
+    reuse_nearby is false); otherwise collects the location's data.
     """
     try:
+        started = time.perf_counter()
         lat, lon = request.latitude, request.longitude
+        timings = {}
+        skipped_sources = {}
+        
+        if request.reuse_nearby and OBSERVATION_REUSE_KM > 0:
+            response = await predict_from_nearby(lat, lon, started)
+            if response is not None:
+                return response
         
         # Collect real-time data
         print(f"Collecting data for location: {lat}, {lon}")
         
+        # Satellite data is collected while the weather data is, and dropped
+        # if it is not ready within the latency budget
+        satellite = satellite_enrichment.start(lat, lon)
+        
         # Get weather data
-        weather_data = weather_client.collect_comprehensive_data(lat, lon)
+        weather_data = await weather_client.collect_comprehensive_data(lat, lon)
+        timings["weather_api"] = (time.perf_counter() - started) * 1000
         if not weather_data:
             raise HTTPException(status_code=500, detail="Failed to collect weather data")
         
         data_sources = ["weather_api"]
         
-        # Try to get satellite data (this might fail if not properly authenticated)
-        try:
-            satellite_data = earth_client.get_comprehensive_satellite_data(lat, lon)
-            if satellite_data:
-                weather_data.update(satellite_data)
-                data_sources.append("satellite_data")
-        except Exception as e:
-            print(f"Satellite data collection failed: {e}")
-            # Continue without satellite data
+        satellite_data, satellite_status = await satellite_enrichment.result(satellite, started)
+        if satellite is not None:
+            timings["satellite_data"] = (time.perf_counter() - started) * 1000
+        if satellite_status == "used":
+            weather_data.update(satellite_data)
+            data_sources.append("satellite_data")
+        else:
+            skipped_sources["satellite_data"] = satellite_status
         
         # Make prediction
-        if len(predictor.models) == 0:
+        if predictor.active_version is None:
             # Try to load existing models
-            if not predictor.load_models():
+            if not await ensure_models_loaded():
                 raise HTTPException(
                     status_code=500, 
                     detail="No trained models available. Please train models first."
                 )
         
-        predictions = predictor.predict(weather_data)
+        # The whole request uses this version, even if a retrain swaps in a new one
+        version = predictor.active_version
+        predict_started = time.perf_counter()
+        predictions = version.predict(weather_data)
+        timings["prediction"] = (time.perf_counter() - predict_started) * 1000
         
         if not predictions:
             raise HTTPException(
@@ -138,27 +263,66 @@ async def predict_pollution(request: LocationRequest):
             predictions=predictions,
             location={"latitude": lat, "longitude": lon},
             timestamp=datetime.now().isoformat(),
-            data_sources=data_sources
+            data_sources=data_sources,
+            model_version=version.version_id,
+            timings=dict(timings, total=(time.perf_counter() - started) * 1000),
+            skipped_sources=skipped_sources
         )
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Prediction failed: {str(e)}")
 
+@app.post("/predict/grid")
+async def predict_grid(request: GridRequest):
+    """
+    Predict a pollution map of a bounding box
+    
+    Returns a float32 array of shape (targets, rows, cols) as a .npy file
+    (format "npy") or raw little-endian bytes (format "raw"). Row 0 is the
+    northern edge and column 0 the western edge. The X-Grid-* headers give
+    the target order, shape, bounds and the anchors collected.
+    """
+    if request.format not in ("npy", "raw"):
+        raise HTTPException(status_code=400, detail="format must be 'npy' or 'raw'")
+    try:
+        spec = GridSpec(request.min_latitude, request.min_longitude,
+                        request.max_latitude, request.max_longitude, request.resolution,
+                        max_cells=grid_engine.max_cells)
+        grid_engine.check(spec, request.anchors)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    if not await ensure_models_loaded():
+        raise HTTPException(status_code=500, detail="No trained models available. Please train models first.")
+    
+    try:
+        result = await grid_engine.predict(spec, request.anchors)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Grid prediction failed: {str(e)}")
+    if result is None:
+        raise HTTPException(status_code=502, detail="Failed to collect weather data for the grid")
+    
+    return Response(content=result.to_bytes(request.format), media_type="application/octet-stream",
+                    headers=result.headers())
+
 @app.post("/train")
 async def train_models(background_tasks: BackgroundTasks, request: TrainingRequest):
     """
     Train or retrain models with new data
     """
     try:
-        # Start training in background
+        # Collect data in background, then fit in the training worker
+        job = training_jobs.create("train")
         background_tasks.add_task(
             train_models_background, 
+            job,
             request.locations, 
             request.days_back
         )
         
         return {
             "message": "Model training started in background",
+            "job_id": job.job_id,
             "locations": len(request.locations),
             "status": "training_started"
         }
@@ -166,11 +330,12 @@ async def train_models(background_tasks: BackgroundTasks, request: TrainingReque
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Training failed: {str(e)}")
 
-async def train_models_background(locations: List[Dict[str, float]], days_back: int):
+async def train_models_background(job: TrainingJob, locations: List[Dict[str, float]], days_back: int):
     """
-    Background task for training models
+    Background task collecting the data for a training job
     """
     print(f"Starting background training for {len(locations)} locations")
+    training_jobs.set_status(job, "collecting")
     
     training_data = []
     
@@ -179,16 +344,8 @@ async def train_models_background(locations: List[Dict[str, float]], days_back:
             lat, lon = location["latitude"], location["longitude"]
             
             # Collect comprehensive data
-            weather_data = weather_client.collect_comprehensive_data(lat, lon)
+            weather_data = await weather_client.collect_comprehensive_data(lat, lon)
             if weather_data:
-                # Try to add satellite data
-                try:
-                    satellite_data = earth_client.get_comprehensive_satellite_data(lat, lon)
-                    if satellite_data:
-                        weather_data.update(satellite_data)
-                except:
-                    pass
-                
                 training_data.append(weather_data)
                 
             # Add small delay to avoid hitting API limits
@@ -198,56 +355,104 @@ async def train_models_background(locations: List[Dict[str, float]], days_back:
             print(f"Error collecting data for {location}: {e}")
             continue
     
-    # Add existing collected data
-    if collected_data:
-        training_data.extend(collected_data)
+    # Try to add satellite data, sampled for all locations at once off the event loop
+    try:
+        points = [(item['location']['lat'], item['location']['lon']) for item in training_data]
+        loop = asyncio.get_running_loop()
+        satellite_batch = await loop.run_in_executor(
+            satellite_enrichment.executor, earth_client.get_comprehensive_satellite_batch, points
+        )
+        for weather_data, satellite_data in zip(training_data, satellite_batch):
+            if satellite_data:
+                weather_data.update(satellite_data)
+    except Exception as e:
+        print(f"Satellite data collection failed: {e}")
     
-    if training_data:
-        print(f"Training with {len(training_data)} data points")
-        results = predictor.train_models(training_data)
-        print(f"Training completed: {results}")
+    if training_data or collected_data:
+        # Add existing collected data, read from disk in chunks by the worker
+        print(f"Training with {len(training_data) + len(collected_data)} data points")
+        training_jobs.submit(job, training_data, collected_data.path, len(collected_data))
     else:
         print("No training data collected")
+        training_jobs.fail(job, "No training data collected")
+
+@app.get("/data-collection/region")
+async def get_region_observations(min_latitude: float, min_longitude: float,
+                                  max_latitude: float, max_longitude: float,
+                                  max_age: Optional[float] = None, limit: int = 1000):
+    """
+    Observations collected inside a bounding box within `max_age` seconds
+    (default: OBSERVATION_INDEX_MAX_AGE): the count, and the most recent
+    `limit` of them, oldest first
+    """
+    started = time.perf_counter()
+    observations = observation_index.region(min_latitude, min_longitude, max_latitude, max_longitude, max_age)
+    query_ms = (time.perf_counter() - started) * 1000
+    return {
+        "count": len(observations),
+        "query_ms": query_ms,
+        "observations": [
+            {"location": observation.location, "collected_at": observation.collected_at}
+            for observation in (observations[-limit:] if limit > 0 else [])
+        ]
+    }
 
 @app.get("/data-collection")
 async def get_collected_data():
     """
     Get information about collected data
     """
+    latest = collected_data.latest()
     return {
         "total_data_points": len(collected_data),
-        "latest_collection": collected_data[-1]["collected_at"] if collected_data else None,
+        "latest_collection": latest.collected_at if latest else None,
+        "partitions": collected_data.partitions(),
+        "indexed_observations": observation_index.stats(),
         "models_available": list(predictor.models.keys()),
         "feature_columns": len(predictor.feature_columns) if predictor.feature_columns else 0
     }
 
 @app.post("/retrain")
-async def retrain_models(background_tasks: BackgroundTasks):
+async def retrain_models(mode: str = RETRAIN_MODE):
     """
     Retrain models with existing collected data
+    
+    mode "incremental" updates the serving models with the data collected
+    since they were trained, "full" refits on all collected data. Without
+    serving models, retraining is always full.
     """
+    if mode not in ("full", "incremental"):
+        raise HTTPException(status_code=400, detail="mode must be 'full' or 'incremental'")
     if not collected_data:
         raise HTTPException(status_code=400, detail="No data available for retraining")
     
-    background_tasks.add_task(retrain_models_background)
+    base_version = predictor.version_id
+    if base_version is None:
+        mode = "full"
+    
+    print(f"Retraining models ({mode}) with {len(collected_data)} data points")
+    job = training_jobs.create("retrain", mode)
+    training_jobs.submit(job, store_path=collected_data.path, store_size=len(collected_data),
+                         base_version=base_version)
     
     return {
         "message": "Model retraining started",
+        "job_id": job.job_id,
+        "mode": mode,
+        "base_version": base_version,
         "data_points": len(collected_data),
         "status": "retraining_started"
     }
 
-async def retrain_models_background():
+@app.get("/train/{job_id}")
+async def get_training_job(job_id: str):
     """
-    Background task for retraining models
+    Status, progress, per-target metrics and duration of a training job
     """
-    print(f"Retraining models with {len(collected_data)} data points")
-    
-    try:
-        results = predictor.train_models(collected_data)
-        print(f"Retraining completed: {results}")
-    except Exception as e:
-        print(f"Retraining failed: {e}")
+    job = training_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown training job: {job_id}")
+    return job.to_dict()
 
 @app.get("/predictions/batch")
 async def batch_predictions(locations: str):
@@ -258,40 +463,60 @@ async def batch_predictions(locations: str):
     try:
         locations_list = json.loads(locations)
         
-        if len(predictor.models) == 0:
-            predictor.load_models()
+        await ensure_models_loaded()
         
-        results = []
-        
-        for location in locations_list:
-            try:
-                lat, lon = location["latitude"], location["longitude"]
-                
-                # Collect data
-                weather_data = weather_client.collect_comprehensive_data(lat, lon)
-                if weather_data:
-                    predictions = predictor.predict(weather_data)
-                    results.append({
-                        "location": location,
-                        "predictions": predictions,
-                        "timestamp": datetime.now().isoformat()
-                    })
-                
-                # Small delay to avoid API limits
-                await asyncio.sleep(0.5)
-                
-            except Exception as e:
-                results.append({
-                    "location": location,
-                    "error": str(e),
-                    "timestamp": datetime.now().isoformat()
-                })
+        # Collected concurrently, then predicted as one matrix
+        results = await batch_engine.run(locations_list)
         
         return {"results": results}
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Batch prediction failed: {str(e)}")
 
+@app.post("/predictions/stream")
+async def stream_predictions(request: Request):
+    """
+    Stream predictions for many locations as NDJSON, one line per location
+    
+    The body is one of:
+    - application/json: [{"latitude": lat, "longitude": lon}, ...]
+    - application/x-ndjson: one {"latitude": lat, "longitude": lon} per line
+    - text/csv: a latitude,longitude (or lat,lon) header, then one row per location
+    Bodies (e.g. curl --data-binary @locations.csv) are spooled to a
+    temporary file and read incrementally; a JSON array is decoded one
+    element at a time. Lines are sent in completion order and carry the
+    input "index". Invalid input ends the stream with an "error" line.
+    """
+    if not await ensure_models_loaded():
+        raise HTTPException(status_code=500, detail="No trained models available. Please train models first.")
+    
+    content_type = request.headers.get("content-type", "application/json").split(";")[0].strip()
+    
+    if content_type in ("application/x-ndjson", "application/jsonl", "application/ndjson"):
+        parse = parse_ndjson
+    elif content_type in ("text/csv", "application/csv"):
+        parse = parse_csv
+    elif content_type == "application/json":
+        parse = None
+    else:
+        raise HTTPException(status_code=415, detail=f"Unsupported content type: {content_type}")
+    
+    body = await spool(request.stream())
+    
+    if parse is None:
+        locations = parse_json_array(file_chunks(body))
+    else:
+        locations = parse(iter_lines(file_chunks(body)))
+    
+    async def lines():
+        try:
+            async for result in batch_engine.stream(locations):
+                yield json.dumps(result) + "\n"
+        finally:
+            body.close()
+    
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
 @app.get("/model-info")
 async def get_model_info():
     """
@@ -316,9 +541,19 @@ async def startup_event():
     """
     Load models on startup if available
     """
+    global models_loading
     print("Starting Air Pollution Prediction API...")
     
-    # Try to load existing models
+    # Load existing models in a thread, so the server accepts requests right away
+    # (Earth Engine is initialized in the background on first use)
+    models_loading = asyncio.get_running_loop().run_in_executor(None, load_models_on_startup)
+    if MODEL_RELOAD_INTERVAL > 0:
+        asyncio.create_task(watch_saved_models())
+
+def load_models_on_startup():
+    if predictor.active_version is not None:
+        # Preloaded by the parent of forked workers (see serve.py)
+        return
     try:
         if predictor.load_models():
             print("Models loaded successfully")
@@ -327,6 +562,30 @@ async def startup_event():
     except Exception as e:
         print(f"Error loading models: {e}")
 
+async def watch_saved_models():
+    """
+    Serve model versions saved by other processes, e.g. a retrain that
+    another API worker ran
+    """
+    loop = asyncio.get_running_loop()
+    while True:
+        await asyncio.sleep(MODEL_RELOAD_INTERVAL)
+        try:
+            latest = predictor.read_manifest()['latest']
+            if latest and latest != predictor.version_id:
+                await loop.run_in_executor(None, predictor.load_models, latest)
+        except Exception as e:
+            print(f"Checking for new models failed: {e}")
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """
+    Close pooled upstream connections
+    """
+    await weather_client.aclose()
+    training_jobs.shutdown()
+    satellite_enrichment.shutdown()
+
 if __name__ == "__main__":
     # Run the API server
     uvicorn.run(
@@ -0,0 +1,111 @@
+"""
+Production server: pre-forked uvicorn workers sharing one loaded model.
+
+The parent process imports the API, loads the latest saved model version
+and freezes the garbage collector, then forks `--workers` processes that
+accept connections on one shared listening socket. The models are never
+written after loading, so the workers share their pages copy-on-write;
+gc.freeze() keeps the workers' collections from touching (and so copying)
+them. Workers that exit are restarted, SIGTERM or SIGINT stops them all.
+
+Usage: python src/api/serve.py [--workers N] [--host HOST] [--port PORT]
+"""
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+import uvicorn
+
+# Add the src directory to the path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+
+def bind(host: str, port: int, backlog: int = 2048) -> socket.socket:
+    """Listening socket that all workers accept on"""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _run_worker(app, sock: socket.socket, log_level: str):
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    server = uvicorn.Server(uvicorn.Config(app, log_level=log_level, lifespan='on'))
+    server.run(sockets=[sock])
+
+
+def prefork(app, sock: socket.socket, workers: int, log_level: str = 'info'):
+    """
+    Serve `app` from `workers` forked processes until SIGTERM/SIGINT.
+
+    Everything the parent built before calling this (e.g. loaded models) is
+    shared with the workers copy-on-write. The parent must not have started
+    threads or an event loop.
+    """
+    gc.collect()
+    gc.freeze()
+
+    children = set()
+    stopping = False
+
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            try:
+                _run_worker(app, sock, log_level)
+            finally:
+                os._exit(0)
+        children.add(pid)
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    for _ in range(workers):
+        spawn()
+    print(f"Serving with {workers} worker(s), pids {sorted(children)}")
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        children.discard(pid)
+        if not stopping:
+            print(f"Worker {pid} exited with status {status}, restarting")
+            time.sleep(1)
+            spawn()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Air Pollution Prediction API, production mode")
+    parser.add_argument('--workers', type=int, default=int(os.getenv('WEB_WORKERS', os.cpu_count() or 1)))
+    parser.add_argument('--host', default=os.getenv('HOST', '0.0.0.0'))
+    parser.add_argument('--port', type=int, default=int(os.getenv('PORT', '8000')))
+    parser.add_argument('--log-level', default='info')
+    args = parser.parse_args()
+
+    from api.main import app, predictor
+
+    # Loaded once here; the workers inherit the model version
+    try:
+        if not predictor.load_models():
+            print("No existing models found, workers start without models")
+    except Exception as e:
+        print(f"Error loading models: {e}")
+
+    prefork(app, bind(args.host, args.port), args.workers, args.log_level)
@@ -0,0 +1,88 @@
+"""
+Benchmark: /predictions/batch wall time.
+
+Runs the original batch loop (collect one location at a time, predict it,
+sleep 0.5 s) and BatchPredictionEngine (concurrent collection behind a
+token bucket, one vectorized prediction) against the mock OpenWeather
+server, and checks that both produce the same predictions.
+
+Usage: python src/benchmarks/bench_batch.py [n_locations] [latency_ms] [rate_per_second]
+"""
+import os
+import sys
+import asyncio
+import random
+import tempfile
+import time
+import numpy as np
+from typing import Dict, List
+
+# Add the src directory to the path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from benchmarks import mock_openweather
+from api.batch import BatchPredictionEngine
+from data_collection.weather_api import AsyncWeatherAPIClient
+from ml_models.model_proto import AirPollutionPredictor, create_dummy_data
+
+MOCK_PORT = 8012
+BASE_URL = f"http://127.0.0.1:{MOCK_PORT}/data/2.5"
+
+
+async def legacy_batch(client: AsyncWeatherAPIClient, predictor: AirPollutionPredictor,
+                       locations: List[Dict]) -> List[Dict]:
+    """The original sequential loop, kept as the baseline"""
+    results = []
+    for location in locations:
+        weather_data = await client.collect_comprehensive_data(location["latitude"], location["longitude"])
+        if weather_data:
+            results.append({"location": location, "predictions": predictor.predict(weather_data)})
+        await asyncio.sleep(0.5)
+    return results
+
+
+async def compare(predictor: AirPollutionPredictor, locations: List[Dict], rate: float) -> Dict:
+    """Wall time of both paths, each with a fresh client so nothing is served from cache"""
+    timings = {}
+
+    client = AsyncWeatherAPIClient(base_url=BASE_URL)
+    start = time.perf_counter()
+    legacy = await legacy_batch(client, predictor, locations)
+    timings['sequential'] = time.perf_counter() - start
+    await client.aclose()
+
+    client = AsyncWeatherAPIClient(base_url=BASE_URL)
+    engine = BatchPredictionEngine(client, predictor, rate=rate)
+    start = time.perf_counter()
+    batched = await engine.run(locations)
+    timings['engine'] = time.perf_counter() - start
+    await client.aclose()
+
+    for old, new in zip(legacy, batched):
+        for target, value in old['predictions'].items():
+            assert np.isclose(value, new['predictions'][target]), (target, value, new['predictions'][target])
+    assert len(legacy) == len(batched)
+    return timings
+
+
+if __name__ == "__main__":
+    n_locations = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+    latency_ms = float(sys.argv[2]) if len(sys.argv) > 2 else 50
+    rate = float(sys.argv[3]) if len(sys.argv) > 3 else 10
+
+    random.seed(0)
+    with tempfile.TemporaryDirectory() as model_dir:
+        predictor = AirPollutionPredictor(model_save_path=model_dir)
+        predictor.train_models(create_dummy_data(300))
+
+    mock_openweather.run_in_thread(MOCK_PORT, latency_ms)
+    locations = [
+        {"latitude": random.uniform(-60, 60), "longitude": random.uniform(-180, 180)}
+        for _ in range(n_locations)
+    ]
+
+    timings = asyncio.run(compare(predictor, locations, rate))
+    print(f"\n{n_locations} locations, upstream latency {latency_ms:.0f} ms, engine rate {rate:g}/s")
+    for name, seconds in timings.items():
+        print(f"{name:>12}: {seconds:>7.2f} s")
+    print(f"     speedup: {timings['sequential'] / timings['engine']:>7.1f}x")
@@ -0,0 +1,85 @@
+"""
+Benchmark: fit time and R² of each training candidate by training set size.
+
+Builds the feature frame of as many dummy records as the largest size, in
+chunks, and uses its first rows for each size. For each registered
+candidate (see ml_models.candidates) and size, fits one target on 80% of
+the rows and scores R² on the rest, as training does per target. Then a share of the
+feature values is knocked out, and the candidates that handle missing
+values are fitted on it twice: with the gaps filled with 0 (missing='zero')
+and left as NaN (missing='native').
+
+Fits that would take longer than max_seconds are skipped, estimated from
+the candidate's time at the previous size.
+
+Usage: python src/benchmarks/bench_candidates.py [sizes...]
+       (CANDIDATES=random_forest,hist_gradient_boosting BENCH_MAX_SECONDS=600)
+"""
+import os
+import sys
+import random
+import tempfile
+import time
+import numpy as np
+from sklearn.metrics import r2_score
+from sklearn.model_selection import train_test_split
+
+# Add the src directory to the path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from ml_models.candidates import CANDIDATES
+from ml_models.features import build_feature_frame_chunked
+from ml_models.model_proto import AirPollutionPredictor, create_dummy_data
+
+TARGET = 'pm2_5'
+MISSING_SHARE = 0.2
+
+
+def fit_and_score(model, X: np.ndarray, y: np.ndarray) -> tuple:
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    start = time.perf_counter()
+    model.fit(X_train, y_train)
+    fit_time = time.perf_counter() - start
+    return fit_time, r2_score(y_test, model.predict(X_test))
+
+
+if __name__ == "__main__":
+    sizes = [int(n) for n in sys.argv[1:]] or [10000, 100000, 1000000]
+    names = os.getenv('CANDIDATES', ','.join(CANDIDATES)).split(',')
+    max_seconds = float(os.getenv('BENCH_MAX_SECONDS', 600))
+    chunk_size = 100000
+
+    random.seed(0)
+    rng = np.random.default_rng(0)
+    n_records = max(sizes)
+    chunks = (create_dummy_data(min(chunk_size, n_records - start)) for start in range(0, n_records, chunk_size))
+    df = build_feature_frame_chunked(chunks)
+    df = df[df[TARGET] > 0]
+    with tempfile.TemporaryDirectory() as model_dir:
+        predictor = AirPollutionPredictor(model_save_path=model_dir)
+    features = [col for col in df.columns if col not in predictor.target_columns]
+    X, y = df[features].values.astype(float), df[TARGET].values.astype(float)
+    del df
+    print(f"{len(features)} features from {n_records} records, target {TARGET}")
+
+    def run(label, names, X, y):
+        print(f"\n{label}")
+        print(f"{'candidate':>24} {'rows':>9} {'fit s':>9} {'R²':>8}")
+        last = {}
+        for size in sizes:
+            X_size, y_size = X[:size], y[:size]
+            for name in names:
+                if name in last and last[name][1] * size / last[name][0] > max_seconds:
+                    print(f"{name:>24} {size:>9} {'skipped':>9}")
+                    continue
+                fit_time, score = fit_and_score(CANDIDATES[name]['factory'](predictor), X_size, y_size)
+                last[name] = (size, fit_time)
+                print(f"{name:>24} {size:>9} {fit_time:>9.2f} {score:>8.4f}", flush=True)
+
+    run("All features present", names, X, y)
+
+    X_gaps = X.copy()
+    X_gaps[rng.random(X.shape) < MISSING_SHARE] = np.nan
+    native = [name for name in names if CANDIDATES[name]['handles_missing']]
+    run(f"{MISSING_SHARE:.0%} of feature values missing, filled with 0", native, np.nan_to_num(X_gaps), y)
+    run(f"{MISSING_SHARE:.0%} of feature values missing, left as NaN", native, X_gaps, y)
@@ -0,0 +1,105 @@
+"""
+Benchmark: cold start of a serving process, per-file pickles vs one artifact.
+
+Trains one model set and saves it twice: in the previous layout (one
+pickle per model and scaler plus the preprocessor, found by listing the
+directory) and as a manifest-indexed joblib artifact. Each layout is then
+loaded by fresh Python processes, which report the time to import the
+predictor, to load the models and to serve the first prediction, and
+their resident memory afterwards.
+
+Usage: python src/benchmarks/bench_cold_start.py [n_samples] [runs] [engine]
+"""
+import os
+import sys
+import json
+import random
+import subprocess
+import tempfile
+import joblib
+import numpy as np
+from typing import Dict
+
+# Add the src directory to the path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from ml_models.model_proto import AirPollutionPredictor, create_dummy_data
+from ml_models.registry import ModelVersion
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+# Runs in a fresh interpreter: python -c CHILD src_dir model_dir mmap_mode
+CHILD = """
+import sys, time, json
+start = time.perf_counter()
+sys.path.insert(0, sys.argv[1])
+from ml_models.model_proto import AirPollutionPredictor, create_dummy_data
+imported = time.perf_counter()
+predictor = AirPollutionPredictor(model_save_path=sys.argv[2])
+predictor.load_models(mmap_mode=None if sys.argv[3] == 'none' else sys.argv[3])
+loaded = time.perf_counter()
+predictor.predict(create_dummy_data(1)[0])
+ready = time.perf_counter()
+rss = next(int(line.split()[1]) for line in open('/proc/self/status') if line.startswith('VmRSS'))
+print(json.dumps({'import': imported - start, 'load': loaded - imported,
+                  'first_predict': ready - loaded, 'total': ready - start, 'rss_mb': rss / 1024}))
+"""
+
+
+def save_legacy(version: ModelVersion, model_dir: str):
+    """Save a version the way save_models() did before the artifact format"""
+    if version.output_index:
+        model = next(iter(version.models.values()))
+        joblib.dump(model, os.path.join(model_dir, f"multi_output_model_{version.version_id}.pkl"))
+    for target, model in version.models.items():
+        if target in version.output_index:
+            continue
+        joblib.dump(model, os.path.join(model_dir, f"{target}_model_{version.version_id}.pkl"))
+        if target in version.scalers:
+            joblib.dump(version.scalers[target], os.path.join(model_dir, f"{target}_scaler_{version.version_id}.pkl"))
+    joblib.dump({
+        'scaling': version.scaling,
+        'scaler': version.scaler,
+        'feature_columns': version.feature_columns,
+        'weather_classes': version.weather_classes,
+        'output_index': version.output_index
+    }, os.path.join(model_dir, f"preprocessor_{version.version_id}.pkl"))
+
+
+def cold_start(model_dir: str, mmap_mode: str) -> Dict:
+    output = subprocess.run(
+        [sys.executable, '-c', CHILD, SRC_DIR, model_dir, mmap_mode],
+        capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def directory_mb(path: str) -> float:
+    return sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path)) / 1e6
+
+
+if __name__ == "__main__":
+    n_samples = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    engine = sys.argv[3] if len(sys.argv) > 3 else 'per_target'
+
+    random.seed(0)
+    with tempfile.TemporaryDirectory() as artifact_dir, tempfile.TemporaryDirectory() as legacy_dir:
+        predictor = AirPollutionPredictor(model_save_path=artifact_dir, engine=engine)
+        predictor.train_models(create_dummy_data(n_samples))
+        save_legacy(predictor.active_version, legacy_dir)
+
+        layouts = [
+            ('per-file', legacy_dir, 'none'),
+            ('artifact', artifact_dir, 'none'),
+            ('artifact+mmap', artifact_dir, 'r'),
+        ]
+        print(f"\n{engine} models trained on {n_samples} samples, median of {runs} cold starts")
+        print(f"{'layout':>14} {'disk MB':>8} {'import s':>9} {'load s':>8} "
+              f"{'1st predict ms':>15} {'total s':>8} {'RSS MB':>7}")
+        for name, model_dir, mmap_mode in layouts:
+            cold_start(model_dir, mmap_mode)  # warm the page cache
+            results = [cold_start(model_dir, mmap_mode) for _ in range(runs)]
+            median = {key: float(np.median([r[key] for r in results])) for key in results[0]}
+            print(f"{name:>14} {directory_mb(model_dir):>8.1f} {median['import']:>9.2f} {median['load']:>8.3f} "
+                  f"{median['first_predict'] * 1000:>15.1f} {median['total']:>8.2f} {median['rss_mb']:>7.0f}")
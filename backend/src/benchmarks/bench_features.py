@@ -0,0 +1,160 @@
+"""
+Benchmark: feature preparation throughput (rows/sec).
+
+Compares the original per-record feature builder with the columnar
+`build_feature_frame` used by `AirPollutionPredictor.prepare_features` and
+checks that both produce the same feature matrix.
+
+Usage: python src/benchmarks/bench_features.py [n_rows ...]
+"""
+import os
+import sys
+import random
+import time
+import pandas as pd
+from sklearn.preprocessing import LabelEncoder
+from typing import Dict, List
+
+# Add the src directory to the path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from ml_models.model_proto import AirPollutionPredictor, create_dummy_data
+
+
+def legacy_prepare_features(data: List[Dict]) -> pd.DataFrame:
+    """The original per-record implementation, kept as the baseline"""
+    features_list = []
+
+    for item in data:
+        feature_dict = {}
+
+        if 'current_weather' in item:
+            weather = item['current_weather']
+            feature_dict.update({
+                'temperature': weather.get('temperature', 0),
+                'humidity': weather.get('humidity', 0),
+                'pressure': weather.get('pressure', 0),
+                'wind_speed': weather.get('wind_speed', 0),
+                'wind_direction': weather.get('wind_direction', 0),
+                'visibility': weather.get('visibility', 10000),
+            })
+            feature_dict['weather_condition'] = weather.get('weather_condition', 'Clear')
+
+        if 'current_pollution' in item:
+            pollution = item['current_pollution']
+            feature_dict.update({
+                'pm2_5': pollution.get('pm2_5', 0),
+                'pm10': pollution.get('pm10', 0),
+                'no2': pollution.get('no2', 0),
+                'o3': pollution.get('o3', 0),
+                'co': pollution.get('co', 0),
+                'so2': pollution.get('so2', 0),
+                'aqi': pollution.get('aqi', 0)
+            })
+
+        if 'atmospheric' in item and item['atmospheric']:
+            sat_data = item['atmospheric']['satellite_data']
+            feature_dict.update({
+                'sat_no2': sat_data.get('no2', 0) or 0,
+                'sat_o3': sat_data.get('o3', 0) or 0,
+                'sat_so2': sat_data.get('so2', 0) or 0,
+                'sat_co': sat_data.get('co', 0) or 0,
+                'sat_aerosol': sat_data.get('aerosol', 0) or 0
+            })
+
+        if 'surface' in item and item['surface']:
+            surface = item['surface']
+            feature_dict.update({
+                'ndvi': surface.get('ndvi', 0) or 0,
+                'surface_temp': surface.get('surface_temperature', 0) or 0,
+                'vegetation_health': surface.get('vegetation_health', 0) or 0
+            })
+
+        if 'location' in item:
+            location = item['location']
+            feature_dict.update({
+                'latitude': location.get('lat', 0),
+                'longitude': location.get('lon', 0)
+            })
+
+        if 'collected_at' in item:
+            timestamp = pd.to_datetime(item['collected_at'])
+            feature_dict.update({
+                'hour': timestamp.hour,
+                'day_of_week': timestamp.dayofweek,
+                'month': timestamp.month,
+                'is_weekend': 1 if timestamp.dayofweek >= 5 else 0
+            })
+
+        if 'historical_pollution' in item and item['historical_pollution']:
+            hist_df = pd.DataFrame(item['historical_pollution'])
+            if not hist_df.empty:
+                feature_dict.update({
+                    'hist_pm2_5_avg': hist_df['pm2_5'].mean(),
+                    'hist_pm10_avg': hist_df['pm10'].mean(),
+                    'hist_no2_avg': hist_df['no2'].mean(),
+                    'hist_o3_avg': hist_df['o3'].mean(),
+                    'hist_aqi_avg': hist_df['aqi'].mean()
+                })
+
+        features_list.append(feature_dict)
+
+    df = pd.DataFrame(features_list)
+
+    if 'weather_condition' in df.columns:
+        le = LabelEncoder()
+        df['weather_condition_encoded'] = le.fit_transform(df['weather_condition'].fillna('Clear'))
+        df.drop('weather_condition', axis=1, inplace=True)
+
+    return df.fillna(0)
+
+
+def create_mixed_data(n_samples: int) -> List[Dict]:
+    """Dummy records with satellite data and some missing sections"""
+    data = create_dummy_data(n_samples)
+    for item in data:
+        roll = random.random()
+        if roll < 0.3:
+            item['atmospheric'] = {'satellite_data': {
+                'no2': random.uniform(0, 1e-4), 'o3': None, 'so2': random.uniform(0, 1e-4),
+                'co': random.uniform(0, 0.05), 'aerosol': random.uniform(-1, 2)
+            }}
+            item['surface'] = {'ndvi': random.uniform(-1, 1), 'surface_temperature': None,
+                               'vegetation_health': random.uniform(0, 1)}
+        elif roll < 0.35:
+            del item['historical_pollution']
+        elif roll < 0.4:
+            item['current_weather'].pop('visibility')
+            item['current_weather']['weather_condition'] = None
+        # Full 7-day hourly history, as collected by the API
+        if 'historical_pollution' in item:
+            item['historical_pollution'] = item['historical_pollution'] * 34
+    return data
+
+
+def time_call(func, data: List[Dict], repeats: int = 3) -> float:
+    """Best wall-clock time of several runs"""
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func(data)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+if __name__ == "__main__":
+    random.seed(0)
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1000, 10000]
+    predictor = AirPollutionPredictor()
+
+    for n in sizes:
+        data = create_mixed_data(n)
+
+        pd.testing.assert_frame_equal(
+            legacy_prepare_features(data), predictor.prepare_features(data), check_dtype=False
+        )
+
+        legacy = time_call(legacy_prepare_features, data, repeats=1)
+        columnar = time_call(predictor.prepare_features, data)
+        print(f"{n:>8} rows | per-record: {n / legacy:>10.0f} rows/s | "
+              f"columnar: {n / columnar:>10.0f} rows/s | speedup: {legacy / columnar:.1f}x")
@@ -0,0 +1,107 @@
+"""
+Benchmark: /predict/grid against predicting every cell of the map.
+
+Calls the API's /predict/grid in process for a bounding box, with weather
+collection replaced by a 200 ms stand-in whose values vary smoothly over
+space (satellite enrichment returns nothing). Reports the request latency,
+the upstream calls made and the response size for each resolution. It
+compares this with predicting every cell from its own record, as
+/predictions/batch would: the number of upstream calls, the size of the
+JSON results, and the error of the interpolated map.
+
+Usage: python src/benchmarks/bench_grid.py [anchors_per_axis]
+"""
+import os
+import sys
+import asyncio
+import copy
+import io
+import json
+import math
+import random
+import tempfile
+import time
+import httpx
+import numpy as np
+
+# Add the src directory to the path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import api.main as main
+from api.grid import GridSpec
+from data_collection.observation_store import ObservationStore
+from ml_models.model_proto import create_dummy_data
+
+WEATHER_DELAY = 0.2
+BOX = (28.4, 76.9, 28.8, 77.4)  # Delhi
+RESOLUTIONS = [0.02, 0.005, 0.002]
+
+
+def record_at(template: dict, lat: float, lon: float) -> dict:
+    """A record whose weather and pollution vary smoothly with the location"""
+    record = copy.deepcopy(template)
+    wave = math.sin(lat * 20) + math.cos(lon * 15)
+    record['current_weather'].update(temperature=25 + 4 * wave, humidity=55 - 10 * wave,
+                                     wind_speed=3 + wave)
+    record['current_pollution'].update(pm2_5=80 + 30 * wave, no2=40 + 10 * wave)
+    record['location'] = {'lat': lat, 'lon': lon}
+    return record
+
+
+if __name__ == "__main__":
+    anchors = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+
+    random.seed(0)
+    template = create_dummy_data(1)[0]
+    calls = [0]
+
+    async def collect_comprehensive_data(lat, lon):
+        calls[0] += 1
+        await asyncio.sleep(WEATHER_DELAY)
+        return record_at(template, lat, lon)
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        main.predictor.model_save_path = work_dir
+        main.predictor.train_models(create_dummy_data(1000))
+        main.collected_data = ObservationStore(os.path.join(work_dir, 'observations'))
+        main.weather_client.collect_comprehensive_data = collect_comprehensive_data
+        main.earth_client.get_comprehensive_satellite_batch = lambda points: [None] * len(points)
+
+        async def bench():
+            transport = httpx.ASGITransport(app=main.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://api", timeout=300) as client:
+                for resolution in RESOLUTIONS:
+                    calls[0] = 0
+                    request = dict(zip(('min_latitude', 'min_longitude', 'max_latitude', 'max_longitude'), BOX),
+                                   resolution=resolution, anchors=anchors)
+                    start = time.perf_counter()
+                    response = await client.post("/predict/grid", json=request)
+                    response.raise_for_status()
+                    latency = time.perf_counter() - start
+                    grid = np.load(io.BytesIO(response.content))
+                    targets = response.headers['x-grid-targets'].split(',')
+
+                    # Every cell predicted from its own record
+                    spec = GridSpec(*BOX, resolution)
+                    records = [record_at(template, lat, lon) for lat in spec.lats for lon in spec.lons]
+                    start = time.perf_counter()
+                    exact = main.predictor.active_version.predict_batch(records)
+                    exact_seconds = time.perf_counter() - start
+                    exact_grid = np.array([[p[t] for p in exact] for t in targets]).reshape(grid.shape)
+                    error = np.abs(grid - exact_grid).mean(axis=(1, 2)) / np.abs(exact_grid).mean(axis=(1, 2))
+                    json_size = len(json.dumps({"results": [
+                        {"location": {"latitude": r['location']['lat'], "longitude": r['location']['lon']},
+                         "predictions": p} for r, p in zip(records, exact)
+                    ]}))
+
+                    cells = spec.rows * spec.cols
+                    print(f"\n{spec.rows}x{spec.cols} = {cells} cells at {resolution} deg")
+                    print(f"  grid: {latency:.2f} s, {calls[0]} upstream calls, "
+                          f"{len(response.content) / 1024:.0f} KiB npy; timings (ms) {response.headers['x-timings-ms']}")
+                    print(f"  per cell: {cells} upstream calls, {json_size / 1024:.0f} KiB JSON, "
+                          f"prediction alone {exact_seconds:.2f} s")
+                    print("  mean relative error of the interpolated map: "
+                          + ", ".join(f"{t} {e:.1%}" for t, e in zip(targets, error)))
+
+        asyncio.run(bench())
+        main.satellite_enrichment.shutdown()
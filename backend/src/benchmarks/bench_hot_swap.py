@@ -0,0 +1,72 @@
+"""
+Benchmark: predictions while new model versions are published.
+
+Trains two model sets on different data, then keeps a few threads
+predicting the same record while the main thread loads the two saved
+versions alternately. Every prediction must equal the full output of one
+of the two versions and match the version id reported with it; a mix of
+targets from both sets counts as torn. Reports prediction latency during
+the swaps and the time to load and publish a version.
+
+Usage: python src/benchmarks/bench_hot_swap.py [n_swaps] [n_threads]
+"""
+import os
+import sys
+import random
+import tempfile
+import threading
+import time
+import numpy as np
+
+# Add the src directory to the path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from ml_models.model_proto import AirPollutionPredictor, create_dummy_data
+
+
+if __name__ == "__main__":
+    n_swaps = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    n_threads = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+
+    random.seed(0)
+    record = create_dummy_data(1)[0]
+    with tempfile.TemporaryDirectory() as model_dir:
+        predictor = AirPollutionPredictor(model_save_path=model_dir)
+        expected = {}
+        for _ in range(2):
+            predictor.train_models(create_dummy_data(300))
+            expected[predictor.version_id] = predictor.predict(record)
+            time.sleep(1.1)  # versions are named by the second
+        version_ids = list(expected)
+
+        stop = threading.Event()
+        latencies, torn, checked = [], [0], [0]
+
+        def serve():
+            while not stop.is_set():
+                start = time.perf_counter()
+                version = predictor.active_version
+                predictions = version.predict(record)
+                latencies.append((time.perf_counter() - start) * 1000)
+                checked[0] += 1
+                if predictions != expected[version.version_id]:
+                    torn[0] += 1
+
+        threads = [threading.Thread(target=serve) for _ in range(n_threads)]
+        for thread in threads:
+            thread.start()
+
+        load_times = []
+        for i in range(n_swaps):
+            start = time.perf_counter()
+            predictor.load_models(version_ids[i % 2])
+            load_times.append(time.perf_counter() - start)
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+    latencies = np.array(latencies)
+    print(f"\n{n_swaps} swaps, {n_threads} predicting threads")
+    print(f"predictions checked: {checked[0]}, torn: {torn[0]}")
+    print(f"predict p50 {np.percentile(latencies, 50):.2f} ms, p99 {np.percentile(latencies, 99):.2f} ms")
+    print(f"load + publish: {np.mean(load_times) * 1000:.0f} ms per version")
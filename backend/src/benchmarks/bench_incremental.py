@@ -0,0 +1,74 @@
+"""
+Benchmark: incremental model updates against a full retrain.
+
+For each history size, trains on the history, then brings the models up
+to date with a batch of new records twice: with a full retrain on history
+plus new records, and with train_incremental() (forests grow trees fitted
+on the new records, gradient boosting is refitted on a window of recent
+rows). Reports the time of each and the R² of both model sets on the same
+fresh holdout records.
+
+Usage: python src/benchmarks/bench_incremental.py [new_records] [history sizes...]
+"""
+import os
+import sys
+import contextlib
+import io
+import random
+import tempfile
+import time
+import numpy as np
+from sklearn.metrics import r2_score
+
+# Add the src directory to the path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from ml_models.model_proto import AirPollutionPredictor, create_dummy_data
+
+
+def holdout_r2(predictor: AirPollutionPredictor, records) -> float:
+    """Mean R² over the targets on records the models have not seen"""
+    predictions = predictor.predict_batch(records)
+    scores = []
+    for target in predictor.models:
+        y = np.array([r['current_pollution'][target] for r in records])
+        scores.append(r2_score(y, [p[target] for p in predictions]))
+    return float(np.mean(scores))
+
+
+def timed(fn) -> float:
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        fn()
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    n_new = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    sizes = [int(n) for n in sys.argv[2:]] or [2000, 8000, 20000]
+
+    random.seed(0)
+    new = create_dummy_data(n_new)
+    holdout = create_dummy_data(1000)
+
+    rows = []
+    for size in sizes:
+        history = create_dummy_data(size)
+        with tempfile.TemporaryDirectory() as model_dir:
+            full = AirPollutionPredictor(model_save_path=model_dir)
+            full_time = timed(lambda: full.train_models(history + new))
+
+            incremental = AirPollutionPredictor(model_save_path=model_dir)
+            timed(lambda: incremental.train_models(history))
+            base_r2 = holdout_r2(incremental, holdout)
+            update_time = timed(lambda: incremental.retrain_with_new_data(new, history))
+            strategies = sorted({type(m).__name__ for m in incremental.models.values()})
+
+            rows.append((size, full_time, update_time, holdout_r2(full, holdout), base_r2,
+                         holdout_r2(incremental, holdout), strategies))
+
+    print(f"\n{n_new} new records, holdout of {len(holdout)} records")
+    print(f"{'history':>8} {'full s':>8} {'incr. s':>8} {'full R²':>8} {'before R²':>10} {'incr. R²':>9}  models")
+    for size, full_time, update_time, full_r2, base_r2, incr_r2, strategies in rows:
+        print(f"{size:>8} {full_time:>8.2f} {update_time:>8.2f} {full_r2:>8.4f} {base_r2:>10.4f} "
+              f"{incr_r2:>9.4f}  {', '.join(strategies)}")
@@ -0,0 +1,81 @@
+"""
+Benchmark: single-record prediction latency.
+
+Compares the original DataFrame-based prediction (prepare_features on one
+record, then a scaler transform and model.predict per target) with the
+compiled path behind `AirPollutionPredictor.predict`, with per-target and
+shared scaling.
+
+Usage: python src/benchmarks/bench_inference.py [n_calls]
+"""
+import os
+import sys
+import random
+import tempfile
+import time
+import numpy as np
+from typing import Dict
+
+# Add the src directory to the path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from ml_models.model_proto import AirPollutionPredictor, create_dummy_data
+
+
+def legacy_predict(predictor: AirPollutionPredictor, data: Dict) -> Dict:
+    """The original prediction path, kept as the baseline"""
+    df = predictor.prepare_features([data])
+    X = df[predictor.feature_columns]
+
+    predictions = {}
+    for target in predictor.target_columns:
+        if target in predictor.models and target in predictor.scalers:
+            X_scaled = predictor.scalers[target].transform(X)
+            pred = predictor.models[target].predict(X_scaled)[0]
+            predictions[target] = max(0, pred)
+    return predictions
+
+
+def latency(func, records, n_calls: int) -> np.ndarray:
+    """Per-call latency in microseconds"""
+    timings = np.empty(n_calls)
+    for i in range(n_calls):
+        record = records[i % len(records)]
+        start = time.perf_counter()
+        func(record)
+        timings[i] = (time.perf_counter() - start) * 1e6
+    return timings
+
+
+def report(name: str, timings: np.ndarray):
+    print(f"{name:>10}: p50 {np.percentile(timings, 50):>9.0f} us | "
+          f"p99 {np.percentile(timings, 99):>9.0f} us | mean {timings.mean():>9.0f} us")
+
+
+if __name__ == "__main__":
+    random.seed(0)
+    n_calls = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+
+    with tempfile.TemporaryDirectory() as model_dir:
+        training_data = create_dummy_data(500)
+
+        # The legacy path needs one scaler per target
+        predictor = AirPollutionPredictor(model_save_path=model_dir, scaling='per_target')
+        predictor.train_models(training_data)
+        shared = AirPollutionPredictor(model_save_path=model_dir, scaling='shared')
+        shared.train_models(training_data)
+
+        records = create_dummy_data(50)
+        for record in records:
+            legacy = legacy_predict(predictor, record)
+            # The legacy path encodes every single record's weather as 0
+            record['current_weather']['weather_condition'] = predictor.weather_classes[0]
+            compiled = predictor.predict(record)
+            for target, value in legacy.items():
+                assert np.isclose(value, compiled[target]), (target, value, compiled[target])
+
+        predictor.predict(records[0])  # Build the inference plans outside the timing
+        shared.predict(records[0])
+        report('legacy', latency(lambda r: legacy_predict(predictor, r), records, n_calls))
+        report('compiled', latency(predictor.predict, records, n_calls))
+        report('shared', latency(shared.predict, records, n_calls))
@@ -0,0 +1,93 @@
+"""
+Benchmark: /predict latency with a slow or failing satellite upstream.
+
+Calls the API's /predict in process with the weather collection replaced
+by a fixed 200 ms delay and satellite enrichment by a stand-in that is
+fast (100 ms), slow (3 s) or failing after 2 s. For each case it reports
+the request latency, the data sources used and the per-source timings of
+the last response, next to the latency of the previous sequential flow
+(weather, then satellite) for the same delays.
+
+Usage: python src/benchmarks/bench_latency_budget.py [requests_per_case]
+"""
+import os
+import sys
+import asyncio
+import random
+import tempfile
+import time
+import httpx
+import numpy as np
+
+# Add the src directory to the path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import api.main as main
+from data_collection.observation_store import ObservationStore
+from ml_models.model_proto import create_dummy_data
+
+WEATHER_DELAY = 0.2
+
+CASES = {
+    'fast': (0.1, False),
+    'slow': (3.0, False),
+    'failing': (2.0, True),
+}
+
+
+def make_satellite(delay: float, fail: bool):
+    def get_comprehensive_satellite_data(lat, lon):
+        time.sleep(delay)
+        if fail:
+            raise RuntimeError("Earth Engine request failed")
+        return {'atmospheric': {'satellite_data': {'no2': 1e-4}}, 'surface': None,
+                'location': {'lat': lat, 'lon': lon}}
+    return get_comprehensive_satellite_data
+
+
+async def run_case(client: httpx.AsyncClient, n: int):
+    latencies, body = [], None
+    for _ in range(n):
+        start = time.perf_counter()
+        response = await client.post("/predict", json={"latitude": 28.6, "longitude": 77.2})
+        response.raise_for_status()
+        latencies.append((time.perf_counter() - start) * 1000)
+        body = response.json()
+    return np.array(latencies), body
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 6
+
+    random.seed(0)
+    record = create_dummy_data(1)[0]
+
+    async def collect_comprehensive_data(lat, lon):
+        await asyncio.sleep(WEATHER_DELAY)
+        return dict(record)
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        main.predictor.model_save_path = work_dir
+        main.predictor.train_models(create_dummy_data(300))
+        main.collected_data = ObservationStore(os.path.join(work_dir, 'observations'))
+        main.weather_client.collect_comprehensive_data = collect_comprehensive_data
+
+        async def bench():
+            transport = httpx.ASGITransport(app=main.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://api") as client:
+                for name, (delay, fail) in CASES.items():
+                    main.earth_client.get_comprehensive_satellite_data = make_satellite(delay, fail)
+                    main.satellite_enrichment.breaker.record_success()
+                    latencies, body = await run_case(client, n)
+                    timings = ', '.join(f"{k} {v:.0f}" for k, v in body['timings'].items())
+                    print(f"\n{name}: satellite {delay:.1f} s{' then fails' if fail else ''}, "
+                          f"sequential flow ~{(WEATHER_DELAY + delay) * 1000:.0f} ms")
+                    print(f"  latency p50 {np.percentile(latencies, 50):.0f} ms, "
+                          f"max {latencies.max():.0f} ms over {n} requests")
+                    print(f"  last response: sources {body['data_sources']}, "
+                          f"skipped {body['skipped_sources']}, timings (ms) {timings}")
+                    print(f"  breaker {main.satellite_enrichment.stats()}")
+
+        asyncio.run(bench())
+        main.satellite_enrichment.shutdown()
+    print(f"\nlatency budget: {main.satellite_enrichment.budget:.1f} s")
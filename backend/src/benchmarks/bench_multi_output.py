@@ -0,0 +1,51 @@
+"""
+Benchmark: five per-target models vs one multi-output forest.
+
+Reports per-target R², per-request prediction latency and the pickled size
+of the models for both engines of `AirPollutionPredictor`.
+
+Usage: python src/benchmarks/bench_multi_output.py [n_samples]
+"""
+import os
+import sys
+import pickle
+import random
+import tempfile
+import numpy as np
+
+# Add the src directory to the path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from ml_models.model_proto import AirPollutionPredictor, create_dummy_data
+from benchmarks.bench_inference import latency
+
+
+def model_size(predictor: AirPollutionPredictor) -> int:
+    """Pickled size in bytes of the distinct trained models"""
+    models = {id(model): model for model in predictor.models.values()}
+    return sum(len(pickle.dumps(model)) for model in models.values())
+
+
+if __name__ == "__main__":
+    random.seed(0)
+    n_samples = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    training_data = create_dummy_data(n_samples)
+    records = create_dummy_data(50)
+
+    with tempfile.TemporaryDirectory() as model_dir:
+        engines = {
+            'per_target': AirPollutionPredictor(model_save_path=model_dir),
+            'multi_output': AirPollutionPredictor(model_save_path=model_dir, engine='multi_output'),
+        }
+
+        rows = []
+        for name, predictor in engines.items():
+            results = predictor.train_models(training_data)
+            predictor.predict(records[0])
+            timings = latency(predictor.predict, records, 200)
+            rows.append((name, results, np.percentile(timings, 50), model_size(predictor)))
+
+    print()
+    for name, results, p50, size in rows:
+        scores = ' '.join(f"{t}={m['r2_score']:.3f}" for t, m in results.items())
+        print(f"{name:>12}: p50 {p50:>7.0f} us | models {size / 1e6:>7.1f} MB | R² {scores}")
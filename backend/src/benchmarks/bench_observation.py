@@ -0,0 +1,89 @@
+"""
+Benchmark: memory per collected sample, dict records vs Observation.
+
+Builds records shaped like AsyncWeatherAPIClient.collect_comprehensive_data
+output (7-day hourly history with all components and datetime objects),
+then measures the heap they hold as dicts and as compact Observations.
+Also checks that both give the same feature frame and the same compiled
+inference row.
+
+Usage: python src/benchmarks/bench_observation.py [n_records]
+"""
+import os
+import sys
+import gc
+import random
+import tempfile
+import tracemalloc
+import numpy as np
+import pandas as pd
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+# Add the src directory to the path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from ml_models.features import build_feature_frame
+from ml_models.model_proto import AirPollutionPredictor, create_dummy_data
+from ml_models.observation import Observation, as_observations
+
+HISTORY_HOURS = 168
+
+
+def collected_record(now: datetime) -> Dict:
+    """One record as returned by the collection clients"""
+    record = create_dummy_data(1)[0]
+    record['collected_at'] = now
+    record['historical_pollution'] = [
+        {
+            'timestamp': now - timedelta(hours=h),
+            'aqi': random.randint(1, 5),
+            'co': random.uniform(200, 400),
+            'no': random.uniform(0, 5),
+            'no2': random.uniform(0, 60),
+            'o3': random.uniform(0, 100),
+            'so2': random.uniform(0, 20),
+            'pm2_5': random.uniform(0, 80),
+            'pm10': random.uniform(0, 120),
+            'nh3': random.uniform(0, 10),
+        }
+        for h in range(HISTORY_HOURS, 0, -1)
+    ]
+    return record
+
+
+def held_bytes(build) -> tuple:
+    """(result, bytes still allocated after building it)"""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    gc.collect()
+    held = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, held
+
+
+if __name__ == "__main__":
+    n_records = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+
+    random.seed(0)
+    now = datetime.now()
+    records, dict_bytes = held_bytes(lambda: [collected_record(now) for _ in range(n_records)])
+    observations, observation_bytes = held_bytes(lambda: as_observations(records))
+
+    pd.testing.assert_frame_equal(build_feature_frame(records), build_feature_frame(observations))
+
+    with tempfile.TemporaryDirectory() as model_dir:
+        predictor = AirPollutionPredictor(model_save_path=model_dir)
+        predictor.train_models(records[:300])
+    inference = predictor._get_inference()
+    for record, observation in zip(records[:50], observations[:50]):
+        expected = inference.fill_row(record, np.zeros(len(inference.feature_columns)))
+        actual = inference.fill_row(observation, np.zeros(len(inference.feature_columns)))
+        assert np.allclose(expected, actual), (expected, actual)
+
+    print(f"\n{n_records} records with {HISTORY_HOURS} h of history")
+    print(f"{'dict':>12}: {dict_bytes / n_records:>9.0f} bytes/sample")
+    print(f"{'Observation':>12}: {observation_bytes / n_records:>9.0f} bytes/sample "
+          f"({len(observations[0].to_bytes())} bytes stored)")
+    print(f"{'reduction':>12}: {dict_bytes / observation_bytes:>9.1f}x")
@@ -0,0 +1,72 @@
+"""
+Benchmark: memory held for collected observations and for retraining.
+
+Compares the original in-process list of records with ObservationStore:
+the heap retained after collecting n records, and the peak heap while the
+feature frame for retraining is built (from the full list, and from the
+store in chunks). Both paths must produce the same frame.
+
+Usage: python src/benchmarks/bench_observation_store.py [n_records] [chunk_size]
+"""
+import os
+import sys
+import gc
+import random
+import tempfile
+import tracemalloc
+import pandas as pd
+
+# Add the src directory to the path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from data_collection.observation_store import ObservationStore
+from ml_models.features import build_feature_frame, build_feature_frame_chunked
+from ml_models.model_proto import create_dummy_data
+
+
+def traced(fn):
+    """(result, retained MB, peak MB) of calling fn"""
+    gc.collect()
+    tracemalloc.start()
+    result = fn()
+    gc.collect()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, retained / 1e6, peak / 1e6
+
+
+if __name__ == "__main__":
+    n_records = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    chunk_size = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+
+    random.seed(0)
+    with tempfile.TemporaryDirectory() as path:
+        def collect_list():
+            random.seed(1)
+            return create_dummy_data(n_records)
+
+        def collect_store():
+            random.seed(1)
+            store = ObservationStore(path)
+            for start in range(0, n_records, chunk_size):
+                for record in create_dummy_data(min(chunk_size, n_records - start)):
+                    store.append(record)
+            return store
+
+        records, list_mb, _ = traced(collect_list)
+        store, store_mb, _ = traced(collect_store)
+
+        # The store serves records grouped by day; compare frames in that order
+        order = [record for chunk in store.iter_chunks(chunk_size) for record in chunk]
+        expected = build_feature_frame(order)
+        del order
+
+        _, _, list_peak = traced(lambda: build_feature_frame(records))
+        del records
+        chunked, _, store_peak = traced(lambda: build_feature_frame_chunked(store.iter_chunks(chunk_size)))
+        pd.testing.assert_frame_equal(expected, chunked)
+
+        print(f"\n{n_records} records, chunks of {chunk_size}, {store.stats()['bytes'] / 1e6:.1f} MB on disk")
+        print(f"{'':>14} {'held MB':>9} {'retrain peak MB':>16}")
+        print(f"{'list':>14} {list_mb:>9.1f} {list_peak:>16.1f}")
+        print(f"{'store':>14} {store_mb:>9.1f} {store_peak:>16.1f}")
@@ -0,0 +1,135 @@
+"""
+Benchmark: nearest-neighbour and region queries over collected observations.
+
+Indexes n observations collected over the last hour across a city-sized
+box. It times nearby() (500 m radius) and region() (1 km and 10 km boxes)
+and compares them with scanning the same observations, which is what
+answering such a query from ObservationStore alone would take (the scan
+is done in memory and does not include the read from disk). Then, in
+process, it calls /predict for points next to a fresh observation and
+for points far from any, with a 200 ms stand-in for weather collection.
+
+Usage: python src/benchmarks/bench_spatial_index.py [n_observations]
+"""
+import os
+import sys
+import asyncio
+import copy
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+import httpx
+import numpy as np
+
+# Add the src directory to the path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import api.main as main
+from data_collection.observation_store import ObservationStore
+from data_collection.spatial_index import SpatialIndex, haversine_km
+from ml_models.model_proto import create_dummy_data
+from ml_models.observation import Observation
+
+WEATHER_DELAY = 0.2
+BOX = (28.4, 76.9, 28.8, 77.4)  # Delhi
+
+
+def timed_ms(fn, repeat: int = 200) -> np.ndarray:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return np.array(times)
+
+
+def make_observations(template: dict, n: int):
+    now = datetime.now()
+    observations = []
+    for i in range(n):
+        record = copy.deepcopy(template)
+        record['location'] = {'lat': random.uniform(BOX[0], BOX[2]), 'lon': random.uniform(BOX[1], BOX[3])}
+        record['collected_at'] = now - timedelta(seconds=3600 * (n - i) / n)
+        observations.append(Observation.from_record(record))
+    return observations
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+
+    random.seed(0)
+    template = create_dummy_data(1)[0]
+    observations = make_observations(template, n)
+    index = SpatialIndex(max_age=3600)
+    start = time.perf_counter()
+    for observation in observations:
+        index.add(observation)
+    build = time.perf_counter() - start
+
+    points = [(random.uniform(BOX[0], BOX[2]), random.uniform(BOX[1], BOX[3])) for _ in range(200)]
+    locations = [(o.location['lat'], o.location['lon'], o) for o in observations]
+    it = iter(points * 100)
+
+    def scan_nearby():
+        lat, lon = next(it)
+        return sorted((haversine_km(lat, lon, a, b), o) for a, b, o in locations
+                      if haversine_km(lat, lon, a, b) <= 0.5)
+
+    def scan_region(half):
+        lat, lon = next(it)
+        return [o for a, b, o in locations if lat - half <= a <= lat + half and lon - half <= b <= lon + half]
+
+    def region(half):
+        lat, lon = next(it)
+        return index.region(lat - half, lon - half, lat + half, lon + half)
+
+    print(f"\n{n} observations over the last hour, indexed in {build:.2f} s ({index.stats()['cells']} cells)")
+    rows = [
+        ("nearby 500 m", timed_ms(lambda: index.nearby(*next(it), 0.5)), timed_ms(scan_nearby, 5)),
+        ("region 1 km", timed_ms(lambda: region(0.0045)), timed_ms(lambda: scan_region(0.0045), 5)),
+        ("region 10 km", timed_ms(lambda: region(0.045)), timed_ms(lambda: scan_region(0.045), 5)),
+    ]
+    print(f"{'query':>14} {'index p50 ms':>13} {'index p99 ms':>13} {'scan p50 ms':>12}")
+    for name, indexed, scanned in rows:
+        print(f"{name:>14} {np.percentile(indexed, 50):>13.3f} {np.percentile(indexed, 99):>13.3f} "
+              f"{np.percentile(scanned, 50):>12.1f}")
+
+    async def collect_comprehensive_data(lat, lon):
+        await asyncio.sleep(WEATHER_DELAY)
+        record = copy.deepcopy(template)
+        record['location'] = {'lat': lat, 'lon': lon}
+        record['collected_at'] = datetime.now()
+        return record
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        main.predictor.model_save_path = work_dir
+        main.predictor.train_models(create_dummy_data(300))
+        main.observation_index = SpatialIndex(max_age=3600)
+        main.collected_data = ObservationStore(os.path.join(work_dir, 'observations'), index=main.observation_index)
+        main.weather_client.collect_comprehensive_data = collect_comprehensive_data
+        main.earth_client.get_comprehensive_satellite_data = lambda lat, lon: None
+
+        async def bench():
+            transport = httpx.ASGITransport(app=main.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://api") as client:
+                async def predict(lat, lon):
+                    start = time.perf_counter()
+                    response = await client.post("/predict", json={"latitude": lat, "longitude": lon})
+                    response.raise_for_status()
+                    return (time.perf_counter() - start) * 1000, response.json()
+
+                far, near = [], []
+                for i in range(10):
+                    lat, lon = 28.45 + i * 0.03, 77.0
+                    far.append(await predict(lat, lon))  # collected, then indexed
+                    near.append(await predict(lat + 0.001, lon + 0.001))  # ~150 m away
+            return far, near
+
+        far, near = asyncio.run(bench())
+        main.satellite_enrichment.shutdown()
+
+    print(f"\n/predict, collected: p50 {np.median([ms for ms, _ in far]):.1f} ms, "
+          f"sources {far[-1][1]['data_sources']}")
+    print(f"/predict, 150 m from a fresh observation: p50 {np.median([ms for ms, _ in near]):.1f} ms, "
+          f"sources {near[-1][1]['data_sources']}, nearest {near[-1][1]['nearby_observations'][0]['distance_km']} km")
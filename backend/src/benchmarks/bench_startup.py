@@ -0,0 +1,84 @@
+"""
+Benchmark: API startup and satellite calls without Earth Engine.
+
+Starts the API (uvicorn src.api.main:app, as command.sh does) and polls
+/health from the moment the process is launched until it answers; Earth
+Engine is not touched until the first satellite request. Then, in this
+process, it times the eager initialization that the client used to run on
+construction, and satellite enrichment of a location while the first
+(background) initialization runs and once EE is known to be unavailable.
+
+Run without Earth Engine credentials or network to see the offline case.
+
+Usage: python src/benchmarks/bench_startup.py [port]
+"""
+import os
+import sys
+import subprocess
+import time
+import httpx
+import numpy as np
+
+# Add the src directory to the path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from data_collection.google_earth import GoogleEarthClient
+from data_collection.satellite_cache import SatelliteCache
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..')
+
+
+def time_to_health(port: int, timeout: float = 60) -> dict:
+    """Seconds from launch to the first /health answer, and the EE status then"""
+    env = dict(os.environ, MODEL_RELOAD_INTERVAL='0')
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'src.api.main:app', '--port', str(port), '--log-level', 'warning'],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    result = {}
+    try:
+        while time.perf_counter() - start < timeout:
+            try:
+                health = httpx.get(f"http://127.0.0.1:{port}/health", timeout=5).json()
+            except httpx.HTTPError:
+                time.sleep(0.02)
+                continue
+            result['healthy'] = time.perf_counter() - start
+            result['ee_status'] = health['earth_engine']['status']
+            break
+    finally:
+        server.terminate()
+        server.wait()
+    return result
+
+
+if __name__ == "__main__":
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8017
+
+    startup = time_to_health(port)
+
+    client = GoogleEarthClient(cache=SatelliteCache(':memory:'))
+    start = time.perf_counter()
+    client.initialize_ee()
+    eager = time.perf_counter() - start
+
+    # The first request starts the initialization and waits at most init_wait
+    client = GoogleEarthClient(cache=SatelliteCache(':memory:'))
+    start = time.perf_counter()
+    client.get_comprehensive_satellite_data(28.6, 77.2)
+    first = time.perf_counter() - start
+    client._init_thread.join()
+
+    calls = []
+    for i in range(20):
+        start = time.perf_counter()
+        client.get_comprehensive_satellite_data(28.6 + i, 77.2)
+        calls.append((time.perf_counter() - start) * 1000)
+
+    print(f"\nAPI process launch to first /health: {startup['healthy']:.2f} s "
+          f"(Earth Engine {startup['ee_status']})")
+    print(f"eager EE initialization (previously in the constructor): {eager:.2f} s")
+    print(f"first satellite enrichment, initialization in the background: {first:.2f} s")
+    print(f"satellite enrichment with EE {client.status}: p50 {np.percentile(calls, 50):.2f} ms, "
+          f"max {max(calls):.2f} ms")
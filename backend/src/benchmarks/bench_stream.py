@@ -0,0 +1,122 @@
+"""
+Benchmark: time to first result and memory of batch prediction.
+
+Serves the list-based batch handler (BatchPredictionEngine.run, the whole
+result at once) and the NDJSON streaming handler (BatchPredictionEngine.stream)
+in a small API backed by the mock OpenWeather server. It posts the same
+locations to both and reports the time to the first result, the total
+time, and the peak memory traced while the request was served. Response
+caches are disabled and the history store is kept small, so only the
+request itself shows up in the memory figure.
+
+Usage: python src/benchmarks/bench_stream.py [n_locations...] (default: 50 200)
+"""
+import os
+import sys
+import asyncio
+import json
+import random
+import tempfile
+import threading
+import time
+import tracemalloc
+import httpx
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+from typing import Dict, List
+
+# Add the src directory to the path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from benchmarks import mock_openweather
+from api.batch import BatchPredictionEngine, spool, file_chunks, iter_lines, parse_ndjson
+from data_collection.cache import ResponseCache
+from data_collection.history_store import PollutionHistoryStore
+from data_collection.weather_api import AsyncWeatherAPIClient
+from ml_models.model_proto import AirPollutionPredictor, create_dummy_data
+
+MOCK_PORT = 8013
+API_PORT = 8014
+BASE_URL = f"http://127.0.0.1:{MOCK_PORT}/data/2.5"
+LATENCY_MS = 20
+
+
+def build_app(predictor: AirPollutionPredictor) -> FastAPI:
+    app = FastAPI()
+    client = AsyncWeatherAPIClient(
+        base_url=BASE_URL,
+        cache=ResponseCache(max_entries=0),
+        history_store=PollutionHistoryStore(max_locations=16)
+    )
+    engine = BatchPredictionEngine(client, predictor, max_concurrency=32, rate=0)
+
+    @app.post("/list")
+    async def predict_list(request: Request):
+        return {"results": await engine.run(json.loads(await request.body()))}
+
+    @app.post("/stream")
+    async def predict_stream(request: Request):
+        body = await spool(request.stream())
+
+        async def lines():
+            async for result in engine.stream(parse_ndjson(iter_lines(file_chunks(body)))):
+                yield json.dumps(result) + "\n"
+            body.close()
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    return app
+
+
+async def measure(path: str, locations: List[Dict]) -> Dict:
+    """Time to first result, total time and peak traced memory of one request"""
+    if path == "/list":
+        body = json.dumps(locations).encode()
+        headers = {"content-type": "application/json"}
+    else:
+        body = "".join(json.dumps(location) + "\n" for location in locations).encode()
+        headers = {"content-type": "application/x-ndjson"}
+
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    baseline = tracemalloc.get_traced_memory()[0]
+    first = None
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{API_PORT}", timeout=600) as client:
+        start = time.perf_counter()
+        async with client.stream("POST", path, content=body, headers=headers) as response:
+            async for line in response.aiter_lines():
+                if first is None and line.strip():
+                    first = time.perf_counter() - start
+                # Discard the output, like a client that writes it out
+        total = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1] - baseline
+    tracemalloc.stop()
+    return {'first': first, 'total': total, 'peak_mb': peak / 1e6}
+
+
+if __name__ == "__main__":
+    sizes = [int(n) for n in sys.argv[1:]] or [50, 200]
+
+    random.seed(0)
+    with tempfile.TemporaryDirectory() as model_dir:
+        predictor = AirPollutionPredictor(model_save_path=model_dir)
+        predictor.train_models(create_dummy_data(300))
+
+    mock_openweather.run_in_thread(MOCK_PORT, LATENCY_MS)
+    server = uvicorn.Server(uvicorn.Config(build_app(predictor), host="127.0.0.1",
+                                           port=API_PORT, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+
+    print(f"\nupstream latency {LATENCY_MS} ms")
+    print(f"{'locations':>10} {'endpoint':>8} {'first result':>13} {'total':>8} {'peak MB':>8}")
+    for n in sizes:
+        locations = [
+            {"latitude": random.uniform(-60, 60), "longitude": random.uniform(-180, 180)}
+            for _ in range(n)
+        ]
+        for path in ("/list", "/stream"):
+            result = asyncio.run(measure(path, locations))
+            print(f"{n:>10} {path:>8} {result['first'] * 1000:>10.0f} ms {result['total']:>6.1f} s "
+                  f"{result['peak_mb']:>8.1f}")
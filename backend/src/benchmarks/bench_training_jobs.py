@@ -0,0 +1,127 @@
+"""
+Benchmark: /predict latency while the models are retrained.
+
+Serves a small API with a /predict endpoint (a stored record, no upstream
+calls) and a /retrain endpoint, then polls /predict while a retrain runs.
+'inline' retrains in an async background task on the event loop, like the
+original handlers; 'job' submits the retrain to TrainingJobManager and
+polls /train/{job_id} until it completes. Reports /predict latency
+percentiles during the retrain and how long the retrain took.
+
+Usage: python src/benchmarks/bench_training_jobs.py [n_records] [executor]
+"""
+import os
+import sys
+import asyncio
+import random
+import tempfile
+import threading
+import time
+import httpx
+import numpy as np
+import uvicorn
+from fastapi import FastAPI, BackgroundTasks, HTTPException
+from typing import Dict, List
+
+# Add the src directory to the path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from api.jobs import TrainingJobManager
+from data_collection.observation_store import ObservationStore
+from ml_models.model_proto import AirPollutionPredictor, create_dummy_data
+
+API_PORT = 8015
+
+
+def build_app(predictor: AirPollutionPredictor, store: ObservationStore,
+              jobs: TrainingJobManager) -> FastAPI:
+    app = FastAPI()
+    record = create_dummy_data(1)[0]
+
+    @app.get("/predict")
+    async def predict():
+        return predictor.predict(record)
+
+    @app.post("/retrain/inline")
+    async def retrain_inline(background_tasks: BackgroundTasks):
+        async def retrain():
+            predictor.train_models_chunked(store.iter_chunks())
+        background_tasks.add_task(retrain)
+        return {"status": "retraining_started"}
+
+    @app.post("/retrain/job")
+    async def retrain_job():
+        job = jobs.create("retrain")
+        jobs.submit(job, store_path=store.path, store_size=len(store))
+        return {"job_id": job.job_id}
+
+    @app.get("/train/{job_id}")
+    async def job_status(job_id: str):
+        job = jobs.get(job_id)
+        if job is None:
+            raise HTTPException(status_code=404)
+        return job.to_dict()
+
+    return app
+
+
+async def measure(mode: str, timeout: float = 600) -> Dict:
+    """/predict latencies (ms) while one retrain runs, and the retrain time"""
+    latencies: List[float] = []
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{API_PORT}", timeout=timeout) as client:
+        await client.get("/predict")
+        start = time.perf_counter()
+        response = await client.post(f"/retrain/{mode}")
+        job_id = response.json().get("job_id")
+        finished = None
+
+        while time.perf_counter() - start < timeout:
+            t0 = time.perf_counter()
+            await client.get("/predict")
+            latencies.append((time.perf_counter() - t0) * 1000)
+
+            if job_id:
+                status = (await client.get(f"/train/{job_id}")).json()
+                if status["status"] in ("completed", "failed"):
+                    finished = status
+                    break
+            elif time.perf_counter() - t0 > 1.0:
+                # The inline retrain held the loop for this whole request
+                break
+            await asyncio.sleep(0.02)
+        total = time.perf_counter() - start
+
+    return {'latencies': np.array(latencies), 'total': total, 'job': finished}
+
+
+if __name__ == "__main__":
+    n_records = int(sys.argv[1]) if len(sys.argv) > 1 else 3000
+    executor = sys.argv[2] if len(sys.argv) > 2 else 'process'
+
+    random.seed(0)
+    with tempfile.TemporaryDirectory() as path:
+        store = ObservationStore(os.path.join(path, 'observations'))
+        for record in create_dummy_data(n_records):
+            store.append(record)
+
+        predictor = AirPollutionPredictor(model_save_path=os.path.join(path, 'models'))
+        predictor.train_models(create_dummy_data(300))
+        jobs = TrainingJobManager(predictor.config(), executor=executor,
+                                  on_complete=lambda job: predictor.load_models(job.model_version))
+
+        server = uvicorn.Server(uvicorn.Config(build_app(predictor, store, jobs), host="127.0.0.1",
+                                               port=API_PORT, log_level="warning"))
+        threading.Thread(target=server.run, daemon=True).start()
+        while not server.started:
+            time.sleep(0.01)
+
+        print(f"\n{n_records} stored records, {executor} executor")
+        print(f"{'mode':>8} {'requests':>9} {'p50 ms':>9} {'p99 ms':>9} {'max ms':>9} {'retrain s':>10}")
+        for mode in ("inline", "job"):
+            result = asyncio.run(measure(mode))
+            latencies = result['latencies']
+            if result['job'] is not None:
+                assert result['job']['status'] == 'completed', result['job']
+            print(f"{mode:>8} {len(latencies):>9} {np.percentile(latencies, 50):>9.1f} "
+                  f"{np.percentile(latencies, 99):>9.1f} {latencies.max():>9.1f} {result['total']:>10.1f}")
+        jobs.shutdown()
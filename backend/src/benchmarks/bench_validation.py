@@ -0,0 +1,86 @@
+"""
+Benchmark: time-ordered holdout, early stopping and successive halving.
+
+Dummy records are given collection times every 15 minutes, in order, and a
+slowly drifting pollution level shared by all pollutants (consecutive
+readings of a real station are correlated in the same way). The first
+n_records train the models; the next quarter is the future. For each
+training setup it reports the training time, the mean R² training reports
+on its holdout and the mean R² on the future records. A random holdout has
+neighbours of its rows in the training rows, so its R² says more about
+the drift than about how the models do on later data.
+
+Usage: python src/benchmarks/bench_validation.py [n_records]
+"""
+import os
+import sys
+import contextlib
+import io
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+import numpy as np
+from sklearn.metrics import r2_score
+
+# Add the src directory to the path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from ml_models.model_proto import AirPollutionPredictor, create_dummy_data
+
+HGB = ['hist_gradient_boosting']
+SETUPS = [
+    ("random holdout, all fits (before)", dict(holdout='random', early_stopping=False, search=False, halving_eta=1)),
+    ("time holdout", dict(holdout='time', early_stopping=False, search=False, halving_eta=1)),
+    ("+ early stopping", dict(holdout='time', early_stopping=True, search=False, halving_eta=1)),
+    ("+ successive halving", dict(holdout='time', early_stopping=True, search=False, halving_eta=3)),
+    ("+ configuration search", dict(holdout='time', early_stopping=True, search=True, halving_eta=3)),
+    ("search without halving", dict(holdout='time', early_stopping=True, search=True, halving_eta=1)),
+    ("hist_gradient_boosting, all stages", dict(candidates=HGB, early_stopping=False, search=False)),
+    ("hist_gradient_boosting, early stop", dict(candidates=HGB, early_stopping=True, search=False)),
+]
+
+
+def drifting_records(n: int) -> list:
+    """Dummy records 15 minutes apart with an AR(1) drift added to the current pollution"""
+    records = create_dummy_data(n)
+    start = datetime.now() - timedelta(minutes=15 * n)
+    drift = 0.0
+    for i, record in enumerate(records):
+        drift = 0.995 * drift + random.gauss(0, 2)
+        record['collected_at'] = start + timedelta(minutes=15 * i)
+        pollution = record['current_pollution']
+        for key in pollution:
+            pollution[key] = max(1, pollution[key] + drift)
+    return records
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+
+    random.seed(0)
+    records = drifting_records(n + n // 4)
+    train, future = records[:n], records[n:]
+
+    rows = []
+    for label, options in SETUPS:
+        with tempfile.TemporaryDirectory() as model_dir:
+            predictor = AirPollutionPredictor(model_save_path=model_dir, **options)
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                results = predictor.train_models(train)
+            train_time = time.perf_counter() - start
+
+            predictions = predictor.predict_batch(future)
+            future_r2 = np.mean([
+                r2_score([r['current_pollution'][t] for r in future], [p[t] for p in predictions])
+                for t in results
+            ])
+            holdout_r2 = np.mean([m['r2_score'] for m in results.values()])
+            selected = sorted({m['model'] for m in results.values()})
+            rows.append((label, train_time, holdout_r2, future_r2, selected))
+
+    print(f"\n{n} training records, {len(future)} future records")
+    print(f"{'setup':>34} {'train s':>8} {'holdout R²':>11} {'future R²':>10}  selected")
+    for label, train_time, holdout_r2, future_r2, selected in rows:
+        print(f"{label:>34} {train_time:>8.2f} {holdout_r2:>11.4f} {future_r2:>10.4f}  {', '.join(selected)}")
@@ -0,0 +1,93 @@
+"""
+Benchmark: /predict throughput with the blocking and the async weather client.
+
+Starts the mock OpenWeather server with a fixed upstream latency and a small
+API that mirrors the /predict handler (collect weather data, then predict)
+once with the blocking WeatherAPIClient and once with AsyncWeatherAPIClient.
+Both are loaded with concurrent HTTP requests and requests/sec is reported.
+Satellite enrichment is left out, it is the same for both clients.
+
+Usage: python src/benchmarks/bench_weather_client.py [concurrency] [n_requests] [latency_ms]
+"""
+import os
+import sys
+import asyncio
+import random
+import tempfile
+import time
+import httpx
+import uvicorn
+import threading
+from fastapi import FastAPI
+
+# Add the src directory to the path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from benchmarks import mock_openweather
+from data_collection.weather_api import WeatherAPIClient, AsyncWeatherAPIClient
+from ml_models.model_proto import AirPollutionPredictor, create_dummy_data
+
+MOCK_PORT = 8010
+API_PORT = 8011
+BASE_URL = f"http://127.0.0.1:{MOCK_PORT}/data/2.5"
+
+
+def build_app(predictor: AirPollutionPredictor) -> FastAPI:
+    """Two copies of the /predict handler, one per client"""
+    app = FastAPI()
+    blocking_client = WeatherAPIClient(base_url=BASE_URL)
+    async_client = AsyncWeatherAPIClient(base_url=BASE_URL)
+
+    @app.post("/predict/blocking")
+    async def predict_blocking(lat: float, lon: float):
+        weather_data = blocking_client.collect_comprehensive_data(lat, lon)
+        return predictor.predict(weather_data)
+
+    @app.post("/predict/async")
+    async def predict_async(lat: float, lon: float):
+        weather_data = await async_client.collect_comprehensive_data(lat, lon)
+        return predictor.predict(weather_data)
+
+    return app
+
+
+async def load(path: str, concurrency: int, n_requests: int) -> float:
+    """Fire n_requests with the given concurrency; returns requests/sec"""
+    queue = asyncio.Queue()
+    for _ in range(n_requests):
+        queue.put_nowait((random.uniform(-60, 60), random.uniform(-180, 180)))
+
+    async def worker(client: httpx.AsyncClient):
+        while not queue.empty():
+            lat, lon = queue.get_nowait()
+            response = await client.post(path, params={'lat': lat, 'lon': lon})
+            response.raise_for_status()
+
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{API_PORT}", limits=limits, timeout=120) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        return n_requests / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    concurrency = int(sys.argv[1]) if len(sys.argv) > 1 else 32
+    n_requests = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    latency_ms = float(sys.argv[3]) if len(sys.argv) > 3 else 50
+
+    random.seed(0)
+    with tempfile.TemporaryDirectory() as model_dir:
+        predictor = AirPollutionPredictor(model_save_path=model_dir)
+        predictor.train_models(create_dummy_data(300))
+
+    mock_openweather.run_in_thread(MOCK_PORT, latency_ms)
+    server = uvicorn.Server(uvicorn.Config(build_app(predictor), host="127.0.0.1",
+                                           port=API_PORT, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+
+    print(f"\nconcurrency {concurrency}, {n_requests} requests, upstream latency {latency_ms:.0f} ms")
+    for name in ('blocking', 'async'):
+        rps = asyncio.run(load(f"/predict/{name}", concurrency, n_requests))
+        print(f"{name:>10}: {rps:>8.1f} req/s")
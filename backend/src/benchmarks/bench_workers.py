@@ -0,0 +1,135 @@
+"""
+Benchmark: /predict throughput and memory with pre-forked workers.
+
+Loads a saved model version once, then serves a small API whose /predict
+endpoint predicts a stored record (no upstream calls) with api/serve.py's
+prefork() at each worker count. A closed-loop load generator keeps
+`concurrency` requests in flight for `seconds` and reports the
+throughput and latency. For the workers it reports the resident memory
+and the part of it that is private (not shared with the parent through
+copy-on-write pages).
+
+Throughput can only scale up to the number of cores; the load generator
+runs on the same machine and takes its share of them.
+
+Usage: python src/benchmarks/bench_workers.py [worker counts...] (default: 1 2 4)
+"""
+import os
+import sys
+import asyncio
+import random
+import signal
+import tempfile
+import time
+import httpx
+import numpy as np
+from fastapi import FastAPI
+from typing import Dict, List
+
+# Add the src directory to the path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from api.serve import bind, prefork
+from ml_models.model_proto import AirPollutionPredictor, create_dummy_data
+
+API_PORT = 8016
+CONCURRENCY = 32
+SECONDS = 10
+
+
+def build_app(predictor: AirPollutionPredictor) -> FastAPI:
+    app = FastAPI()
+    record = create_dummy_data(1)[0]
+
+    @app.post("/predict")
+    async def predict():
+        version = predictor.active_version
+        return {"predictions": version.predict(record), "model_version": version.version_id}
+
+    return app
+
+
+async def load(seconds: float, concurrency: int) -> Dict:
+    """Latencies (ms) of the requests completed in `seconds`, and the failed requests"""
+    latencies = []
+    errors = [0]
+    deadline = time.perf_counter() + seconds
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{API_PORT}", limits=limits,
+                                 timeout=60) as client:
+        async def user():
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                try:
+                    response = await client.post("/predict")
+                    response.raise_for_status()
+                except httpx.HTTPError:
+                    errors[0] += 1
+                    continue
+                latencies.append((time.perf_counter() - start) * 1000)
+        await asyncio.gather(*(user() for _ in range(concurrency)))
+    return {'latencies': np.array(latencies), 'errors': errors[0]}
+
+
+def memory_kb(pid: int) -> Dict[str, int]:
+    """Resident and private (dirty + clean) memory of a process"""
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if parts[0] in ('Rss:', 'Private_Clean:', 'Private_Dirty:'):
+                values[parts[0][:-1]] = int(parts[1])
+    return {'rss': values['Rss'], 'private': values['Private_Clean'] + values['Private_Dirty']}
+
+
+def worker_pids(parent: int) -> List[int]:
+    with open(f"/proc/{parent}/task/{parent}/children") as f:
+        return [int(pid) for pid in f.read().split()]
+
+
+def wait_until_up(timeout: float = 60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            httpx.post(f"http://127.0.0.1:{API_PORT}/predict", timeout=5).raise_for_status()
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError("Server did not start")
+
+
+if __name__ == "__main__":
+    counts = [int(n) for n in sys.argv[1:]] or [1, 2, 4]
+
+    random.seed(0)
+    with tempfile.TemporaryDirectory() as model_dir:
+        AirPollutionPredictor(model_save_path=model_dir).train_models(create_dummy_data(2000))
+
+        rows = []
+        for workers in counts:
+            server = os.fork()
+            if server == 0:
+                # Load once in the parent of the workers, as serve.py does
+                predictor = AirPollutionPredictor(model_save_path=model_dir)
+                predictor.load_models()
+                prefork(build_app(predictor), bind("127.0.0.1", API_PORT), workers, log_level="warning")
+                os._exit(0)
+
+            try:
+                wait_until_up()
+                asyncio.run(load(1, CONCURRENCY))  # warm up every worker
+                result = asyncio.run(load(SECONDS, CONCURRENCY))
+                latencies = result['latencies']
+                memory = [memory_kb(pid) for pid in worker_pids(server)]
+            finally:
+                os.kill(server, signal.SIGTERM)
+                os.waitpid(server, 0)
+            rows.append((workers, len(latencies) / SECONDS, np.percentile(latencies, 50),
+                         np.percentile(latencies, 99), result['errors'],
+                         np.mean([m['rss'] for m in memory]) / 1024,
+                         np.mean([m['private'] for m in memory]) / 1024))
+
+    print(f"\n{os.cpu_count()} core(s), {CONCURRENCY} concurrent requests for {SECONDS} s")
+    print(f"{'workers':>8} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7} {'RSS MB':>8} {'private MB':>11}")
+    for workers, rate, p50, p99, errors, rss, private in rows:
+        print(f"{workers:>8} {rate:>8.0f} {p50:>8.1f} {p99:>8.1f} {errors:>7} {rss:>8.0f} {private:>11.0f}")
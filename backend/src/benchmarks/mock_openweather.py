@@ -0,0 +1,99 @@
+"""
+Local mock of the OpenWeather endpoints used by WeatherAPIClient.
+
+Serves /data/2.5/weather, /data/2.5/air_pollution and
+/data/2.5/air_pollution/history with payloads shaped like the real API and
+a configurable response latency, so collection can be exercised and
+benchmarked offline.
+
+Usage: MOCK_LATENCY_MS=50 uvicorn benchmarks.mock_openweather:app --port 8010
+Then point the API at it with OPENWEATHER_BASE_URL=http://127.0.0.1:8010/data/2.5
+"""
+import asyncio
+import math
+import os
+import threading
+import time
+import uvicorn
+from fastapi import FastAPI
+from typing import Dict
+
+app = FastAPI(title="Mock OpenWeather")
+
+LATENCY_MS = float(os.getenv('MOCK_LATENCY_MS', '0'))
+
+# Request counters per endpoint
+request_counts = {'weather': 0, 'air_pollution': 0, 'air_pollution_history': 0}
+
+
+def _pollution_item(lat: float, lon: float, dt: int) -> Dict:
+    """One hourly pollution entry that varies smoothly with place and time"""
+    base = 40 + 20 * math.sin(lat) + 10 * math.cos(lon) + 15 * math.sin(dt / 3600 / 24 * 2 * math.pi)
+    return {
+        'dt': dt,
+        'main': {'aqi': 1 + int(base) % 5},
+        'components': {
+            'co': 200 + base * 3,
+            'no': base * 0.05,
+            'no2': base * 0.4,
+            'o3': base * 0.8,
+            'so2': base * 0.1,
+            'pm2_5': base * 0.6,
+            'pm10': base,
+            'nh3': base * 0.02
+        }
+    }
+
+
+async def _delay():
+    if LATENCY_MS:
+        await asyncio.sleep(LATENCY_MS / 1000)
+
+
+@app.get("/data/2.5/weather")
+async def weather(lat: float, lon: float, appid: str = None, units: str = 'metric'):
+    request_counts['weather'] += 1
+    await _delay()
+    return {
+        'dt': int(time.time()),
+        'main': {'temp': 20 + 10 * math.sin(lat), 'humidity': 60, 'pressure': 1012},
+        'wind': {'speed': 3.5, 'deg': 180},
+        'visibility': 10000,
+        'weather': [{'main': 'Clear' if lat > 0 else 'Clouds'}]
+    }
+
+
+@app.get("/data/2.5/air_pollution")
+async def air_pollution(lat: float, lon: float, appid: str = None):
+    request_counts['air_pollution'] += 1
+    await _delay()
+    return {'coord': {'lat': lat, 'lon': lon}, 'list': [_pollution_item(lat, lon, int(time.time()))]}
+
+
+@app.get("/data/2.5/air_pollution/history")
+async def air_pollution_history(lat: float, lon: float, start: int, end: int, appid: str = None):
+    request_counts['air_pollution_history'] += 1
+    await _delay()
+    first = start - start % 3600 + 3600 if start % 3600 else start
+    return {
+        'coord': {'lat': lat, 'lon': lon},
+        'list': [_pollution_item(lat, lon, dt) for dt in range(first, end + 1, 3600)]
+    }
+
+
+def run_in_thread(port: int = 8010, latency_ms: float = None) -> uvicorn.Server:
+    """Start the mock server in a daemon thread and wait until it is up"""
+    global LATENCY_MS
+    if latency_ms is not None:
+        LATENCY_MS = latency_ms
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    return server
+
+
+if __name__ == "__main__":
+    uvicorn.run(app, host="127.0.0.1", port=8010)
@@ -0,0 +1,112 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+# Returned by get() when a key is absent or expired
+MISSING = object()
+
+# Default time-to-live per endpoint, in seconds
+DEFAULT_TTLS = {
+    'weather': 600,
+    'air_pollution': 1800,
+    'air_pollution_history': 3600,
+    'forecast': 1800,
+}
+
+
+class TTLCache:
+    """
+    Bounded LRU cache whose entries expire after a per-entry time-to-live.
+
+    Expired entries are dropped when they are looked up; when the cache is
+    full the least recently used entry is evicted.
+    """
+
+    def __init__(self, max_entries: int = 4096, clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Any:
+        """Cached value for key, or MISSING"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return MISSING
+            expires_at, value = entry
+            if expires_at <= self.clock():
+                del self._entries[key]
+                return MISSING
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: float):
+        """Store value for ttl seconds"""
+        if self.max_entries <= 0 or ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (self.clock() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class ResponseCache:
+    """
+    Cache for upstream API responses keyed by endpoint and snapped coordinates.
+
+    Coordinates are snapped to a grid of `grid` degrees, so nearby points
+    share one entry. Each endpoint has its own TTL and hit/miss counters.
+    """
+
+    def __init__(self, ttls: Optional[Dict[str, float]] = None, grid: float = 0.01,
+                 max_entries: int = 4096, clock: Callable[[], float] = time.monotonic):
+        self.ttls = dict(DEFAULT_TTLS, **(ttls or {}))
+        self.grid = grid
+        self.entries = TTLCache(max_entries=max_entries, clock=clock)
+        self.hits = {endpoint: 0 for endpoint in self.ttls}
+        self.misses = {endpoint: 0 for endpoint in self.ttls}
+        self._lock = threading.Lock()
+
+    def snap(self, lat: float, lon: float) -> Tuple[int, int]:
+        """Grid cell of a coordinate"""
+        return round(lat / self.grid), round(lon / self.grid)
+
+    def key(self, endpoint: str, lat: float, lon: float, *extra) -> Tuple:
+        return (endpoint,) + self.snap(lat, lon) + extra
+
+    def get(self, key: Tuple) -> Any:
+        endpoint = key[0]
+        value = self.entries.get(key)
+        with self._lock:
+            counters = self.misses if value is MISSING else self.hits
+            counters[endpoint] = counters.get(endpoint, 0) + 1
+        return value
+
+    def set(self, key: Tuple, value: Any):
+        self.entries.set(key, value, self.ttls.get(key[0], 0))
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Hit/miss counters per endpoint plus totals"""
+        stats = {
+            endpoint: {'hits': self.hits.get(endpoint, 0), 'misses': self.misses.get(endpoint, 0)}
+            for endpoint in set(self.hits) | set(self.misses)
+        }
+        stats['total'] = {
+            'hits': sum(self.hits.values()),
+            'misses': sum(self.misses.values()),
+            'size': len(self.entries),
+            'evictions': self.entries.evictions,
+        }
+        return stats
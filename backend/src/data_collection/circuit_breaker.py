@@ -0,0 +1,68 @@
+import threading
+import time
+from typing import Callable, Dict
+
+
+class CircuitBreaker:
+    """
+    Fails fast on a dependency that is known to be down.
+
+    After `failure_threshold` consecutive failures (or a trip()) the breaker
+    opens and allow() returns False for `reset_timeout` seconds. Then it is
+    half-open: one caller is let through, and its success closes the
+    breaker while a failure opens it again.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 300,
+                 clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self.opened_at = None
+        self.rejected = 0
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return 'closed'
+        if self.clock() - self.opened_at < self.reset_timeout:
+            return 'open'
+        return 'half_open'
+
+    def allow(self) -> bool:
+        """Whether a call may be made now"""
+        with self._lock:
+            state = self.state
+            if state == 'closed':
+                return True
+            if state == 'half_open' and not self._trial:
+                self._trial = True
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial or self.failures >= self.failure_threshold:
+                self.opened_at = self.clock()
+            self._trial = False
+
+    def trip(self):
+        """Open the breaker now, e.g. when the dependency cannot be set up at all"""
+        with self._lock:
+            self.failures = max(self.failures, self.failure_threshold)
+            self.opened_at = self.clock()
+            self._trial = False
+
+    def stats(self) -> Dict[str, int]:
+        return {'failures': self.failures, 'rejected': self.rejected, 'open': int(self.state != 'closed')}
@@ -0,0 +1,213 @@
+"""
+Offline stand-in for the parts of the `ee` (Earth Engine) API used by
+GoogleEarthClient.
+
+Objects are lazy like real Earth Engine objects; only getInfo() counts as a
+round-trip, recorded in `requests`. Sampled values are deterministic
+functions of the dataset and the point, so results can be compared across
+calls. Datasets can be made empty (no images in the window) or masked (the
+band exists but has no valid pixel at the sampled points). Pass an instance
+as `GoogleEarthClient(ee_module=FakeEarthEngine())`.
+"""
+import hashlib
+from collections import Counter
+from typing import Dict, List, Optional
+
+# Bands of each dataset that the client reads
+DATASET_BANDS = {
+    'COPERNICUS/S5P/NRTI/L3_NO2': ['NO2_column_number_density', 'tropospheric_NO2_column_number_density'],
+    'COPERNICUS/S5P/NRTI/L3_O3': ['O3_column_number_density'],
+    'COPERNICUS/S5P/NRTI/L3_SO2': ['SO2_column_number_density'],
+    'COPERNICUS/S5P/NRTI/L3_CO': ['CO_column_number_density'],
+    'COPERNICUS/S5P/NRTI/L3_AER_AI': ['absorbing_aerosol_index'],
+    'LANDSAT/LC08/C02/T1_L2': ['SR_B4', 'SR_B5', 'ST_B10'],
+}
+
+
+def _value(*parts) -> float:
+    """Deterministic pseudo-random value in [0, 1)"""
+    digest = hashlib.sha256('|'.join(str(p) for p in parts).encode()).digest()
+    return int.from_bytes(digest[:8], 'big') / 2 ** 64
+
+
+class _Point:
+    def __init__(self, coords: List[float], radius: float = 0):
+        self.lon, self.lat = coords
+        self.radius = radius
+
+    def buffer(self, distance: float) -> '_Point':
+        return _Point([self.lon, self.lat], distance)
+
+
+class _Geometry:
+    Point = _Point
+
+
+class _Filter:
+    @staticmethod
+    def lt(name: str, value: float) -> tuple:
+        return ('lt', name, value)
+
+
+class _Feature:
+    def __init__(self, geometry: _Point, properties: Optional[Dict] = None):
+        self.geometry = geometry
+        self.properties = dict(properties or {})
+
+
+class _FeatureCollection:
+    def __init__(self, features: List[_Feature]):
+        self.features = list(features)
+
+
+class _Info:
+    """Deferred computation; getInfo() performs the 'request'"""
+
+    def __init__(self, backend: 'FakeEarthEngine', kind: str, compute):
+        self.backend = backend
+        self.kind = kind
+        self.compute = compute
+
+    def getInfo(self):
+        self.backend.requests[self.kind] += 1
+        if self.backend.fail:
+            raise RuntimeError("Earth Engine unavailable (fake)")
+        return self.compute()
+
+
+class _Image:
+    def __init__(self, backend: 'FakeEarthEngine', bands: Dict[str, tuple], fill: float = None):
+        self.backend = backend
+        # Output band name -> (dataset id, source band, date window)
+        self.bands = bands
+        # Value of masked pixels, set by unmask()
+        self.fill = fill
+
+    def reproject(self, crs: str, transform=None, scale: float = None) -> '_Image':
+        return self
+
+    def select(self, names) -> '_Image':
+        names = [names] if isinstance(names, str) else list(names)
+        return _Image(self.backend, {n: self.bands[n] for n in names if n in self.bands}, self.fill)
+
+    def rename(self, names) -> '_Image':
+        names = [names] if isinstance(names, str) else list(names)
+        return _Image(self.backend, dict(zip(names, self.bands.values())), self.fill)
+
+    def unmask(self, value: float = 0) -> '_Image':
+        return _Image(self.backend, self.bands, value)
+
+    def _properties(self, lat: float, lon: float) -> Dict[str, Optional[float]]:
+        properties = {}
+        for name, (dataset, band, window) in self.bands.items():
+            if dataset in self.backend.masked_datasets:
+                properties[name] = self.fill
+            else:
+                properties[name] = _value(dataset, band, round(lat, 3), round(lon, 3), *window)
+        return properties
+
+    def sample(self, region: _Point, scale: float = None, numPixels: int = None,
+               dropNulls: bool = True) -> _Info:
+        def compute():
+            properties = self._properties(region.lat, region.lon)
+            if not self.bands or (dropNulls and None in properties.values()):
+                return {'type': 'FeatureCollection', 'features': []}
+            return {
+                'type': 'FeatureCollection',
+                'features': [{'type': 'Feature', 'properties': properties}]
+            }
+        return _Info(self.backend, 'sample', compute)
+
+    def sampleRegions(self, collection: _FeatureCollection, properties: List[str] = None,
+                      scale: float = None, geometries: bool = False) -> _Info:
+        def compute():
+            features = []
+            for feature in collection.features:
+                sampled = self._properties(feature.geometry.lat, feature.geometry.lon)
+                # Masked pixels are dropped, like in Earth Engine
+                if None in sampled.values():
+                    continue
+                for name in properties or []:
+                    sampled[name] = feature.properties.get(name)
+                features.append({'type': 'Feature', 'properties': sampled})
+            return {'type': 'FeatureCollection', 'features': features}
+        return _Info(self.backend, 'sampleRegions', compute)
+
+
+class _ImageApi:
+    """Static part of ee.Image"""
+
+    @staticmethod
+    def cat(*images: _Image) -> _Image:
+        bands = {}
+        for image in images:
+            bands.update(image.bands)
+        return _Image(images[0].backend, bands, images[0].fill)
+
+
+class _ImageCollection:
+    def __init__(self, backend: 'FakeEarthEngine', dataset_id: str, window: tuple = (),
+                 empty: bool = False, bands: Optional[List[str]] = None):
+        self.backend = backend
+        self.dataset_id = dataset_id
+        self.window = window
+        self.empty = empty or dataset_id in backend.empty_datasets
+        self.band_names = DATASET_BANDS.get(dataset_id, []) if bands is None else bands
+
+    def filterDate(self, start: str, end: str) -> '_ImageCollection':
+        return _ImageCollection(self.backend, self.dataset_id, (start, end), self.empty, self.band_names)
+
+    def filterBounds(self, region) -> '_ImageCollection':
+        return self
+
+    def select(self, names) -> '_ImageCollection':
+        names = [names] if isinstance(names, str) else list(names)
+        bands = [band for band in self.band_names if band in names]
+        return _ImageCollection(self.backend, self.dataset_id, self.window, self.empty, bands)
+
+    def filter(self, condition: tuple) -> '_ImageCollection':
+        return self
+
+    def size(self) -> _Info:
+        return _Info(self.backend, 'size', lambda: 0 if self.empty else 4)
+
+    def _reduce(self) -> _Image:
+        bands = {} if self.empty else {
+            band: (self.dataset_id, band, self.window) for band in self.band_names
+        }
+        return _Image(self.backend, bands)
+
+    def mean(self) -> _Image:
+        return self._reduce()
+
+    def median(self) -> _Image:
+        return self._reduce()
+
+
+class FakeEarthEngine:
+    """Module-like fake of `ee` with request counters"""
+
+    Geometry = _Geometry
+    Filter = _Filter
+    Image = _ImageApi
+    Feature = _Feature
+    FeatureCollection = _FeatureCollection
+
+    def __init__(self, empty_datasets: Optional[List[str]] = None,
+                 masked_datasets: Optional[List[str]] = None, fail: bool = False):
+        self.requests = Counter()
+        self.empty_datasets = set(empty_datasets or [])
+        self.masked_datasets = set(masked_datasets or [])
+        self.fail = fail
+        self.initialized = False
+
+    def Initialize(self, credentials=None):
+        if self.fail:
+            raise RuntimeError("Earth Engine unavailable (fake)")
+        self.initialized = True
+
+    def ServiceAccountCredentials(self, email=None, key_file=None):
+        return {'email': email, 'key_file': key_file}
+
+    def ImageCollection(self, dataset_id: str) -> _ImageCollection:
+        return _ImageCollection(self, dataset_id)
@@ -1,41 +1,159 @@
 
-import ee
 import os
+import sys
 import json
+import threading
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 import pandas as pd
 
+# Add the src directory to the path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from data_collection.cache import MISSING
+from data_collection.circuit_breaker import CircuitBreaker
+from data_collection.satellite_cache import SatelliteCache
+
+SENTINEL5P_DATASETS = {
+    'no2': 'COPERNICUS/S5P/NRTI/L3_NO2',
+    'o3': 'COPERNICUS/S5P/NRTI/L3_O3', 
+    'so2': 'COPERNICUS/S5P/NRTI/L3_SO2',
+    'co': 'COPERNICUS/S5P/NRTI/L3_CO',
+    'aerosol': 'COPERNICUS/S5P/NRTI/L3_AER_AI'
+}
+
+# Main band of each Sentinel-5P dataset
+SENTINEL5P_BANDS = {
+    'no2': 'NO2_column_number_density',
+    'o3': 'O3_column_number_density', 
+    'so2': 'SO2_column_number_density',
+    'co': 'CO_column_number_density',
+    'aerosol': 'absorbing_aerosol_index'
+}
+
+LANDSAT_DATASET = 'LANDSAT/LC08/C02/T1_L2'
+
+# Stand-in for masked pixels in batched samples (sampleRegions drops masked pixels)
+MASKED_VALUE = -9999
+
+
+class EarthEngineUnavailable(Exception):
+    """Earth Engine is not initialized yet, or known to be down"""
+
 class GoogleEarthClient:
-    def __init__(self, service_account_path: str = None):
+    def __init__(self, service_account_path: str = None, ee_module=None, cache: SatelliteCache = None,
+                 batch_sentinel5p: bool = True, max_points_per_request: int = 500,
+                 breaker: CircuitBreaker = None, init_wait: float = 0.5):
         """
         Initialize Google Earth Engine client
         
+        Earth Engine itself is initialized in a background thread on first
+        use (or start_initialization()), so creating the client makes no
+        network calls. Requests go through a circuit breaker: while EE is
+        initializing, failed to initialize or keeps failing, they are
+        skipped at once and only cached values are served.
+        
         Args:
             service_account_path: Path to service account JSON file
+            ee_module: Earth Engine API to use, `ee` by default (see fake_ee
+                for an offline backend)
+            cache: Cache of sampled values per dataset, tile and date window
+            batch_sentinel5p: Sample all Sentinel-5P datasets in one request
+                instead of one request per dataset
+            max_points_per_request: Largest number of points sampled by one
+                batched request
+            breaker: Circuit breaker for EE requests (default: open after 5
+                consecutive failures, retry after 5 minutes)
+            init_wait: Seconds a request waits for an initialization in progress
         """
+        self._ee = ee_module
+        self.cache = cache if cache is not None else SatelliteCache()
+        self.batch_sentinel5p = batch_sentinel5p
+        self.max_points_per_request = max_points_per_request
         self.service_account_path = service_account_path or os.getenv('GEE_SERVICE_ACCOUNT_PATH')
-        print(self.service_account_path)
-        print("test")
-        self.initialize_ee()
+        self.breaker = breaker or CircuitBreaker()
+        self.init_wait = init_wait
+        self._ready = threading.Event()
+        self._init_thread = None
+        self._init_lock = threading.Lock()
+    
+    @property
+    def ee(self):
+        """Earth Engine API, imported on first use"""
+        if self._ee is None:
+            import ee
+            self._ee = ee
+        return self._ee
     
-    def initialize_ee(self):
+    @property
+    def status(self) -> str:
+        """'uninitialized', 'initializing', 'ready' or 'unavailable'"""
+        if self._ready.is_set():
+            return 'ready' if self.breaker.state == 'closed' else 'unavailable'
+        if self._init_thread is not None and self._init_thread.is_alive():
+            return 'initializing'
+        return 'unavailable' if self._init_thread is not None else 'uninitialized'
+    
+    def start_initialization(self):
+        """Initialize Earth Engine in a background thread, unless that is done or under way"""
+        with self._init_lock:
+            if self._ready.is_set() or (self._init_thread is not None and self._init_thread.is_alive()):
+                return
+            self._init_thread = threading.Thread(target=self._initialize_background, daemon=True)
+            self._init_thread.start()
+    
+    def _initialize_background(self):
+        if self.initialize_ee():
+            self.breaker.record_success()
+            self._ready.set()
+        else:
+            # Skip EE until the breaker lets a new attempt through
+            self.breaker.trip()
+    
+    def available(self, wait: float = 0) -> bool:
+        """
+        Whether an EE request may be made now. Starts the initialization if
+        needed and waits up to `wait` seconds for one in progress.
+        """
+        if not self._ready.is_set():
+            if self.status != 'initializing' and not self.breaker.allow():
+                return False
+            self.start_initialization()
+            if not self._ready.wait(wait):
+                return False
+        return self.breaker.allow()
+    
+    def _call_ee(self, request, *args):
+        """Make an EE request through the circuit breaker"""
+        if not self.available(self.init_wait):
+            raise EarthEngineUnavailable(f"Earth Engine is {self.status}")
+        try:
+            result = request(*args)
+        except Exception:
+            self.breaker.record_failure()
+            raise
+        self.breaker.record_success()
+        return result
+    
+    def initialize_ee(self) -> bool:
         """Initialize Earth Engine with authentication"""
         try:
             if self.service_account_path and os.path.exists(self.service_account_path):
                 # Use service account authentication
-                credentials = ee.ServiceAccountCredentials(
+                credentials = self.ee.ServiceAccountCredentials(
                     email=None,
                     key_file=self.service_account_path
                 )
-                ee.Initialize(credentials)
+                self.ee.Initialize(credentials)
             else:
                 # Use default authentication (requires ee.Authenticate() to be run once)
-                ee.Initialize()
+                self.ee.Initialize()
             print("Earth Engine initialized successfully")
+            return True
         except Exception as e:
             print(f"Error initializing Earth Engine: {e}")
             print("You may need to run: earthengine authenticate")
+            return False
     
     def get_sentinel5p_data(self, lat: float, lon: float, days: int = 30) -> Dict:
         """
@@ -46,50 +164,28 @@ class GoogleEarthClient:
             lon: Longitude  
             days: Number of days to look back
         """
+        if self.batch_sentinel5p:
+            return self.get_sentinel5p_batch([(lat, lon)], days)[0]
+        
         try:
-            # Define the area of interest (a small region around the point)
-            point = ee.Geometry.Point([lon, lat])
-            region = point.buffer(5000)  # 5km buffer
-            
             # Date range
             end_date = datetime.now()
             start_date = end_date - timedelta(days=days)
-            
-            # Get different atmospheric measurements
-            datasets = {
-                'no2': 'COPERNICUS/S5P/NRTI/L3_NO2',
-                'o3': 'COPERNICUS/S5P/NRTI/L3_O3', 
-                'so2': 'COPERNICUS/S5P/NRTI/L3_SO2',
-                'co': 'COPERNICUS/S5P/NRTI/L3_CO',
-                'aerosol': 'COPERNICUS/S5P/NRTI/L3_AER_AI'
-            }
+            window = (start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d'))
             
             results = {}
             
-            for pollutant, dataset_id in datasets.items():
+            # Get different atmospheric measurements
+            for pollutant, dataset_id in SENTINEL5P_DATASETS.items():
                 try:
-                    # Get the dataset
-                    dataset = ee.ImageCollection(dataset_id)
-                    
-                    # Filter by date and location
-                    filtered = dataset.filterDate(
-                        start_date.strftime('%Y-%m-%d'),
-                        end_date.strftime('%Y-%m-%d')
-                    ).filterBounds(region)
+                    properties = self.cache.get(dataset_id, lat, lon, *window)
                     
-                    # Get the mean value over the time period
-                    mean_image = filtered.mean().reproject('EPSG:4326',None,1000)
+                    if properties is MISSING:
+                        properties = self._call_ee(self._sample_dataset, dataset_id, lat, lon, window)
+                        self.cache.set(dataset_id, lat, lon, *window, properties)
                     
-                    # Sample the data at our point
-                    sample = mean_image.sample(
-                        region=region,
-                        scale=1000,  # 1km resolution
-                        numPixels=100
-                    ).getInfo()
-                    
-                    if sample['features']:
+                    if properties:
                         # Extract the relevant band value
-                        properties = sample['features'][0]['properties']
                         results[pollutant] = self._extract_main_value(properties, pollutant)
                     else:
                         results[pollutant] = None
@@ -98,31 +194,155 @@ class GoogleEarthClient:
                     print(f"Error getting {pollutant} data: {e}")
                     results[pollutant] = None
             
-            return {
-                'satellite_data': results,
-                'location': {'lat': lat, 'lon': lon},
-                'date_range': {
-                    'start': start_date.isoformat(),
-                    'end': end_date.isoformat()
-                },
-                'collected_at': datetime.now().isoformat()
-            }
+            return self._sentinel5p_result(lat, lon, start_date, end_date, results)
             
         except Exception as e:
             print(f"Error getting satellite data: {e}")
             return None
     
+    def _sample_dataset(self, dataset_id: str, lat: float, lon: float, window: tuple) -> Optional[Dict]:
+        """Sample the mean of one Sentinel-5P dataset around a point"""
+        # Define the area of interest (a small region around the point)
+        point = self.ee.Geometry.Point([lon, lat])
+        region = point.buffer(5000)  # 5km buffer
+        
+        # Get the dataset
+        dataset = self.ee.ImageCollection(dataset_id)
+        
+        # Filter by date and location
+        filtered = dataset.filterDate(*window).filterBounds(region)
+        
+        # Get the mean value over the time period
+        mean_image = filtered.mean().reproject('EPSG:4326',None,1000)
+        
+        # Sample the data at our point
+        sample = mean_image.sample(
+            region=region,
+            scale=1000,  # 1km resolution
+            numPixels=100
+        ).getInfo()
+        
+        return sample['features'][0]['properties'] if sample['features'] else None
+    
+    def get_sentinel5p_batch(self, points: List[Tuple[float, float]], days: int = 30) -> List[Optional[Dict]]:
+        """
+        Get Sentinel-5P data for many locations with as few requests as possible
+        
+        The mean images of all datasets are stacked into one multi-band image,
+        which is sampled at every uncached tile in a single sampleRegions call.
+        
+        Args:
+            points: (lat, lon) pairs
+            days: Number of days to look back
+        
+        Returns:
+            One get_sentinel5p_data() result per point, None where sampling failed
+        """
+        end_date = datetime.now()
+        start_date = end_date - timedelta(days=days)
+        window = (start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d'))
+        
+        cached = [self._cached_sentinel5p(lat, lon, window) for lat, lon in points]
+        
+        # Nearby points share a cache tile, so each pending tile is sampled once
+        pending = {}
+        for i, (lat, lon) in enumerate(points):
+            if cached[i] is MISSING:
+                pending.setdefault(self.cache.tile(lat, lon), []).append(i)
+        tiles = list(pending.values())
+        
+        for chunk_start in range(0, len(tiles), self.max_points_per_request):
+            chunk = tiles[chunk_start:chunk_start + self.max_points_per_request]
+            try:
+                sampled = self._call_ee(self._sample_sentinel5p, [points[indices[0]] for indices in chunk], window)
+            except Exception as e:
+                print(f"Error getting satellite data: {e}")
+                sampled = [None] * len(chunk)
+            
+            for indices, by_dataset in zip(chunk, sampled):
+                if by_dataset is not None:
+                    lat, lon = points[indices[0]]
+                    for dataset_id, properties in by_dataset.items():
+                        self.cache.set(dataset_id, lat, lon, *window, properties)
+                for i in indices:
+                    cached[i] = by_dataset
+        
+        results = []
+        for (lat, lon), by_dataset in zip(points, cached):
+            if by_dataset is None:
+                results.append(None)
+                continue
+            values = {}
+            for pollutant, dataset_id in SENTINEL5P_DATASETS.items():
+                properties = by_dataset[dataset_id]
+                values[pollutant] = self._extract_main_value(properties, pollutant) if properties else None
+            results.append(self._sentinel5p_result(lat, lon, start_date, end_date, values))
+        return results
+    
+    def _cached_sentinel5p(self, lat: float, lon: float, window: tuple):
+        """Cached properties of every Sentinel-5P dataset, or MISSING if any is absent"""
+        by_dataset = {}
+        for dataset_id in SENTINEL5P_DATASETS.values():
+            properties = self.cache.get(dataset_id, lat, lon, *window)
+            if properties is MISSING:
+                return MISSING
+            by_dataset[dataset_id] = properties
+        return by_dataset
+    
+    def _sample_sentinel5p(self, points: List[Tuple[float, float]], window: tuple) -> List[Dict]:
+        """Sample the stacked Sentinel-5P means at the points in one request"""
+        collection = self.ee.FeatureCollection([
+            self.ee.Feature(self.ee.Geometry.Point([lon, lat]), {'point_index': i})
+            for i, (lat, lon) in enumerate(points)
+        ])
+        
+        # One mean image per dataset, reduced to its main band and stacked
+        means = [
+            self.ee.ImageCollection(dataset_id)
+            .filterDate(*window)
+            .filterBounds(collection)
+            .select(SENTINEL5P_BANDS[pollutant])
+            .mean()
+            for pollutant, dataset_id in SENTINEL5P_DATASETS.items()
+        ]
+        stacked = self.ee.Image.cat(*means).unmask(MASKED_VALUE).reproject('EPSG:4326', None, 1000)
+        
+        sample = stacked.sampleRegions(
+            collection=collection,
+            properties=['point_index'],
+            scale=1000,  # 1km resolution
+            geometries=False
+        ).getInfo()
+        
+        sampled = {feature['properties']['point_index']: feature['properties'] for feature in sample['features']}
+        
+        # Cached per dataset, like the samples of the serial mode
+        results = []
+        for i in range(len(points)):
+            properties = sampled.get(i, {})
+            by_dataset = {}
+            for pollutant, dataset_id in SENTINEL5P_DATASETS.items():
+                band = SENTINEL5P_BANDS[pollutant]
+                value = properties.get(band)
+                by_dataset[dataset_id] = None if value is None or value == MASKED_VALUE else {band: value}
+            results.append(by_dataset)
+        return results
+    
+    def _sentinel5p_result(self, lat: float, lon: float, start_date: datetime, end_date: datetime,
+                           results: Dict) -> Dict:
+        return {
+            'satellite_data': results,
+            'location': {'lat': lat, 'lon': lon},
+            'date_range': {
+                'start': start_date.isoformat(),
+                'end': end_date.isoformat()
+            },
+            'collected_at': datetime.now().isoformat()
+        }
+    
     def _extract_main_value(self, properties: Dict, pollutant: str) -> Optional[float]:
         """Extract the main measurement value for each pollutant type"""
-        value_mappings = {
-            'no2': 'NO2_column_number_density',
-            'o3': 'O3_column_number_density', 
-            'so2': 'SO2_column_number_density',
-            'co': 'CO_column_number_density',
-            'aerosol': 'absorbing_aerosol_index'
-        }
-        
-        band_name = value_mappings.get(pollutant)
+        band_name = SENTINEL5P_BANDS.get(pollutant)
         if band_name and band_name in properties:
             return properties[band_name]
         
@@ -138,42 +358,23 @@ class GoogleEarthClient:
         Get Landsat imagery data (for environmental context)
         """
         try:
-            point = ee.Geometry.Point([lon, lat])
-            region = point.buffer(5000)
-            
             end_date = datetime.now()
             start_date = end_date - timedelta(days=days)
+            window = (start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d'))
+            
+            properties = self.cache.get(LANDSAT_DATASET, lat, lon, *window)
             
-            # Get Landsat 8 data
-            landsat = ee.ImageCollection('LANDSAT/LC08/C02/T1_L2')
-            
-            # Filter and get cloud-free images
-            filtered = landsat.filterDate(
-                start_date.strftime('%Y-%m-%d'),
-                end_date.strftime('%Y-%m-%d')
-            ).filterBounds(region).filter(
-                ee.Filter.lt('CLOUD_COVER', 20)
-            )
-            
-            if filtered.size().getInfo() > 0:
-                # Get the median image
-                median_image = filtered.median().reproject('EPSG:4326', None, 30)
-                
-                # Sample the data
-                sample = median_image.sample(
-                    region=region,
-                    scale=30,  # 30m resolution for Landsat
-                    numPixels=50
-                ).getInfo()
-                
-                if sample['features']:
-                    properties = sample['features'][0]['properties']
-                    return {
-                        'ndvi': self._calculate_ndvi(properties),
-                        'surface_temperature': properties.get('ST_B10'),
-                        'vegetation_health': properties.get('SR_B4'),  # Red band
-                        'collected_at': datetime.now().isoformat()
-                    }
+            if properties is MISSING:
+                properties = self._call_ee(self._sample_landsat, lat, lon, window)
+                self.cache.set(LANDSAT_DATASET, lat, lon, *window, properties)
+            
+            if properties:
+                return {
+                    'ndvi': self._calculate_ndvi(properties),
+                    'surface_temperature': properties.get('ST_B10'),
+                    'vegetation_health': properties.get('SR_B4'),  # Red band
+                    'collected_at': datetime.now().isoformat()
+                }
             
             return None
             
@@ -181,6 +382,35 @@ class GoogleEarthClient:
             print(f"Error getting Landsat data: {e}")
             return None
     
+    def _sample_landsat(self, lat: float, lon: float, window: tuple) -> Optional[Dict]:
+        """Sample the median cloud-free Landsat 8 image around a point"""
+        point = self.ee.Geometry.Point([lon, lat])
+        region = point.buffer(5000)
+        
+        # Get Landsat 8 data
+        landsat = self.ee.ImageCollection(LANDSAT_DATASET)
+        
+        # Filter and get cloud-free images
+        filtered = landsat.filterDate(*window).filterBounds(region).filter(
+            self.ee.Filter.lt('CLOUD_COVER', 20)
+        )
+        
+        if filtered.size().getInfo() > 0:
+            # Get the median image
+            median_image = filtered.median().reproject('EPSG:4326', None, 30)
+            
+            # Sample the data
+            sample = median_image.sample(
+                region=region,
+                scale=30,  # 30m resolution for Landsat
+                numPixels=50
+            ).getInfo()
+            
+            if sample['features']:
+                return sample['features'][0]['properties']
+        
+        return None
+    
     def _calculate_ndvi(self, properties: Dict) -> Optional[float]:
         """Calculate NDVI from Landsat bands"""
         try:
@@ -202,6 +432,10 @@ class GoogleEarthClient:
             # Get land surface data
             landsat_data = self.get_landsat_data(lat, lon, days=30)
             
+            if atmospheric_data is None and landsat_data is None:
+                # Nothing cached and EE unavailable (or no data)
+                return None
+            
             return {
                 'atmospheric': atmospheric_data,
                 'surface': landsat_data,
@@ -212,6 +446,20 @@ class GoogleEarthClient:
         except Exception as e:
             print(f"Error collecting comprehensive satellite data: {e}")
             return None
+    
+    def get_comprehensive_satellite_batch(self, points: List[Tuple[float, float]]) -> List[Optional[Dict]]:
+        """Get all available satellite data for many locations, batching Sentinel-5P"""
+        atmospheric = self.get_sentinel5p_batch(points, days=7)
+        
+        return [
+            {
+                'atmospheric': atmospheric_data,
+                'surface': self.get_landsat_data(lat, lon, days=30),
+                'location': {'lat': lat, 'lon': lon},
+                'collected_at': datetime.now().isoformat()
+            }
+            for (lat, lon), atmospheric_data in zip(points, atmospheric)
+        ]
 
 # Example usage
 if __name__ == "__main__":
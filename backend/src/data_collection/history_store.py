@@ -0,0 +1,135 @@
+import bisect
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+# OpenWeather reports historical air pollution hourly
+HISTORY_STEP_SECONDS = 3600
+
+
+class _Series:
+    """Hourly pollution rows of one location, ordered by timestamp"""
+
+    def __init__(self):
+        self.dts = []
+        self.rows = {}
+        self.raw = {}
+        # Start of the range that has been downloaded completely
+        self.covered_from = None
+
+    @property
+    def last_dt(self) -> Optional[int]:
+        return self.dts[-1] if self.dts else None
+
+
+class PollutionHistoryStore:
+    """
+    Local per-location store of historical air pollution.
+
+    Remembers the hourly rows already downloaded for each location (snapped
+    to a grid of `grid` degrees) so that only the hours after the newest
+    stored one need to be requested from OpenWeather. New rows are processed
+    once, merged into the series and the requested window is served locally.
+    Rows older than `retention_days` are dropped. With `storage_path` the raw
+    rows are also kept on disk, one JSON file per location.
+    """
+
+    def __init__(self, grid: float = 0.01, retention_days: int = 7,
+                 storage_path: Optional[str] = None, max_locations: int = 4096):
+        self.grid = grid
+        self.retention_seconds = retention_days * 24 * 3600
+        self.storage_path = storage_path
+        self.max_locations = max_locations
+        self._series = OrderedDict()
+        self._lock = threading.Lock()
+
+        if storage_path:
+            os.makedirs(storage_path, exist_ok=True)
+
+    def key(self, lat: float, lon: float) -> Tuple[int, int]:
+        """Grid cell of a coordinate"""
+        return round(lat / self.grid), round(lon / self.grid)
+
+    def _path(self, key: Tuple[int, int]) -> str:
+        return os.path.join(self.storage_path, f"{key[0]}_{key[1]}.json")
+
+    def _get_series(self, key: Tuple[int, int], process: Callable) -> _Series:
+        """Series for a location, loaded from disk on first use"""
+        series = self._series.get(key)
+        if series is None:
+            series = _Series()
+            if self.storage_path and os.path.exists(self._path(key)):
+                with open(self._path(key)) as f:
+                    stored = json.load(f)
+                self._merge_items(series, stored['list'], process)
+                series.covered_from = stored.get('covered_from')
+            self._series[key] = series
+            while len(self._series) > self.max_locations:
+                self._series.popitem(last=False)
+        self._series.move_to_end(key)
+        return series
+
+    def _merge_items(self, series: _Series, items: List[Dict], process: Callable):
+        new_items = [item for item in items if item['dt'] not in series.rows]
+        if not new_items:
+            return
+        for item, row in zip(new_items, process({'list': new_items})):
+            series.raw[item['dt']] = item
+            series.rows[item['dt']] = row
+        series.dts = sorted(series.rows)
+
+    def fetch_start(self, lat: float, lon: float, start: int, end: int,
+                    process: Callable) -> Optional[int]:
+        """
+        First timestamp that still has to be downloaded for [start, end],
+        or None when the stored series is already up to date.
+        """
+        with self._lock:
+            series = self._get_series(self.key(lat, lon), process)
+            last_dt = series.last_dt
+            if last_dt is None or series.covered_from is None or start < series.covered_from:
+                return start
+            if end - last_dt < HISTORY_STEP_SECONDS:
+                return None
+            return max(start, last_dt + 1)
+
+    def merge(self, lat: float, lon: float, items: List[Dict], process: Callable,
+              start: int, now: int):
+        """Add raw OpenWeather items downloaded for [start, now] to a location's series"""
+        key = self.key(lat, lon)
+        with self._lock:
+            series = self._get_series(key, process)
+            self._merge_items(series, items, process)
+            if series.covered_from is None or start < series.covered_from:
+                series.covered_from = start
+
+            # Drop rows that fell out of the retention window
+            retained_from = now - self.retention_seconds
+            cutoff = bisect.bisect_left(series.dts, retained_from)
+            for dt in series.dts[:cutoff]:
+                del series.rows[dt]
+                del series.raw[dt]
+            series.dts = series.dts[cutoff:]
+            series.covered_from = max(series.covered_from, retained_from)
+
+            if self.storage_path:
+                with open(self._path(key), 'w') as f:
+                    json.dump({
+                        'covered_from': series.covered_from,
+                        'list': [series.raw[dt] for dt in series.dts]
+                    }, f)
+
+    def window(self, lat: float, lon: float, start: int, end: int) -> List[Dict]:
+        """Processed rows of a location with start <= timestamp <= end"""
+        with self._lock:
+            series = self._series.get(self.key(lat, lon))
+            if series is None:
+                return []
+            lo = bisect.bisect_left(series.dts, start)
+            hi = bisect.bisect_right(series.dts, end)
+            return [series.rows[dt] for dt in series.dts[lo:hi]]
+
+    def __len__(self) -> int:
+        return len(self._series)
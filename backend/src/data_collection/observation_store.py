@@ -0,0 +1,224 @@
+import json
+import os
+import sys
+import sqlite3
+import threading
+from collections import deque
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Union
+
+# Add the src directory to the path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from ml_models.observation import Observation, LOCATION
+from data_collection.spatial_index import SpatialIndex
+
+PARTITION_PREFIX = 'observations_'
+PARTITION_SUFFIX = '.sqlite'
+
+
+def _decode(record: Union[bytes, str]) -> Observation:
+    """Observation of a stored row (JSON rows are records written before the binary format)"""
+    if isinstance(record, str):
+        return Observation.from_record(json.loads(record))
+    return Observation.from_bytes(record)
+
+
+class ObservationStore:
+    """
+    Append-only log of collected observations, one SQLite file per day.
+
+    Every record is stored as a compact Observation in the partition of
+    the day it was collected on and can be read back in chunks, so training
+    never needs the whole history on the heap. Only the `memory_limit` most
+    recent observations are kept in memory. With `retention_days`,
+    partitions older than that are deleted. With a spatial `index`, the
+    observations of its recency window are indexed by location, starting
+    with those already on disk.
+
+    Several processes (e.g. forked API workers) can share one store: each
+    opens its own connections and the counts and latest record are read
+    from the partitions, so they include what the other processes wrote.
+    The spatial index holds what this process loaded and appended.
+    """
+
+    def __init__(self, path: str = None, memory_limit: int = 100,
+                 retention_days: Optional[int] = None, index: Optional[SpatialIndex] = None):
+        self.path = path or os.getenv('OBSERVATION_STORE_PATH', 'data/observations')
+        self.retention_days = retention_days
+        self.index = index
+        self.recent = deque(maxlen=memory_limit)
+        self._lock = threading.Lock()
+        self._writers = {}
+        self._pid = os.getpid()
+        # Row count by day, with the file versions it was counted at
+        self._counts = {}
+
+        os.makedirs(self.path, exist_ok=True)
+        self.purge()
+        if self.index is not None:
+            self.load_index()
+
+    def _partition_path(self, day: str) -> str:
+        return os.path.join(self.path, f"{PARTITION_PREFIX}{day}{PARTITION_SUFFIX}")
+
+    def partitions(self) -> List[str]:
+        """Days that have a partition, oldest first"""
+        return sorted(
+            name[len(PARTITION_PREFIX):-len(PARTITION_SUFFIX)]
+            for name in os.listdir(self.path)
+            if name.startswith(PARTITION_PREFIX) and name.endswith(PARTITION_SUFFIX)
+        )
+
+    def _connect(self, day: str) -> sqlite3.Connection:
+        conn = sqlite3.connect(self._partition_path(day), check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            """CREATE TABLE IF NOT EXISTS observations (
+                id INTEGER PRIMARY KEY, collected_at TEXT,
+                latitude REAL, longitude REAL, record BLOB
+            )"""
+        )
+        return conn
+
+    def _writer(self, day: str) -> sqlite3.Connection:
+        """Open connection to a partition that is written to"""
+        if self._pid != os.getpid():
+            # Connections inherited from the parent process are not used after a fork
+            self._writers = {}
+            self._pid = os.getpid()
+        conn = self._writers.get(day)
+        if conn is None:
+            # Records arrive in time order, so only the newest partitions stay open
+            while len(self._writers) >= 2:
+                self._writers.pop(min(self._writers)).close()
+            conn = self._writers[day] = self._connect(day)
+        return conn
+
+    def _partition_count(self, day: str) -> int:
+        """
+        Rows in a partition, counted again only when the partition or its
+        write-ahead log changed (e.g. today's, or another process wrote)
+        """
+        path = self._partition_path(day)
+        version = tuple(
+            (stat.st_mtime_ns, stat.st_size)
+            for stat in (os.stat(name) for name in (path, path + '-wal') if os.path.exists(name))
+        )
+        cached = self._counts.get(day)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            # Rows are never deleted one by one, so the largest id is the count
+            count = conn.execute("SELECT COALESCE(MAX(id), 0) FROM observations").fetchone()[0]
+        finally:
+            conn.close()
+        self._counts[day] = (version, count)
+        return count
+
+    def append(self, record: Union[Dict, Observation]):
+        """Add a collected record (dict or Observation) to the log"""
+        observation = record if isinstance(record, Observation) else Observation.from_record(record)
+        collected_at = observation.collected_at
+        location = observation.location if observation.has(LOCATION) else {}
+        row = (collected_at, location.get('lat'), location.get('lon'), observation.to_bytes())
+        day = collected_at[:10] if collected_at else date.today().isoformat()
+
+        with self._lock:
+            conn = self._writer(day)
+            conn.execute(
+                "INSERT INTO observations (collected_at, latitude, longitude, record) VALUES (?, ?, ?, ?)", row
+            )
+            conn.commit()
+            self.recent.append(observation)
+        if self.index is not None:
+            self.index.add(observation)
+
+    def load_index(self):
+        """Add the stored observations within the index's recency window to it"""
+        since = (datetime.now() - timedelta(seconds=self.index.max_age)).date().isoformat()
+        for chunk in self.iter_chunks(since=since):
+            for observation in chunk:
+                self.index.add(observation)
+
+    def iter_chunks(self, chunk_size: int = 1000, since: Optional[str] = None,
+                    after: Optional[str] = None, until: Optional[str] = None) -> Iterator[List[Observation]]:
+        """
+        Stored observations by day and insertion order, `chunk_size` at a time
+
+        Args:
+            chunk_size: Records per chunk
+            since: First day (YYYY-MM-DD) to read, all days by default
+            after: Only observations collected after this ISO timestamp
+            until: Only observations collected up to this ISO timestamp
+        """
+        conditions, bounds = [], []
+        if after:
+            since = max(since or '', after[:10])
+            conditions.append("collected_at > ?")
+            bounds.append(after)
+        if until:
+            conditions.append("collected_at <= ?")
+            bounds.append(until)
+        where = "".join(f" AND {condition}" for condition in conditions)
+
+        for day in self.partitions():
+            if since and day < since:
+                continue
+            if until and day > until[:10]:
+                break
+            conn = sqlite3.connect(f"file:{self._partition_path(day)}?mode=ro", uri=True)
+            try:
+                last_id = 0
+                while True:
+                    rows = conn.execute(
+                        f"SELECT id, record FROM observations WHERE id > ?{where} ORDER BY id LIMIT ?",
+                        (last_id, *bounds, chunk_size)
+                    ).fetchall()
+                    if not rows:
+                        break
+                    last_id = rows[-1][0]
+                    yield [_decode(record) for _, record in rows]
+            finally:
+                conn.close()
+
+    def latest(self) -> Optional[Observation]:
+        """Most recently stored observation, by any process"""
+        for day in reversed(self.partitions()):
+            conn = sqlite3.connect(f"file:{self._partition_path(day)}?mode=ro", uri=True)
+            try:
+                row = conn.execute("SELECT record FROM observations ORDER BY id DESC LIMIT 1").fetchone()
+            finally:
+                conn.close()
+            if row:
+                return _decode(row[0])
+        return None
+
+    def purge(self):
+        """Delete partitions older than `retention_days`"""
+        if self.retention_days is None:
+            return
+        cutoff = (date.today() - timedelta(days=self.retention_days)).isoformat()
+        with self._lock:
+            for day in self.partitions():
+                if day < cutoff:
+                    self._counts.pop(day, None)
+                    conn = self._writers.pop(day, None)
+                    if conn is not None:
+                        conn.close()
+                    for suffix in ('', '-wal', '-shm'):
+                        if os.path.exists(self._partition_path(day) + suffix):
+                            os.remove(self._partition_path(day) + suffix)
+
+    def stats(self) -> Dict[str, int]:
+        days = self.partitions()
+        return {
+            'records': sum(self._partition_count(day) for day in days),
+            'partitions': len(days),
+            'in_memory': len(self.recent),
+            'bytes': sum(os.path.getsize(self._partition_path(day)) for day in days),
+        }
+
+    def __len__(self) -> int:
+        return sum(self._partition_count(day) for day in self.partitions())
@@ -0,0 +1,98 @@
+import json
+import os
+import sqlite3
+import threading
+from datetime import date
+from typing import Any, Dict, Optional, Tuple
+
+from data_collection.cache import MISSING
+
+# Default location, under the backend directory whatever the working directory
+DEFAULT_PATH = os.path.join(os.path.dirname(__file__), '..', '..', 'data', 'cache', 'satellite_cache.sqlite')
+
+
+class SatelliteCache:
+    """
+    Persistent cache of Earth Engine sample results.
+
+    Entries are keyed by (dataset, grid tile, date window). The date window
+    has day granularity, so a new day starts a new window and the previous
+    day's entries are purged. Stored values are the sampled band properties,
+    or None when the dataset had no data for the tile. Backed by SQLite; use
+    ':memory:' for a process-local cache.
+    """
+
+    def __init__(self, path: str = None, tile_size: float = 0.05):
+        self.path = path or os.getenv('SATELLITE_CACHE_PATH', os.path.normpath(DEFAULT_PATH))
+        self.tile_size = tile_size
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        if self.path != ':memory:':
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        self._conn = None
+        self._pid = None
+        self._purged_on = None
+        self.purge()
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """Connection of the current process; a forked worker opens its own"""
+        if self._pid != os.getpid():
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS samples (
+                    dataset TEXT, tile_lat INTEGER, tile_lon INTEGER,
+                    start_date TEXT, end_date TEXT, properties TEXT,
+                    PRIMARY KEY (dataset, tile_lat, tile_lon, start_date, end_date)
+                )"""
+            )
+            self._pid = os.getpid()
+        return self._conn
+
+    def tile(self, lat: float, lon: float) -> Tuple[int, int]:
+        """Grid tile of a coordinate"""
+        return round(lat / self.tile_size), round(lon / self.tile_size)
+
+    def get(self, dataset: str, lat: float, lon: float, start_date: str, end_date: str) -> Any:
+        """Cached properties for the tile and window, or MISSING"""
+        tile_lat, tile_lon = self.tile(lat, lon)
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT properties FROM samples WHERE dataset = ? AND tile_lat = ? AND tile_lon = ?"
+                " AND start_date = ? AND end_date = ?",
+                (dataset, tile_lat, tile_lon, start_date, end_date)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return MISSING
+            self.hits += 1
+            return json.loads(row[0])
+
+    def set(self, dataset: str, lat: float, lon: float, start_date: str, end_date: str,
+            properties: Optional[Dict]):
+        """Store the sampled properties (or None) for the tile and window"""
+        self.purge()
+        tile_lat, tile_lon = self.tile(lat, lon)
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO samples VALUES (?, ?, ?, ?, ?, ?)",
+                (dataset, tile_lat, tile_lon, start_date, end_date, json.dumps(properties))
+            )
+            self.conn.commit()
+
+    def purge(self):
+        """Drop windows that ended before today (at most once per day)"""
+        today = date.today().isoformat()
+        if self._purged_on == today:
+            return
+        with self._lock:
+            self.conn.execute("DELETE FROM samples WHERE end_date < ?", (today,))
+            self.conn.commit()
+            self._purged_on = today
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            size = self.conn.execute("SELECT COUNT(*) FROM samples").fetchone()[0]
+        return {'hits': self.hits, 'misses': self.misses, 'size': size}
@@ -0,0 +1,141 @@
+import math
+import os
+import sys
+import threading
+from collections import deque
+from typing import Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+# Add the src directory to the path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from ml_models.observation import Observation, LOCATION
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance between two points in kilometres"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    a = (math.sin((phi2 - phi1) / 2) ** 2
+         + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def _now() -> float:
+    # Collected records carry naive local timestamps (datetime.now())
+    return pd.Timestamp.now().value / 1e9
+
+
+class SpatialIndex:
+    """
+    Recent observations bucketed by location.
+
+    Observations are kept in cells of `cell_size` degrees, keyed by the
+    cell's (row, column), for `max_age` seconds after they were collected.
+    nearby() only looks at the cells that overlap the search radius and
+    region() at the cells overlapping the box, so queries cost as much as
+    the observations near the point, not the whole history.
+    """
+
+    def __init__(self, cell_size: float = 0.01, max_age: float = 3600,
+                 clock: Callable[[], float] = _now):
+        """
+        Args:
+            cell_size: Bucket size in degrees (0.01 is about 1.1 km of latitude)
+            max_age: Seconds an observation stays in the index
+            clock: Current time in seconds, on the clock of the observations' timestamps
+        """
+        self.cell_size = cell_size
+        self.max_age = max_age
+        self.clock = clock
+        self.buckets: Dict[Tuple[int, int], deque] = {}
+        # (collected, cell) in insertion order, to expire the oldest first
+        self._order = deque()
+        self._lock = threading.Lock()
+
+    def _cell(self, lat: float, lon: float) -> Tuple[int, int]:
+        return math.floor(lat / self.cell_size), math.floor(lon / self.cell_size)
+
+    def add(self, observation: Observation):
+        """Index an observation that has a location (collected now if it has no timestamp)"""
+        if not observation.has(LOCATION):
+            return
+        location = observation.location
+        lat, lon = location['lat'], location['lon']
+        if lat != lat or lon != lon:
+            return
+        now = self.clock()
+        collected = observation.timestamp / 1e9 if observation.timestamp is not None else now
+        if collected < now - self.max_age:
+            return
+        cell = self._cell(lat, lon)
+        with self._lock:
+            self._expire(now)
+            self.buckets.setdefault(cell, deque()).append((collected, lat, lon, observation))
+            self._order.append((collected, cell))
+
+    def _expire(self, now: float):
+        cutoff = now - self.max_age
+        while self._order and self._order[0][0] < cutoff:
+            _, cell = self._order.popleft()
+            bucket = self.buckets[cell]
+            bucket.popleft()
+            if not bucket:
+                del self.buckets[cell]
+
+    def _cells_in(self, min_lat: float, min_lon: float, max_lat: float, max_lon: float) -> List[deque]:
+        """Buckets overlapping a box"""
+        row0, col0 = self._cell(min_lat, min_lon)
+        row1, col1 = self._cell(max_lat, max_lon)
+        if (row1 - row0 + 1) * (col1 - col0 + 1) > len(self.buckets):
+            return [bucket for (row, col), bucket in self.buckets.items()
+                    if row0 <= row <= row1 and col0 <= col <= col1]
+        return [self.buckets[(row, col)] for row in range(row0, row1 + 1) for col in range(col0, col1 + 1)
+                if (row, col) in self.buckets]
+
+    def nearby(self, lat: float, lon: float, radius_km: float, max_age: Optional[float] = None,
+               limit: Optional[int] = None) -> List[Tuple[float, Observation]]:
+        """
+        (distance in km, observation) within `radius_km` of a point and
+        collected within `max_age` seconds (default: the index's), nearest first
+        """
+        now = self.clock()
+        cutoff = now - (self.max_age if max_age is None else max_age)
+        dlat = radius_km / KM_PER_DEGREE
+        dlon = dlat / max(math.cos(math.radians(lat)), 1e-6)
+        found = []
+        with self._lock:
+            self._expire(now)
+            for bucket in self._cells_in(lat - dlat, lon - dlon, lat + dlat, lon + dlon):
+                for collected, obs_lat, obs_lon, observation in bucket:
+                    if collected < cutoff:
+                        continue
+                    distance = haversine_km(lat, lon, obs_lat, obs_lon)
+                    if distance <= radius_km:
+                        found.append((distance, observation))
+        found.sort(key=lambda item: item[0])
+        return found[:limit] if limit else found
+
+    def region(self, min_lat: float, min_lon: float, max_lat: float, max_lon: float,
+               max_age: Optional[float] = None) -> List[Observation]:
+        """Observations inside a box, collected within `max_age` seconds, in collection order"""
+        now = self.clock()
+        cutoff = now - (self.max_age if max_age is None else max_age)
+        found = []
+        with self._lock:
+            self._expire(now)
+            for bucket in self._cells_in(min_lat, min_lon, max_lat, max_lon):
+                for collected, lat, lon, observation in bucket:
+                    if collected >= cutoff and min_lat <= lat <= max_lat and min_lon <= lon <= max_lon:
+                        found.append((collected, observation))
+        found.sort(key=lambda item: item[0])
+        return [observation for _, observation in found]
+
+    def stats(self) -> Dict[str, int]:
+        return {'observations': len(self._order), 'cells': len(self.buckets)}
+
+    def __len__(self) -> int:
+        return len(self._order)
@@ -1,49 +1,69 @@
 # src/data_collection/weather_api.py
 import requests
+import httpx
+import asyncio
 import os
+import sys
 from datetime import datetime, timedelta
 import pandas as pd
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 
-class WeatherAPIClient:
-    def __init__(self):
+# Add the src directory to the path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from data_collection.cache import ResponseCache, MISSING
+from data_collection.history_store import PollutionHistoryStore
+
+DEFAULT_BASE_URL = "http://api.openweathermap.org/data/2.5"
+
+class WeatherClientBase:
+    """
+    OpenWeather requests and response processing shared by the blocking and
+    async clients.
+    
+    The *_request methods build (url, params, cache key) for each endpoint
+    and the process_* helpers turn responses into model features; the
+    subclasses add the transport and the get_* methods.
+    """
+    
+    def __init__(self, base_url: str = None, timeout: float = 10.0, cache: ResponseCache = None,
+                 history_store: PollutionHistoryStore = None):
+        """
+        Args:
+            base_url: OpenWeather API root (defaults to OPENWEATHER_BASE_URL)
+            timeout: Request timeout in seconds
+            cache: Response cache keyed by endpoint and snapped coordinates;
+                a default one is created when omitted
+            history_store: Local pollution history used to download only the
+                hours not seen yet; an in-memory one is created when omitted
+        """
         self.api_key =  os.getenv('OPENWEATHER_API_KEY')
-        self.base_url = "http://api.openweathermap.org/data/2.5"
-        self.air_pollution_url = "http://api.openweathermap.org/data/2.5/air_pollution"
-        
-    def get_current_weather(self, lat: float, lon: float) -> Dict:
-        """Get current weather data for given coordinates"""
-        url = f"{self.base_url}/weather"
+        self.base_url = base_url or os.getenv('OPENWEATHER_BASE_URL', DEFAULT_BASE_URL)
+        self.air_pollution_url = f"{self.base_url}/air_pollution"
+        self.timeout = timeout
+        self.cache = cache if cache is not None else ResponseCache()
+        self.history_store = history_store if history_store is not None else PollutionHistoryStore()
+    
+    def _current_weather_request(self, lat: float, lon: float) -> Tuple:
         params = {
             'lat': lat,
             'lon': lon,
             'appid': self.api_key,
             'units': 'metric'
         }
-        
-        response = requests.get(url, params=params)
-        response.raise_for_status()
-        return response.json()
+        return f"{self.base_url}/weather", params, self.cache.key('weather', lat, lon)
     
-    def get_air_pollution_current(self, lat: float, lon: float) -> Dict:
-        """Get current air pollution data"""
-        url = f"{self.air_pollution_url}"
+    def _air_pollution_current_request(self, lat: float, lon: float) -> Tuple:
         params = {
             'lat': lat,
             'lon': lon,
             'appid': self.api_key
         }
-        
-        response = requests.get(url, params=params)
-        response.raise_for_status()
-        return response.json()
+        return f"{self.air_pollution_url}", params, self.cache.key('air_pollution', lat, lon)
     
-    def get_air_pollution_history(self, lat: float, lon: float, days: int = 30) -> Dict:
-        """Get historical air pollution data"""
+    def _air_pollution_history_request(self, lat: float, lon: float, days: int = 30) -> Tuple:
         end_time = datetime.now()
         start_time = end_time - timedelta(days=days)
-        
-        url = f"{self.air_pollution_url}/history"
         params = {
             'lat': lat,
             'lon': lon,
@@ -51,24 +71,36 @@ class WeatherAPIClient:
             'end': int(end_time.timestamp()),
             'appid': self.api_key
         }
-        
-        response = requests.get(url, params=params)
-        response.raise_for_status()
-        return response.json()
+        return (f"{self.air_pollution_url}/history", params,
+                self.cache.key('air_pollution_history', lat, lon, days))
     
-    def get_forecast(self, lat: float, lon: float) -> Dict:
-        """Get 5-day weather forecast"""
-        url = f"{self.base_url}/forecast"
+    def _air_pollution_history_range_request(self, lat: float, lon: float, start: int, end: int) -> Tuple:
+        params = {
+            'lat': lat,
+            'lon': lon,
+            'start': start,
+            'end': end,
+            'appid': self.api_key
+        }
+        return f"{self.air_pollution_url}/history", params, None
+    
+    def _forecast_request(self, lat: float, lon: float) -> Tuple:
         params = {
             'lat': lat,
             'lon': lon,
             'appid': self.api_key,
             'units': 'metric'
         }
-        
-        response = requests.get(url, params=params)
-        response.raise_for_status()
-        return response.json()
+        return f"{self.base_url}/forecast", params, self.cache.key('forecast', lat, lon)
+    
+    def _history_window_bounds(self, lat: float, lon: float, days: int) -> Tuple[int, int, Optional[int]]:
+        """(start, end, first hour to download or None) of a `days` history window"""
+        end = int(datetime.now().timestamp())
+        start = end - days * 24 * 3600
+        return start, end, self.history_store.fetch_start(lat, lon, start, end, self.process_air_pollution_data)
+    
+    def _merge_history(self, lat: float, lon: float, history: Dict, fetch_from: int, end: int):
+        self.history_store.merge(lat, lon, history['list'], self.process_air_pollution_data, fetch_from, end)
     
     def process_weather_data(self, weather_data: Dict) -> Dict:
         """Process raw weather data into features for ML model"""
@@ -104,28 +136,178 @@ class WeatherAPIClient:
         
         return processed_data
     
+    def _comprehensive_record(self, lat: float, lon: float, current_weather: Dict, current_pollution: Dict,
+                              historical_features: List[Dict]) -> Dict:
+        """Collected record of one location from its raw responses"""
+        weather_features = self.process_weather_data(current_weather)
+        pollution_features = self.process_air_pollution_data(current_pollution)
+        return {
+            'current_weather': weather_features,
+            'current_pollution': pollution_features[0] if pollution_features else {},
+            'historical_pollution': historical_features,
+            'location': {'lat': lat, 'lon': lon},
+            'collected_at': datetime.now()
+        }
+
+
+class WeatherAPIClient(WeatherClientBase):
+    """Blocking OpenWeather client over a keep-alive requests.Session"""
+    
+    def __init__(self, base_url: str = None, timeout: float = 10.0, cache: ResponseCache = None,
+                 history_store: PollutionHistoryStore = None):
+        super().__init__(base_url=base_url, timeout=timeout, cache=cache, history_store=history_store)
+        
+        # Keep-alive connection pool shared by all requests
+        self.session = requests.Session()
+    
+    def _fetch(self, url: str, params: Dict, cache_key: Tuple = None) -> Dict:
+        """GET a JSON endpoint, served from the cache when possible"""
+        if cache_key is not None:
+            cached = self.cache.get(cache_key)
+            if cached is not MISSING:
+                return cached
+        
+        response = self.session.get(url, params=params, timeout=self.timeout)
+        response.raise_for_status()
+        data = response.json()
+        
+        if cache_key is not None:
+            self.cache.set(cache_key, data)
+        return data
+        
+    def get_current_weather(self, lat: float, lon: float) -> Dict:
+        """Get current weather data for given coordinates"""
+        return self._fetch(*self._current_weather_request(lat, lon))
+    
+    def get_air_pollution_current(self, lat: float, lon: float) -> Dict:
+        """Get current air pollution data"""
+        return self._fetch(*self._air_pollution_current_request(lat, lon))
+    
+    def get_air_pollution_history(self, lat: float, lon: float, days: int = 30) -> Dict:
+        """Get historical air pollution data"""
+        return self._fetch(*self._air_pollution_history_request(lat, lon, days))
+    
+    def get_air_pollution_history_range(self, lat: float, lon: float, start: int, end: int) -> Dict:
+        """Get historical air pollution data between two UNIX timestamps"""
+        return self._fetch(*self._air_pollution_history_range_request(lat, lon, start, end))
+    
+    def get_pollution_history_window(self, lat: float, lon: float, days: int = 7) -> List[Dict]:
+        """
+        Processed hourly pollution history for the last `days` days.
+        
+        Only the hours after the newest one in the local history store are
+        downloaded; the window itself is served from the store.
+        """
+        start, end, fetch_from = self._history_window_bounds(lat, lon, days)
+        if fetch_from is not None:
+            self._merge_history(lat, lon, self.get_air_pollution_history_range(lat, lon, fetch_from, end),
+                                fetch_from, end)
+        
+        return self.history_store.window(lat, lon, start, end)
+    
+    def get_forecast(self, lat: float, lon: float) -> Dict:
+        """Get 5-day weather forecast"""
+        return self._fetch(*self._forecast_request(lat, lon))
+    
     def collect_comprehensive_data(self, lat: float, lon: float) -> Dict:
         """Collect all available data for a location"""
         try:
-            # Get current weather
-            current_weather = self.get_current_weather(lat, lon)
-            weather_features = self.process_weather_data(current_weather)
-            
-            # Get current air pollution
-            current_pollution = self.get_air_pollution_current(lat, lon)
-            pollution_features = self.process_air_pollution_data(current_pollution)
-            
-            # Get historical pollution data
-            historical_pollution = self.get_air_pollution_history(lat, lon, days=7)
-            historical_features = self.process_air_pollution_data(historical_pollution)
+            return self._comprehensive_record(
+                lat, lon,
+                self.get_current_weather(lat, lon),
+                self.get_air_pollution_current(lat, lon),
+                self.get_pollution_history_window(lat, lon, days=7)
+            )
             
-            return {
-                'current_weather': weather_features,
-                'current_pollution': pollution_features[0] if pollution_features else {},
-                'historical_pollution': historical_features,
-                'location': {'lat': lat, 'lon': lon},
-                'collected_at': datetime.now()
-            }
+        except Exception as e:
+            print(f"Error collecting data: {e}")
+            return None
+
+
+class AsyncWeatherAPIClient(WeatherClientBase):
+    """
+    Non-blocking OpenWeather client for use from async endpoints.
+    
+    Its get_* methods are coroutines: they send the same requests as the
+    blocking client, through one pooled keep-alive httpx.AsyncClient.
+    collect_comprehensive_data fires its three requests concurrently.
+    """
+    
+    def __init__(self, base_url: str = None, timeout: float = 10.0, cache: ResponseCache = None,
+                 history_store: PollutionHistoryStore = None, max_connections: int = 100):
+        super().__init__(base_url=base_url, timeout=timeout, cache=cache, history_store=history_store)
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections
+        )
+        self._client = None
+    
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Pooled HTTP client, created on first use inside the event loop"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(timeout=self.timeout, limits=self.limits)
+        return self._client
+    
+    async def aclose(self):
+        """Close the pooled connections"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+    
+    async def _fetch(self, url: str, params: Dict, cache_key: Tuple = None) -> Dict:
+        """GET a JSON endpoint without blocking the event loop, using the cache"""
+        if cache_key is not None:
+            cached = self.cache.get(cache_key)
+            if cached is not MISSING:
+                return cached
+        
+        response = await self.client.get(url, params=params)
+        response.raise_for_status()
+        data = response.json()
+        
+        if cache_key is not None:
+            self.cache.set(cache_key, data)
+        return data
+    
+    async def get_current_weather(self, lat: float, lon: float) -> Dict:
+        """Get current weather data for given coordinates"""
+        return await self._fetch(*self._current_weather_request(lat, lon))
+    
+    async def get_air_pollution_current(self, lat: float, lon: float) -> Dict:
+        """Get current air pollution data"""
+        return await self._fetch(*self._air_pollution_current_request(lat, lon))
+    
+    async def get_air_pollution_history(self, lat: float, lon: float, days: int = 30) -> Dict:
+        """Get historical air pollution data"""
+        return await self._fetch(*self._air_pollution_history_request(lat, lon, days))
+    
+    async def get_air_pollution_history_range(self, lat: float, lon: float, start: int, end: int) -> Dict:
+        """Get historical air pollution data between two UNIX timestamps"""
+        return await self._fetch(*self._air_pollution_history_range_request(lat, lon, start, end))
+    
+    async def get_pollution_history_window(self, lat: float, lon: float, days: int = 7) -> List[Dict]:
+        """Processed hourly pollution history for the last `days` days, fetched incrementally"""
+        start, end, fetch_from = self._history_window_bounds(lat, lon, days)
+        if fetch_from is not None:
+            history = await self.get_air_pollution_history_range(lat, lon, fetch_from, end)
+            self._merge_history(lat, lon, history, fetch_from, end)
+        
+        return self.history_store.window(lat, lon, start, end)
+    
+    async def get_forecast(self, lat: float, lon: float) -> Dict:
+        """Get 5-day weather forecast"""
+        return await self._fetch(*self._forecast_request(lat, lon))
+    
+    async def collect_comprehensive_data(self, lat: float, lon: float) -> Dict:
+        """Collect all available data for a location, with concurrent requests"""
+        try:
+            current_weather, current_pollution, historical_features = await asyncio.gather(
+                self.get_current_weather(lat, lon),
+                self.get_air_pollution_current(lat, lon),
+                self.get_pollution_history_window(lat, lon, days=7)
+            )
+            return self._comprehensive_record(lat, lon, current_weather, current_pollution, historical_features)
             
         except Exception as e:
             print(f"Error collecting data: {e}")
@@ -0,0 +1,56 @@
+from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor, HistGradientBoostingRegressor
+from typing import Callable, Dict, List, Optional
+
+# Candidate models compared per target, by name: a factory that takes the
+# predictor and returns an unfitted regressor, whether the model accepts NaN
+# features (needed with missing='native'), the parameter that sets its number
+# of boosting stages (for early stopping) and the parameter settings tried
+# by the configuration search
+CANDIDATES: Dict[str, Dict] = {}
+
+# The models training has always compared; others are opt-in (TRAIN_CANDIDATES)
+DEFAULT_CANDIDATES = ['random_forest', 'gradient_boosting']
+
+
+def register_candidate(name: str, factory: Callable, handles_missing: bool = False,
+                       stages: Optional[str] = None, search: Optional[List[Dict]] = None):
+    """Make a model available as a training candidate under `name`"""
+    CANDIDATES[name] = {
+        'factory': factory,
+        'handles_missing': handles_missing,
+        'stages': stages,
+        'search': search or [{}],
+    }
+
+
+def config_name(name: str, params: Dict) -> str:
+    """Name of a candidate with parameters set by the search, e.g. random_forest(min_samples_leaf=5)"""
+    if not params:
+        return name
+    return f"{name}({', '.join(f'{key}={value}' for key, value in params.items())})"
+
+
+def candidate_names() -> List[str]:
+    return list(CANDIDATES)
+
+
+register_candidate(
+    'random_forest',
+    # Random forests in scikit-learn 1.3 (pinned) reject NaN features
+    lambda predictor: RandomForestRegressor(n_estimators=100, random_state=42, n_jobs=predictor.n_jobs),
+    search=[{}, {'max_features': 0.5}, {'min_samples_leaf': 5}]
+)
+register_candidate(
+    'gradient_boosting',
+    lambda predictor: GradientBoostingRegressor(n_estimators=100, random_state=42),
+    stages='n_estimators',
+    search=[{}, {'learning_rate': 0.2}, {'max_depth': 5}]
+)
+register_candidate(
+    'hist_gradient_boosting',
+    # Early stopping is done on time-ordered rows, not scikit-learn's random split
+    lambda predictor: HistGradientBoostingRegressor(max_iter=100, early_stopping=False, random_state=42),
+    handles_missing=True,
+    stages='max_iter',
+    search=[{}, {'learning_rate': 0.2}, {'max_leaf_nodes': 63}]
+)
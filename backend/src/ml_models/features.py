@@ -0,0 +1,184 @@
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import LabelEncoder
+from typing import Dict, Iterable, List, Optional, Union
+
+from ml_models.observation import (
+    WEATHER_FIELDS, POLLUTION_FIELDS, SATELLITE_FIELDS, SURFACE_FIELDS, LOCATION_FIELDS,
+    TIME_COLUMNS, HISTORY_FIELDS, SECTION_COLUMNS, VALUE_SECTIONS, WEATHER, TIME, HISTORY,
+    Observation, as_observations
+)
+
+# Column with each record's collection time (nanoseconds since the epoch),
+# added to training frames for time-ordered validation; it is not a feature
+COLLECTED_AT = 'collected_at'
+
+
+def _column(n: int, rows: np.ndarray, values: List) -> np.ndarray:
+    """Scatter the values of the rows that have a section into a NaN column"""
+    column = np.full(n, np.nan)
+    if len(rows):
+        column[rows] = np.array(values, dtype=float)
+    return column
+
+
+def _time_columns(timestamps: np.ndarray) -> Dict[str, np.ndarray]:
+    """Hour, weekday, month and weekend flag for wall-clock nanosecond timestamps"""
+    index = pd.DatetimeIndex(timestamps.astype('datetime64[ns]'))
+    day_of_week = np.asarray(index.dayofweek)
+    return {
+        'hour': np.asarray(index.hour),
+        'day_of_week': day_of_week,
+        'month': np.asarray(index.month),
+        'is_weekend': (day_of_week >= 5).astype(int),
+    }
+
+
+def _history_means(histories: List[np.ndarray]) -> Dict[str, np.ndarray]:
+    """Per-record mean of each historical pollutant, skipping missing values"""
+    lengths = np.fromiter((len(hist) for hist in histories), dtype=np.int64, count=len(histories))
+    group = np.repeat(np.arange(len(histories)), lengths)
+    stacked = np.concatenate(histories).astype(np.float64)
+
+    means = {}
+    for j, (name, _) in enumerate(HISTORY_FIELDS):
+        values = stacked[:, j]
+        valid = ~np.isnan(values)
+        sums = np.bincount(group[valid], weights=values[valid], minlength=len(histories))
+        counts = np.bincount(group[valid], minlength=len(histories))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means[name] = sums / counts
+    return means
+
+
+def _raw_feature_frame(data: List[Union[Dict, Observation]], collected_at: bool = False) -> pd.DataFrame:
+    """Feature columns of a list of records, before encoding and filling"""
+    observations = as_observations(data)
+    n = len(observations)
+    columns = {}
+
+    # Which sections each record has
+    codes = np.fromiter((o.present for o in observations), dtype=np.int64, count=n)
+    rows = [np.flatnonzero(codes >> bit & 1) for bit in range(len(SECTION_COLUMNS))]
+
+    # Weather, pollution, satellite, surface and location features
+    values = np.stack([o.values for o in observations])
+    for bit, fields, offset in VALUE_SECTIONS:
+        for j, field in enumerate(fields):
+            columns[field[0]] = _column(n, rows[bit], values[rows[bit], offset + j])
+    condition = np.full(n, None, dtype=object)
+    condition[rows[WEATHER]] = [observations[i].condition for i in rows[WEATHER]]
+    columns['weather_condition'] = condition
+
+    # Time features
+    if len(rows[TIME]):
+        timestamps = np.array([observations[i].timestamp for i in rows[TIME]], dtype=np.int64)
+        time_values = _time_columns(timestamps)
+        for name in TIME_COLUMNS:
+            columns[name] = _column(n, rows[TIME], time_values[name])
+
+    # Historical pollution trends (simple moving averages)
+    if len(rows[HISTORY]):
+        hist_means = _history_means([observations[i].history for i in rows[HISTORY]])
+        for name, _ in HISTORY_FIELDS:
+            columns[name] = _column(n, rows[HISTORY], hist_means[name])
+
+    # Columns appear in the order they are first seen across records
+    unique_codes, first_seen = np.unique(codes, return_index=True)
+    ordered = {}
+    for code in unique_codes[np.argsort(first_seen)]:
+        for bit, section in enumerate(SECTION_COLUMNS):
+            if code >> bit & 1:
+                ordered.update(dict.fromkeys(section))
+    if collected_at:
+        columns[COLLECTED_AT] = np.array([np.nan if o.timestamp is None else o.timestamp for o in observations],
+                                         dtype=float)
+        ordered[COLLECTED_AT] = None
+
+    return pd.DataFrame({name: columns[name] for name in ordered}, index=pd.RangeIndex(n))
+
+
+def _finish_frame(df: pd.DataFrame, fill_missing: bool = True) -> pd.DataFrame:
+    """Encode the weather condition and fill missing values (or leave them NaN)"""
+    # Handle categorical variables
+    weather_classes = []
+    if 'weather_condition' in df.columns:
+        le = LabelEncoder()
+        df['weather_condition_encoded'] = le.fit_transform(df['weather_condition'].fillna('Clear'))
+        df.drop('weather_condition', axis=1, inplace=True)
+        weather_classes = [str(c) for c in le.classes_]
+
+    # Fill missing values
+    if fill_missing:
+        df = df.fillna(0)
+
+    # Keep the encoder classes so inference can reuse the training encoding
+    df.attrs['weather_classes'] = weather_classes
+
+    return df
+
+
+def build_feature_frame(data: List[Union[Dict, Observation]], fill_missing: bool = True,
+                        collected_at: bool = False) -> pd.DataFrame:
+    """
+    Build the feature frame for a list of collected records in columnar form.
+
+    Records may be collected dicts or Observations. Produces the same frame
+    as building one feature dict per record: the flat fields of all records
+    are stacked into one matrix, time features are derived in a single call
+    and historical averages are computed with grouped sums. Missing values
+    are 0, or NaN without `fill_missing`. With `collected_at`, the frame
+    ends with a COLLECTED_AT column.
+    """
+    if len(data) == 0:
+        return pd.DataFrame()
+
+    return _finish_frame(_raw_feature_frame(data, collected_at), fill_missing)
+
+
+def build_feature_frame_chunked(chunks: Iterable[List[Union[Dict, Observation]]],
+                                fill_missing: bool = True, collected_at: bool = False) -> pd.DataFrame:
+    """
+    Build the feature frame of records that arrive in chunks.
+
+    Only one chunk of records is held at a time; the result equals
+    build_feature_frame() over all records, since encoding and filling run
+    once on the concatenated columns.
+    """
+    frames = [_raw_feature_frame(chunk, collected_at) for chunk in chunks if len(chunk)]
+    if not frames:
+        return pd.DataFrame()
+
+    return _finish_frame(pd.concat(frames, ignore_index=True, sort=False), fill_missing)
+
+
+def build_feature_frame_encoded(chunks: Iterable[List[Union[Dict, Observation]]], feature_columns: List[str],
+                                weather_classes: Optional[List[str]], target_columns: List[str],
+                                fill_missing: bool = True, collected_at: bool = False) -> pd.DataFrame:
+    """
+    Feature frame of records encoded like an existing model set, for updating it.
+
+    The weather condition uses the model set's classes (unseen conditions
+    encode to 0, as at inference), and the frame has exactly its feature
+    columns (missing ones are 0) in their order, followed by those of
+    `target_columns` that the records have (and COLLECTED_AT with
+    `collected_at`). Without `fill_missing`, missing feature values are
+    left NaN.
+    """
+    frames = [_raw_feature_frame(chunk, collected_at) for chunk in chunks if len(chunk)]
+    if not frames:
+        return pd.DataFrame()
+    df = pd.concat(frames, ignore_index=True, sort=False)
+
+    if 'weather_condition' in df.columns:
+        codes = {c: i for i, c in enumerate(weather_classes or [])}
+        df['weather_condition_encoded'] = df['weather_condition'].fillna('Clear').map(codes).fillna(0)
+        df = df.drop(columns='weather_condition')
+
+    targets = [name for name in target_columns if name in df.columns]
+    extra = targets + [COLLECTED_AT] if collected_at else targets
+    df = df.reindex(columns=list(feature_columns) + extra)
+    if not fill_missing:
+        df[extra] = df[extra].fillna(0)
+        return df
+    return df.fillna(0)
@@ -0,0 +1,83 @@
+import copy
+import numpy as np
+from sklearn.ensemble import (
+    RandomForestRegressor, ExtraTreesRegressor, GradientBoostingRegressor, HistGradientBoostingRegressor
+)
+from sklearn.linear_model import SGDRegressor
+from sklearn.preprocessing import StandardScaler
+
+from ml_models.validation import fit_early_stopped
+
+# How each kind of trained model is brought up to date with new data
+STRATEGIES = ('forest_warm_start', 'gbm_window', 'linear_partial_fit')
+
+
+def update_strategy(model) -> str:
+    """
+    'forest_warm_start' for forests, 'gbm_window' for gradient boosting and
+    'linear_partial_fit' for everything else
+    """
+    if isinstance(model, (RandomForestRegressor, ExtraTreesRegressor)):
+        return 'forest_warm_start'
+    if isinstance(model, (GradientBoostingRegressor, HistGradientBoostingRegressor)):
+        return 'gbm_window'
+    return 'linear_partial_fit'
+
+
+def grow_forest(model, X: np.ndarray, y: np.ndarray, n_trees: int, max_trees: int):
+    """
+    A copy of a fitted forest with `n_trees` more trees fitted on (X, y).
+
+    The existing trees are shared with the original, which is left as it
+    is. Past `max_trees`, the oldest trees are dropped, so the forest
+    follows the recent data.
+    """
+    grown = copy.copy(model)
+    keep = max(0, max_trees - n_trees)
+    grown.estimators_ = list(model.estimators_)[-keep:] if keep else []
+    grown.set_params(warm_start=True, n_estimators=len(grown.estimators_) + n_trees)
+    grown.fit(X, y)
+    grown.set_params(warm_start=False)
+    return grown
+
+
+def fit_gbm_window(X: np.ndarray, y: np.ndarray, max_iter: int = 100, early_stopping: bool = True):
+    """
+    Histogram gradient boosting fitted from scratch on a window of recent
+    rows, in collection order. Early stopping holds out the most recent
+    rows, not scikit-learn's shuffled validation split.
+    """
+    model = HistGradientBoostingRegressor(max_iter=max_iter, early_stopping=False, random_state=42)
+    if early_stopping:
+        return fit_early_stopped(model, 'max_iter', X, y)
+    return model.fit(X, y)
+
+
+class OnlineLinearRegressor:
+    """
+    Linear model updated with partial_fit, for models without an incremental path.
+
+    Features are standardized with running statistics and fitted with SGD,
+    `epochs` passes over each batch of new rows.
+    """
+
+    def __init__(self, epochs: int = 5, random_state: int = 42):
+        self.epochs = epochs
+        self.scaler = StandardScaler()
+        self.model = SGDRegressor(random_state=random_state)
+
+    def partial_fit(self, X: np.ndarray, y: np.ndarray) -> 'OnlineLinearRegressor':
+        self.scaler.partial_fit(X)
+        X_scaled = self.scaler.transform(X)
+        for _ in range(self.epochs):
+            self.model.partial_fit(X_scaled, y)
+        return self
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        return self.model.predict(self.scaler.transform(X))
+
+
+def update_linear(model, X: np.ndarray, y: np.ndarray) -> OnlineLinearRegressor:
+    """A copy of an OnlineLinearRegressor updated with (X, y), or a new one for any other model"""
+    updated = copy.deepcopy(model) if isinstance(model, OnlineLinearRegressor) else OnlineLinearRegressor()
+    return updated.partial_fit(X, y)
@@ -0,0 +1,278 @@
+import threading
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from sklearn.ensemble import RandomForestRegressor, ExtraTreesRegressor
+from typing import Dict, List, Optional
+
+from ml_models.observation import (
+    WEATHER_FIELDS, POLLUTION_FIELDS, SATELLITE_FIELDS, SURFACE_FIELDS,
+    LOCATION_FIELDS, HISTORY_FIELDS, VALUE_COLUMNS, WEATHER, TIME, HISTORY, Observation
+)
+
+
+def _layout(feature_columns: List[str], fields: List[tuple]) -> List[tuple]:
+    """(row index, source key, default) for every field that the model uses"""
+    index = {name: i for i, name in enumerate(feature_columns)}
+    layout = []
+    for field in fields:
+        name, key = field[0], field[1]
+        default = field[2] if len(field) > 2 else 0
+        if name in index:
+            layout.append((index[name], key, default))
+    return layout
+
+
+def forest_predict(model, X: np.ndarray) -> np.ndarray:
+    """
+    Average the tree outputs of a fitted forest directly.
+
+    Equivalent to `model.predict(X)` but skips input validation and the
+    joblib dispatch that dominate single-row latency.
+    """
+    X = np.ascontiguousarray(X, dtype=np.float32)
+    estimators = model.estimators_
+    total = estimators[0].tree_.predict(X).copy()
+    for estimator in estimators[1:]:
+        total += estimator.tree_.predict(X)
+    total /= len(estimators)
+
+    # Regression trees hold a single value per output
+    total = total.reshape(X.shape[0], model.n_outputs_)
+    return total[:, 0] if model.n_outputs_ == 1 else total
+
+
+def model_predict(model, X: np.ndarray) -> np.ndarray:
+    """Predict with a fitted regressor, using the direct path for forests"""
+    if isinstance(model, (RandomForestRegressor, ExtraTreesRegressor)):
+        return forest_predict(model, X)
+    return model.predict(X)
+
+
+class CompiledInference:
+    """
+    Precomputed inference plan for one set of trained models.
+
+    Fills a preallocated float64 row straight from a collected record,
+    standardizes it once per distinct scaler with the stored statistics
+    and runs each model on its row. Targets that share a scaler share the
+    scaled row, and targets without a scaler use the raw row. A
+    multi-output model is run once and each target reads its output column.
+    Missing values are 0, or NaN with missing='native', as in training.
+    """
+
+    def __init__(self, feature_columns: List[str], models: Dict, scalers: Dict,
+                 weather_classes: Optional[List[str]] = None,
+                 output_index: Optional[Dict[str, int]] = None, missing: str = 'zero'):
+        self.feature_columns = list(feature_columns)
+        self._fill = np.nan if missing == 'native' else 0.0
+        self.targets = list(models)
+        self.models = [models[t] for t in self.targets]
+        self._outputs = [(output_index or {}).get(t) for t in self.targets]
+        self._local = threading.local()
+
+        # Scaler statistics stacked as (n_distinct_scalers, n_features); each
+        # target points at its slot, or at -1 when it is not scaled
+        n_features = len(self.feature_columns)
+        slots = {}
+        means, scales = [], []
+        self._slots = []
+        for target in self.targets:
+            scaler = scalers.get(target)
+            if scaler is None:
+                self._slots.append(-1)
+                continue
+            if id(scaler) not in slots:
+                slots[id(scaler)] = len(means)
+                mean = getattr(scaler, 'mean_', None)
+                scale = getattr(scaler, 'scale_', None)
+                means.append(np.zeros(n_features) if mean is None else mean)
+                scales.append(np.ones(n_features) if scale is None else scale)
+            self._slots.append(slots[id(scaler)])
+        self._means = np.array(means).reshape(len(means), n_features)
+        self._scales = np.array(scales).reshape(len(scales), n_features)
+
+        self._weather = _layout(self.feature_columns, WEATHER_FIELDS)
+        self._pollution = _layout(self.feature_columns, POLLUTION_FIELDS)
+        self._satellite = _layout(self.feature_columns, SATELLITE_FIELDS)
+        self._surface = _layout(self.feature_columns, SURFACE_FIELDS)
+        self._location = _layout(self.feature_columns, LOCATION_FIELDS)
+        self._history = _layout(self.feature_columns, HISTORY_FIELDS)
+
+        index = {name: i for i, name in enumerate(self.feature_columns)}
+        self._time = [(index[name], name) for name in ('hour', 'day_of_week', 'month', 'is_weekend')
+                      if name in index]
+        self._condition_index = index.get('weather_condition_encoded')
+
+        # Observation values that the model uses: (section bit, value index, row index)
+        value_index = {name: j for j, name in enumerate(VALUE_COLUMNS)}
+        self._value_layout = [
+            (bit, value_index[field[0]], index[field[0]])
+            for bit, fields in enumerate((WEATHER_FIELDS, POLLUTION_FIELDS, SATELLITE_FIELDS,
+                                          SURFACE_FIELDS, LOCATION_FIELDS))
+            for field in fields if field[0] in index
+        ]
+        self._history_columns = [
+            (j, index[name]) for j, (name, _) in enumerate(HISTORY_FIELDS) if name in index
+        ]
+
+        # Without the training classes a single record always encodes to 0,
+        # which is what fitting a fresh LabelEncoder on it produced
+        self._condition_codes = {c: i for i, c in enumerate(weather_classes or [])}
+
+    def fill_row(self, item: Dict, row: np.ndarray):
+        """Write the features of one record into `row`"""
+        if isinstance(item, Observation):
+            return self.fill_observation(item, row)
+        fill = self._fill
+        row.fill(fill)
+
+        if 'current_weather' in item:
+            weather = item['current_weather']
+            for i, key, default in self._weather:
+                value = weather.get(key, default)
+                row[i] = fill if value is None else value
+            if self._condition_index is not None:
+                condition = weather.get('weather_condition', 'Clear') or 'Clear'
+                row[self._condition_index] = self._condition_codes.get(condition, 0)
+
+        if 'current_pollution' in item:
+            pollution = item['current_pollution']
+            for i, key, default in self._pollution:
+                value = pollution.get(key, default)
+                row[i] = fill if value is None else value
+
+        if item.get('atmospheric'):
+            sat_data = item['atmospheric']['satellite_data']
+            for i, key, _ in self._satellite:
+                row[i] = sat_data.get(key, 0) or 0
+
+        if item.get('surface'):
+            surface = item['surface']
+            for i, key, _ in self._surface:
+                row[i] = surface.get(key, 0) or 0
+
+        if 'location' in item:
+            location = item['location']
+            for i, key, default in self._location:
+                value = location.get(key, default)
+                row[i] = fill if value is None else value
+
+        if 'collected_at' in item and self._time:
+            timestamp = item['collected_at']
+            if not isinstance(timestamp, datetime):
+                timestamp = pd.to_datetime(timestamp)
+            day_of_week = timestamp.weekday()
+            values = {
+                'hour': timestamp.hour,
+                'day_of_week': day_of_week,
+                'month': timestamp.month,
+                'is_weekend': 1 if day_of_week >= 5 else 0
+            }
+            for i, name in self._time:
+                row[i] = values[name]
+
+        if item.get('historical_pollution') and self._history:
+            hist_data = item['historical_pollution']
+            for i, key, _ in self._history:
+                values = np.array([entry.get(key) for entry in hist_data], dtype=float)
+                valid = values[~np.isnan(values)]
+                row[i] = valid.mean() if len(valid) else fill
+
+        return row
+
+    def fill_observation(self, observation: Observation, row: np.ndarray):
+        """fill_row() for a compact Observation"""
+        fill = self._fill
+        row.fill(fill)
+        present, values = observation.present, observation.values
+
+        for bit, j, i in self._value_layout:
+            if present >> bit & 1:
+                value = values[j]
+                row[i] = fill if value != value else value
+
+        if self._condition_index is not None and present >> WEATHER & 1:
+            row[self._condition_index] = self._condition_codes.get(observation.condition or 'Clear', 0)
+
+        if present >> TIME & 1 and self._time:
+            timestamp = pd.Timestamp(observation.timestamp)
+            day_of_week = timestamp.weekday()
+            time_values = {
+                'hour': timestamp.hour,
+                'day_of_week': day_of_week,
+                'month': timestamp.month,
+                'is_weekend': 1 if day_of_week >= 5 else 0
+            }
+            for i, name in self._time:
+                row[i] = time_values[name]
+
+        if present >> HISTORY & 1 and self._history_columns:
+            history = observation.history.astype(np.float64)
+            valid = ~np.isnan(history)
+            counts = valid.sum(axis=0)
+            sums = np.where(valid, history, 0).sum(axis=0)
+            for j, i in self._history_columns:
+                row[i] = sums[j] / counts[j] if counts[j] else fill
+
+        return row
+
+    def fill_matrix(self, items: List[Dict]) -> np.ndarray:
+        """Feature matrix of many records, one row per record"""
+        X = np.zeros((len(items), len(self.feature_columns)))
+        for item, row in zip(items, X):
+            self.fill_row(item, row)
+        return X
+
+    def predict_matrix(self, X: np.ndarray) -> Dict[str, np.ndarray]:
+        """Predict every target for the rows of an unscaled feature matrix"""
+        scaled = {}
+        outputs = {}
+        columns = {}
+        for i, target in enumerate(self.targets):
+            slot = self._slots[i]
+            if slot >= 0 and slot not in scaled:
+                scaled[slot] = (X - self._means[slot]) / self._scales[slot]
+            key = (id(self.models[i]), slot)
+            if key not in outputs:
+                outputs[key] = model_predict(self.models[i], X if slot < 0 else scaled[slot])
+            pred = outputs[key]
+            if self._outputs[i] is not None:
+                pred = pred[:, self._outputs[i]]
+            columns[target] = np.maximum(pred, 0)  # Ensure non-negative
+        return columns
+
+    def predict_records(self, items: List[Dict]) -> List[Dict[str, float]]:
+        """Predict every target for many records with one model call per target"""
+        if not items:
+            return []
+        columns = self.predict_matrix(self.fill_matrix(items))
+        return [
+            {target: float(columns[target][n]) for target in self.targets}
+            for n in range(len(items))
+        ]
+
+    def predict_record(self, item: Dict) -> Dict[str, float]:
+        """Predict every target for a single collected record"""
+        # One preallocated row per thread
+        row = getattr(self._local, 'row', None)
+        if row is None:
+            row = self._local.row = np.zeros(len(self.feature_columns))
+        self.fill_row(item, row)
+
+        # Standardize the row once per distinct scaler
+        X_scaled = (row - self._means) / self._scales
+
+        predictions = {}
+        outputs = {}
+        for i, target in enumerate(self.targets):
+            slot = self._slots[i]
+            key = (id(self.models[i]), slot)
+            if key not in outputs:
+                X = row[None, :] if slot < 0 else X_scaled[slot:slot + 1]
+                outputs[key] = model_predict(self.models[i], X)[0]
+            pred = outputs[key]
+            if self._outputs[i] is not None:
+                pred = pred[self._outputs[i]]
+            predictions[target] = max(0, float(pred))  # Ensure non-negative
+        return predictions
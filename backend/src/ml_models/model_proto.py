@@ -1,152 +1,332 @@
-
 import pandas as pd
 import numpy as np
-from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
-from sklearn.model_selection import train_test_split, cross_val_score
-from sklearn.preprocessing import StandardScaler, LabelEncoder
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.model_selection import cross_val_score
+from sklearn.preprocessing import StandardScaler
 from sklearn.metrics import mean_squared_error, r2_score, mean_absolute_error
 import joblib
+import json
+from joblib import Parallel, delayed
 import os
+import sys
+import time
+import random
 from datetime import datetime, timedelta
-from typing import Dict, List, Tuple, Optional
+from typing import Callable, Dict, Iterable, List, Tuple, Optional
 import warnings
 warnings.filterwarnings('ignore')
 
+# Add the src directory to the path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from ml_models.features import (
+    COLLECTED_AT, build_feature_frame, build_feature_frame_chunked, build_feature_frame_encoded
+)
+from ml_models.candidates import CANDIDATES, DEFAULT_CANDIDATES, config_name
+from ml_models.incremental import (
+    OnlineLinearRegressor, update_strategy, grow_forest, fit_gbm_window, update_linear
+)
+from ml_models.inference import CompiledInference
+from ml_models.registry import ModelRegistry, ModelVersion
+from ml_models.validation import HOLDOUT_MODES, holdout_split, fit_early_stopped, halving_rounds
+
+
+def _fit_candidate(model, X_train: np.ndarray, y_train: np.ndarray, X_test: np.ndarray,
+                   stages: Optional[str] = None) -> Tuple:
+    """
+    Fit one candidate model, early stopped on its `stages` parameter if
+    given; returns (model, test predictions, fit seconds)
+    """
+    start = time.perf_counter()
+    if stages:
+        fit_early_stopped(model, stages, X_train, y_train)
+    else:
+        model.fit(X_train, y_train)
+    fit_time = time.perf_counter() - start
+    return model, model.predict(X_test), fit_time
+
+
+# Each saved model version is one joblib artifact, indexed by the manifest
+MANIFEST_NAME = 'manifest.json'
+ARTIFACT_SUFFIX = '.joblib'
+ARTIFACT_FORMAT = 1
+
+SCALING_MODES = ('per_target', 'shared', 'none')
+ENGINES = ('per_target', 'multi_output')
+MASK_POLICIES = ('complete', 'impute')
+MISSING_MODES = ('zero', 'native')
+
+
 class AirPollutionPredictor:
-    def __init__(self, model_save_path: str = "data/models/"):
+    def __init__(self, model_save_path: str = "data/models/", scaling: str = 'shared',
+                 engine: str = 'per_target', mask_policy: str = 'complete',
+                 n_jobs: Optional[int] = None, train_workers: int = 1,
+                 incremental_trees: int = 20, max_trees: int = 300, window_rows: int = 20000,
+                 candidates: Optional[List[str]] = None, missing: str = 'zero',
+                 holdout: str = 'time', early_stopping: bool = True, search: bool = False,
+                 halving_eta: int = 3):
+        """
+        Args:
+            model_save_path: Directory for saved models
+            scaling: 'per_target' fits one StandardScaler per pollutant,
+                'shared' fits a single scaler for all targets and 'none'
+                skips scaling (tree models do not need it)
+            engine: 'per_target' trains one model per pollutant,
+                'multi_output' trains a single forest that predicts all of them
+            mask_policy: How the multi-output engine handles targets <= 0:
+                'complete' fits on rows where every target is valid, 'impute'
+                fills invalid targets with the median of the valid ones
+            n_jobs: Threads per random forest fit (None means 1, -1 all cores)
+            train_workers: Processes that fit target x candidate models in
+                parallel (1 trains sequentially in this process)
+            incremental_trees: Trees fitted on the new data per forest by
+                train_incremental()
+            max_trees: Largest forest train_incremental() grows; the oldest
+                trees are dropped past it
+            window_rows: Most recent rows a gradient boosting model is
+                refitted on by train_incremental()
+            candidates: Registered candidate models compared per target
+                (see ml_models.candidates; default TRAIN_CANDIDATES, or
+                random_forest and gradient_boosting)
+            missing: 'zero' fills missing feature values with 0, 'native'
+                leaves them NaN for candidates that handle missing values
+                (the others are skipped; per-target engine only)
+            holdout: 'time' scores models on the most recently collected
+                20% of the rows, 'random' on a shuffled 20%
+            early_stopping: Stop adding boosting stages once the score on
+                the most recent training rows stops improving
+            search: Also try the parameter settings each candidate registers
+                (off by default: it fits three settings per candidate)
+            halving_eta: Successive halving keeps the best 1/halving_eta of
+                the candidate configurations per round, fitted on
+                halving_eta times the rows of the round before (1 fits
+                every configuration on all rows)
+        """
+        if scaling not in SCALING_MODES:
+            raise ValueError(f"Unknown scaling mode: {scaling}")
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown engine: {engine}")
+        if mask_policy not in MASK_POLICIES:
+            raise ValueError(f"Unknown mask policy: {mask_policy}")
+        if engine == 'multi_output' and scaling == 'per_target':
+            raise ValueError("The multi-output engine needs 'shared' or 'none' scaling")
+        if missing not in MISSING_MODES:
+            raise ValueError(f"Unknown missing value mode: {missing}")
+        if holdout not in HOLDOUT_MODES:
+            raise ValueError(f"Unknown holdout mode: {holdout}")
+        if candidates is None:
+            candidates = os.getenv('TRAIN_CANDIDATES', ','.join(DEFAULT_CANDIDATES)).split(',')
+        unknown = [name for name in candidates if name not in CANDIDATES]
+        if not candidates:
+            raise ValueError("No candidate models")
+        if unknown:
+            raise ValueError(f"Unknown candidate models: {', '.join(unknown)}")
+        if engine == 'multi_output' and missing == 'native':
+            raise ValueError("The multi-output forest needs missing='zero'")
+        if missing == 'native' and not any(CANDIDATES[name]['handles_missing'] for name in candidates):
+            raise ValueError("missing='native' needs a candidate model that handles missing values "
+                             "(e.g. hist_gradient_boosting)")
+        
         self.model_save_path = model_save_path
-        self.models = {}
-        self.scalers = {}
-        self.feature_columns = []
+        self.scaling = scaling
+        self.engine = engine
+        self.mask_policy = mask_policy
+        self.n_jobs = n_jobs
+        self.train_workers = train_workers
+        self.incremental_trees = incremental_trees
+        self.max_trees = max_trees
+        self.window_rows = window_rows
+        self.candidates = list(candidates)
+        self.missing = missing
+        self.holdout = holdout
+        self.early_stopping = early_stopping
+        self.search = search
+        self.halving_eta = halving_eta
         self.target_columns = ['pm2_5', 'pm10', 'no2', 'o3', 'aqi']
         
+        # Trained model sets; training and loading publish a new active version
+        self.registry = ModelRegistry()
+        
+        # Called with (stage, fraction done) while training, e.g. by a job worker
+        self.progress_callback: Optional[Callable[[str, float], None]] = None
+        
         # Create directory if it doesn't exist
         os.makedirs(model_save_path, exist_ok=True)
     
+    @property
+    def active_version(self) -> Optional[ModelVersion]:
+        """Model set serving predictions; hold on to it for a consistent view"""
+        return self.registry.active
+    
+    @property
+    def version_id(self) -> Optional[str]:
+        version = self.registry.active
+        return version.version_id if version else None
+    
+    @property
+    def models(self) -> Dict:
+        version = self.registry.active
+        return version.models if version else {}
+    
+    @property
+    def scalers(self) -> Dict:
+        version = self.registry.active
+        return version.scalers if version else {}
+    
+    @property
+    def scaler(self) -> Optional[StandardScaler]:
+        version = self.registry.active
+        return version.scaler if version else None
+    
+    @property
+    def feature_columns(self) -> List[str]:
+        version = self.registry.active
+        return version.feature_columns if version else []
+    
+    @property
+    def weather_classes(self) -> Optional[List[str]]:
+        version = self.registry.active
+        return version.weather_classes if version else None
+    
+    @property
+    def output_index(self) -> Dict[str, int]:
+        version = self.registry.active
+        return version.output_index if version else {}
+    
+    def config(self) -> Dict:
+        """Constructor arguments that recreate this predictor (e.g. in a worker process)"""
+        return {
+            'model_save_path': self.model_save_path,
+            'scaling': self.scaling,
+            'engine': self.engine,
+            'mask_policy': self.mask_policy,
+            'n_jobs': self.n_jobs,
+            'train_workers': self.train_workers,
+            'incremental_trees': self.incremental_trees,
+            'max_trees': self.max_trees,
+            'window_rows': self.window_rows,
+            'candidates': self.candidates,
+            'missing': self.missing,
+            'holdout': self.holdout,
+            'early_stopping': self.early_stopping,
+            'search': self.search,
+            'halving_eta': self.halving_eta,
+        }
+    
+    def _report_progress(self, stage: str, fraction: float):
+        if self.progress_callback is not None:
+            self.progress_callback(stage, fraction)
+    
     def prepare_features(self, data: List[Dict]) -> pd.DataFrame:
         """
         Prepare features from collected data for ML model
         """
-        features_list = []
-        
-        for item in data:
-            feature_dict = {}
-            
-            # Weather features
-            if 'current_weather' in item:
-                weather = item['current_weather']
-                feature_dict.update({
-                    'temperature': weather.get('temperature', 0),
-                    'humidity': weather.get('humidity', 0),
-                    'pressure': weather.get('pressure', 0),
-                    'wind_speed': weather.get('wind_speed', 0),
-                    'wind_direction': weather.get('wind_direction', 0),
-                    'visibility': weather.get('visibility', 10000),
-                })
-                
-                # Encode weather condition
-                weather_condition = weather.get('weather_condition', 'Clear')
-                feature_dict['weather_condition'] = weather_condition
-            
-            # Air pollution features (current)
-            if 'current_pollution' in item:
-                pollution = item['current_pollution']
-                feature_dict.update({
-                    'pm2_5': pollution.get('pm2_5', 0),
-                    'pm10': pollution.get('pm10', 0),
-                    'no2': pollution.get('no2', 0),
-                    'o3': pollution.get('o3', 0),
-                    'co': pollution.get('co', 0),
-                    'so2': pollution.get('so2', 0),
-                    'aqi': pollution.get('aqi', 0)
-                })
-            
-            # Satellite features
-            if 'atmospheric' in item and item['atmospheric']:
-                sat_data = item['atmospheric']['satellite_data']
-                feature_dict.update({
-                    'sat_no2': sat_data.get('no2', 0) or 0,
-                    'sat_o3': sat_data.get('o3', 0) or 0,
-                    'sat_so2': sat_data.get('so2', 0) or 0,
-                    'sat_co': sat_data.get('co', 0) or 0,
-                    'sat_aerosol': sat_data.get('aerosol', 0) or 0
-                })
-            
-            # Surface features
-            if 'surface' in item and item['surface']:
-                surface = item['surface']
-                feature_dict.update({
-                    'ndvi': surface.get('ndvi', 0) or 0,
-                    'surface_temp': surface.get('surface_temperature', 0) or 0,
-                    'vegetation_health': surface.get('vegetation_health', 0) or 0
-                })
-            
-            # Location features
-            if 'location' in item:
-                location = item['location']
-                feature_dict.update({
-                    'latitude': location.get('lat', 0),
-                    'longitude': location.get('lon', 0)
-                })
-            
-            # Time features
-            if 'collected_at' in item:
-                timestamp = pd.to_datetime(item['collected_at'])
-                feature_dict.update({
-                    'hour': timestamp.hour,
-                    'day_of_week': timestamp.dayofweek,
-                    'month': timestamp.month,
-                    'is_weekend': 1 if timestamp.dayofweek >= 5 else 0
-                })
-            
-            # Historical pollution trends (simple moving averages)
-            if 'historical_pollution' in item and item['historical_pollution']:
-                hist_data = item['historical_pollution']
-                hist_df = pd.DataFrame(hist_data)
-                
-                if not hist_df.empty:
-                    feature_dict.update({
-                        'hist_pm2_5_avg': hist_df['pm2_5'].mean(),
-                        'hist_pm10_avg': hist_df['pm10'].mean(),
-                        'hist_no2_avg': hist_df['no2'].mean(),
-                        'hist_o3_avg': hist_df['o3'].mean(),
-                        'hist_aqi_avg': hist_df['aqi'].mean()
-                    })
-            
-            features_list.append(feature_dict)
-        
-        df = pd.DataFrame(features_list)
-        
-        # Handle categorical variables
-        if 'weather_condition' in df.columns:
-            le = LabelEncoder()
-            df['weather_condition_encoded'] = le.fit_transform(df['weather_condition'].fillna('Clear'))
-            df.drop('weather_condition', axis=1, inplace=True)
-        
-        # Fill missing values
-        df = df.fillna(0)
-        
-        return df
+        return build_feature_frame(data, fill_missing=self.missing == 'zero')
     
     def train_models(self, training_data: List[Dict]) -> Dict:
         """
         Train multiple models for different pollutants
         """
         print("Preparing features...")
-        df = self.prepare_features(training_data)
-        
+        self._report_progress('preparing_features', 0.0)
+        trained_through = datetime.now().isoformat()
+        df = build_feature_frame(training_data, fill_missing=self.missing == 'zero', collected_at=True)
+        return self._train_frame(df, trained_through)
+    
+    def train_models_chunked(self, chunks: Iterable[List[Dict]]) -> Dict:
+        """
+        Train like train_models() on records read in chunks (e.g. from an
+        ObservationStore), holding only their feature rows in memory
+        """
+        print("Preparing features...")
+        self._report_progress('preparing_features', 0.0)
+        trained_through = datetime.now().isoformat()
+        df = build_feature_frame_chunked(chunks, fill_missing=self.missing == 'zero', collected_at=True)
+        return self._train_frame(df, trained_through)
+    
+    def _train_frame(self, df: pd.DataFrame, trained_through: Optional[str] = None) -> Dict:
+        """Train and save the models on a prepared feature frame"""
         if df.empty:
             print("No data to train on!")
             return {}
         
+        # Collection times order the holdout; they are not a feature
+        collected_at = df.pop(COLLECTED_AT).values if COLLECTED_AT in df.columns else None
+        
         print(f"Training on {len(df)} samples with {len(df.columns)} features")
         
-        # Store feature columns
-        self.feature_columns = [col for col in df.columns if col not in self.target_columns]
+        # The new model set is built on the side; serving keeps the active version
+        feature_columns = [col for col in df.columns if col not in self.target_columns]
+        weather_classes = df.attrs.get('weather_classes', [])
         
-        X = df[self.feature_columns]
+        X = df[feature_columns]
+        self._report_progress('fitting', 0.1)
         
-        results = {}
+        # Shared scaling is fitted and applied once for all targets
+        if self.scaling == 'shared':
+            scaler = StandardScaler()
+            X_shared = scaler.fit_transform(X)
+        else:
+            scaler = None
+            X_shared = X.values
+        
+        if self.engine == 'multi_output':
+            models, output_index, results = self._train_multi_output(df, X_shared, collected_at)
+            scalers = {}
+        else:
+            models, scalers, results = self._train_per_target(df, X, X_shared, collected_at)
+            output_index = {}
+        
+        if not models:
+            return results
+        
+        version = ModelVersion(
+            self._new_version_id(), feature_columns, models, scalers, scaler,
+            weather_classes, output_index, self.scaling, self.target_columns, trained_through, self.missing
+        )
+        
+        # Save models, then publish the complete set in one swap
+        self._report_progress('saving', 0.95)
+        self.save_models(version)
+        self.registry.publish(version)
+        
+        return results
+    
+    def _candidate_configs(self) -> List[Tuple[str, str, Dict]]:
+        """(configuration name, candidate name, parameters) of each candidate configuration to compare"""
+        configs = []
+        for name in self.candidates:
+            candidate = CANDIDATES[name]
+            # NaN features are only left in for models that accept them
+            if self.missing == 'native' and not candidate['handles_missing']:
+                continue
+            for params in (candidate['search'] if self.search else [{}]):
+                configs.append((config_name(name, params), name, params))
+        return configs
+    
+    def _candidate_model(self, name: str, params: Dict) -> Tuple:
+        """A fresh, unfitted candidate model and the parameter to early stop it on"""
+        candidate = CANDIDATES[name]
+        model = candidate['factory'](self).set_params(**params)
+        return model, candidate['stages'] if self.early_stopping else None
+    
+    def _train_per_target(self, df: pd.DataFrame, X: pd.DataFrame, X_shared: np.ndarray,
+                          collected_at: Optional[np.ndarray] = None) -> Tuple[Dict, Dict, Dict]:
+        """
+        Train and select one model per target.
+        
+        Candidate configurations are compared on a holdout of the target's
+        valid rows (the most recently collected ones with holdout='time') by
+        successive halving: each round fits the remaining configurations on
+        the most recent training rows and keeps the best of them for the
+        next, larger round, so clearly losing candidates are dropped after
+        a fit on a fraction of the data. Within a round every target x
+        configuration fit is an independent job; the jobs run on a process
+        pool of `train_workers` workers. Returns (models, scalers, results)
+        by target.
+        """
+        configs = self._candidate_configs()
+        splits = {}
         
         for target in self.target_columns:
             if target not in df.columns:
@@ -157,161 +337,582 @@ class AirPollutionPredictor:
             
             # Remove samples where target is 0 (likely missing data)
             valid_indices = y > 0
-            X_valid = X[valid_indices]
-            y_valid = y[valid_indices]
+            X_valid = X[valid_indices].values if self.scaling == 'per_target' else X_shared[valid_indices.values]
+            y_valid = y[valid_indices].values
             
             if len(X_valid) < 10:
                 print(f"Not enough valid data for {target}, skipping...")
                 continue
             
-            print(f"Training model for {target}...")
-            
-            # Split data
-            X_train, X_test, y_train, y_test = train_test_split(
-                X_valid, y_valid, test_size=0.2, random_state=42
+            # Split data, training rows in collection order
+            train, test = holdout_split(
+                len(X_valid), collected_at[valid_indices.values] if collected_at is not None else None,
+                mode=self.holdout
             )
+            X_train, X_test, y_train, y_test = X_valid[train], X_valid[test], y_valid[train], y_valid[test]
             
             # Scale features
-            scaler = StandardScaler()
-            X_train_scaled = scaler.fit_transform(X_train)
-            X_test_scaled = scaler.transform(X_test)
+            if self.scaling == 'per_target':
+                scaler = StandardScaler()
+                X_train = scaler.fit_transform(X_train)
+                X_test = scaler.transform(X_test)
+            else:
+                scaler = None
             
-            # Train ensemble of models
-            models = {
-                'random_forest': RandomForestRegressor(n_estimators=100, random_state=42),
-                'gradient_boosting': GradientBoostingRegressor(n_estimators=100, random_state=42)
-            }
+            rounds = halving_rounds(len(configs), len(y_train), self.halving_eta)
+            splits[target] = (scaler, X_train, y_train, X_test, y_test, len(X_valid), rounds)
+        
+        # Per target: (model, test predictions, R², rows fitted on) by configuration
+        fitted = {target: {} for target in splits}
+        survivors = {target: [name for name, _, _ in configs] for target in splits}
+        fit_times = {target: {} for target in splits}
+        total = sum(count for split in splits.values() for count, _ in split[6])
+        done = 0
+        
+        for round_number in range(max((len(split[6]) for split in splits.values()), default=0)):
+            jobs, scheduled = [], 0
+            for target, (_, X_train, y_train, X_test, _, _, rounds) in splits.items():
+                if round_number >= len(rounds):
+                    continue
+                scheduled += rounds[round_number][0]
+                rows = rounds[round_number][1]
+                for name, candidate, params in configs:
+                    # A configuration already fitted on as many rows is kept as it is
+                    if name in survivors[target] and (name not in fitted[target] or fitted[target][name][3] != rows):
+                        model, stages = self._candidate_model(candidate, params)
+                        jobs.append((target, name, rows, model, X_train[-rows:], y_train[-rows:], X_test, stages))
             
-            best_model = None
-            best_score = float('-inf')
+            # Every survivor may already be fitted on this round's rows
+            if jobs:
+                print(f"Fitting {len(jobs)} candidate models with {self.train_workers} worker(s)...")
+                tasks = (
+                    delayed(_fit_candidate)(model, X_train, y_train, X_test, stages)
+                    for _, _, _, model, X_train, y_train, X_test, stages in jobs
+                )
+                try:
+                    # Results arrive as fits finish, so progress can be reported per fit
+                    outcomes = Parallel(n_jobs=self.train_workers, return_as='generator')(tasks)
+                except TypeError:
+                    # joblib < 1.3 only returns the full list
+                    outcomes = Parallel(n_jobs=self.train_workers)(tasks)
+                # Configurations kept as they are count as fitted
+                outcomes = self._track_fits(outcomes, total, done + scheduled - len(jobs))
             
-            for model_name, model in models.items():
-                # Train model
-                model.fit(X_train_scaled, y_train)
-                
-                # Evaluate
-                y_pred = model.predict(X_test_scaled)
-                score = r2_score(y_test, y_pred)
-                
-                print(f"  {model_name} R² score: {score:.4f}")
-                
-                if score > best_score:
-                    best_score = score
-                    best_model = model
+                for (target, name, rows, _, _, _, _, _), (model, y_pred, fit_time) in zip(jobs, outcomes):
+                    fitted[target][name] = (model, y_pred, r2_score(splits[target][4], y_pred), rows)
+                    fit_times[target][name] = fit_times[target].get(name, 0.0) + fit_time
+            
+            done += scheduled
+            
+            # Keep the best configurations for the next round (in candidate order on ties)
+            for target, split in splits.items():
+                rounds = split[6]
+                if round_number + 1 < len(rounds):
+                    survivors[target] = sorted(
+                        survivors[target], key=lambda name: -fitted[target][name][2]
+                    )[:rounds[round_number + 1][0]]
+                    print(f"  {target}: kept {', '.join(survivors[target])} for {rounds[round_number + 1][1]} rows")
+        
+        models, scalers, results = {}, {}, {}
+        for target, (scaler, _, _, _, y_test, samples_used, _) in splits.items():
+            print(f"Training model for {target}...")
+            
+            for name, (_, _, score, rows) in fitted[target].items():
+                print(f"  {name} R² score: {score:.4f} on {rows} rows ({fit_times[target][name]:.2f}s)")
+            
+            # The best configuration of the last round (the first on ties)
+            best_name = max(survivors[target], key=lambda name: fitted[target][name][2])
+            best_model, best_pred, best_score, _ = fitted[target][best_name]
             
             # Store best model and scaler
-            self.models[target] = best_model
-            self.scalers[target] = scaler
+            models[target] = best_model
+            if scaler is not None:
+                scalers[target] = scaler
             
             # Calculate additional metrics
-            y_pred_final = best_model.predict(X_test_scaled)
             results[target] = {
                 'r2_score': best_score,
-                'mse': mean_squared_error(y_test, y_pred_final),
-                'mae': mean_absolute_error(y_test, y_pred_final),
-                'samples_used': len(X_valid)
+                'mse': mean_squared_error(y_test, best_pred),
+                'mae': mean_absolute_error(y_test, best_pred),
+                'samples_used': samples_used,
+                'model': best_name,
+                'fit_times': fit_times[target]
             }
             
+            print(f"  Selected {best_name}")
             print(f"  Final R² score: {best_score:.4f}")
             print(f"  MSE: {results[target]['mse']:.4f}")
             print(f"  MAE: {results[target]['mae']:.4f}")
         
-        # Save models
-        self.save_models()
-        
+        return models, scalers, results
+    
+    def _track_fits(self, fitted: Iterable, total: int, done: int = 0) -> List:
+        """Collect fit results, reporting the fitting progress after each one"""
+        results = []
+        for outcome in fitted:
+            results.append(outcome)
+            self._report_progress('fitting', 0.1 + 0.8 * (done + len(results)) / total)
         return results
     
-    def predict(self, data: Dict) -> Dict:
+    def _train_multi_output(self, df: pd.DataFrame, X_shared: np.ndarray,
+                            collected_at: Optional[np.ndarray] = None) -> Tuple[Dict, Dict[str, int], Dict]:
         """
-        Make predictions for new data
+        Train a single multi-output forest for all targets.
+        
+        Targets <= 0 are treated as missing, following the per-target engine:
+        they are either excluded with their row or imputed for fitting, and
+        never used for evaluation. Returns (models, output_index, results).
+        """
+        targets = []
+        for target in self.target_columns:
+            if target not in df.columns:
+                print(f"Target {target} not found in data, skipping...")
+            elif (df[target] > 0).sum() < 10:
+                print(f"Not enough valid data for {target}, skipping...")
+            else:
+                targets.append(target)
+        
+        if not targets:
+            return {}, {}, {}
+        
+        Y = df[targets].values.astype(float)
+        valid = Y > 0
+        
+        if self.mask_policy == 'complete':
+            rows = valid.all(axis=1)
+        else:
+            rows = valid.any(axis=1)
+        
+        if rows.sum() < 10:
+            print("Not enough valid rows for the multi-output model, skipping...")
+            return {}, {}, {}
+        
+        print(f"Training multi-output model for {', '.join(targets)}...")
+        
+        train, test = holdout_split(
+            int(rows.sum()), collected_at[rows] if collected_at is not None else None, mode=self.holdout
+        )
+        X_rows, Y_rows, valid_rows = X_shared[rows], Y[rows], valid[rows]
+        X_train, X_test, Y_train, Y_test = X_rows[train], X_rows[test], Y_rows[train], Y_rows[test]
+        valid_train, valid_test = valid_rows[train], valid_rows[test]
+        
+        if self.mask_policy == 'impute':
+            # Fill invalid targets with the median of the valid training values
+            Y_train = Y_train.copy()
+            for j in range(len(targets)):
+                column = valid_train[:, j]
+                Y_train[~column, j] = np.median(Y_train[column, j]) if column.any() else 0
+        
+        model = RandomForestRegressor(n_estimators=100, random_state=42, n_jobs=self.n_jobs)
+        model, Y_pred, fit_time = _fit_candidate(model, X_train, Y_train, X_test)
+        
+        models = {target: model for target in targets}
+        output_index = {target: j for j, target in enumerate(targets)}
+        
+        results = {}
+        for j, target in enumerate(targets):
+            mask = valid_test[:, j]
+            y_test, y_pred = Y_test[mask, j], Y_pred[mask, j]
+            results[target] = {
+                'r2_score': r2_score(y_test, y_pred),
+                'mse': mean_squared_error(y_test, y_pred),
+                'mae': mean_absolute_error(y_test, y_pred),
+                'samples_used': int(valid[rows, j].sum()),
+                'fit_times': {'random_forest': fit_time}
+            }
+            print(f"  {target} R² score: {results[target]['r2_score']:.4f}")
+        
+        return models, output_index, results
+    
+    def train_incremental(self, new_chunks: Iterable[List[Dict]],
+                          history_chunks: Iterable[List[Dict]] = ()) -> Dict:
         """
-        # Prepare features
-        df = self.prepare_features([data])
+        Update the active models with new records instead of refitting on all data
         
+        Each model is brought up to date by the cheapest update its kind has:
+        forests get `incremental_trees` trees fitted on the new records,
+        gradient boosting is refitted as histogram gradient boosting on the
+        last `window_rows` rows of `history_chunks` (the records collected
+        before the new ones) plus the new records, and other models are
+        replaced by a linear model updated with partial_fit. The feature
+        layout, weather encoding and scalers of the active version are kept.
+        Metrics are computed on a 20% holdout of the new records (the most
+        recent ones with holdout='time'), for the updated and the previous
+        model. Without an active version this is a
+        full training on the new records.
+        
+        Args:
+            new_chunks: Records collected since the active version was trained
+            history_chunks: Earlier records, only read for gradient boosting
+        """
+        base = self.registry.active
+        if base is None:
+            return self.train_models_chunked(new_chunks)
+        
+        print("Preparing features...")
+        self._report_progress('preparing_features', 0.0)
+        trained_through = datetime.now().isoformat()
+        columns = base.feature_columns
+        fill_missing = base.missing == 'zero'
+        df = build_feature_frame_encoded(new_chunks, columns, base.weather_classes, self.target_columns,
+                                         fill_missing, collected_at=True)
         if df.empty:
+            print("No new data to train on!")
             return {}
         
-        X = df[self.feature_columns]
+        strategies = {target: update_strategy(model) for target, model in base.models.items()}
+        history = None
+        if 'gbm_window' in strategies.values() or any(
+                not isinstance(base.models[t], OnlineLinearRegressor)
+                for t, strategy in strategies.items() if strategy == 'linear_partial_fit'):
+            history = build_feature_frame_encoded(history_chunks, columns, base.weather_classes,
+                                                  self.target_columns, fill_missing).tail(self.window_rows)
         
-        predictions = {}
+        print(f"Updating models with {len(df)} new samples")
+        self._report_progress('fitting', 0.1)
         
-        for target in self.target_columns:
-            if target in self.models and target in self.scalers:
-                # Scale features
-                X_scaled = self.scalers[target].transform(X)
+        def features(frame: pd.DataFrame, scaler) -> np.ndarray:
+            X = frame[columns].values
+            return scaler.transform(X) if scaler is not None else X
+        
+        def window(target: str, scaler, X_new: np.ndarray, y_new: np.ndarray) -> Tuple:
+            """The recent history of a target followed by the new rows, at most window_rows"""
+            X_parts, y_parts = [X_new], [y_new]
+            if history is not None and target in history.columns:
+                valid = (history[target] > 0).values
+                X_parts.insert(0, features(history[valid], scaler))
+                y_parts.insert(0, history[target].values[valid])
+            return np.vstack(X_parts)[-self.window_rows:], np.concatenate(y_parts)[-self.window_rows:]
+        
+        if base.output_index:
+            models, results = self._update_multi_output(base, df, features)
+        else:
+            models, results = {}, {}
+            for n, (target, model) in enumerate(base.models.items()):
+                models[target] = model
+                if target not in df.columns:
+                    continue
+                scaler = base.scalers.get(target, base.scaler)
+                valid = (df[target] > 0).values
+                if valid.sum() < 10:
+                    print(f"Not enough new data for {target}, keeping the model")
+                    continue
+                train, test = holdout_split(int(valid.sum()), df[COLLECTED_AT].values[valid], mode=self.holdout)
+                X_valid, y_valid = features(df[valid], scaler), df[target].values[valid]
+                X_train, X_test, y_train, y_test = X_valid[train], X_valid[test], y_valid[train], y_valid[test]
+                
+                strategy = strategies[target]
+                start = time.perf_counter()
+                if strategy == 'forest_warm_start':
+                    updated = grow_forest(model, X_train, y_train, self.incremental_trees, self.max_trees)
+                elif strategy == 'gbm_window':
+                    updated = fit_gbm_window(*window(target, scaler, X_train, y_train),
+                                             early_stopping=self.early_stopping)
+                elif isinstance(model, OnlineLinearRegressor):
+                    updated = update_linear(model, X_train, y_train)
+                else:
+                    # A new linear model starts from the recent history
+                    updated = update_linear(model, *window(target, scaler, X_train, y_train))
+                fit_time = time.perf_counter() - start
                 
-                # Make prediction
-                pred = self.models[target].predict(X_scaled)[0]
-                predictions[target] = max(0, pred)  # Ensure non-negative
+                y_pred = updated.predict(X_test)
+                models[target] = updated
+                results[target] = {
+                    'r2_score': r2_score(y_test, y_pred),
+                    'mse': mean_squared_error(y_test, y_pred),
+                    'mae': mean_absolute_error(y_test, y_pred),
+                    'previous_r2_score': r2_score(y_test, model.predict(X_test)),
+                    'samples_used': len(y_train),
+                    'strategy': strategy,
+                    'fit_times': {strategy: fit_time}
+                }
+                print(f"  {target} ({strategy}) R² score: {results[target]['r2_score']:.4f}, "
+                      f"previously {results[target]['previous_r2_score']:.4f} ({fit_time:.2f}s)")
+                self._report_progress('fitting', 0.1 + 0.8 * (n + 1) / len(base.models))
+        
+        if not results:
+            return results
+        
+        version = ModelVersion(
+            self._new_version_id(), columns, models, base.scalers, base.scaler,
+            base.weather_classes, base.output_index, base.scaling, self.target_columns, trained_through,
+            base.missing
+        )
+        self._report_progress('saving', 0.95)
+        self.save_models(version)
+        self.registry.publish(version)
         
-        return predictions
+        return results
     
-    def save_models(self):
-        """Save trained models and scalers"""
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    def _update_multi_output(self, base: ModelVersion, df: pd.DataFrame, features: Callable) -> Tuple:
+        """Grow the multi-output forest with new records; returns (models, results)"""
+        targets = list(base.output_index)
+        model = base.models[targets[0]]
+        if any(t not in df.columns for t in targets):
+            print("New data lacks targets of the multi-output model, keeping it")
+            return dict(base.models), {}
         
-        for target in self.models:
-            # Save model
-            model_path = os.path.join(self.model_save_path, f"{target}_model_{timestamp}.pkl")
-            joblib.dump(self.models[target], model_path)
-            
-            # Save scaler
-            scaler_path = os.path.join(self.model_save_path, f"{target}_scaler_{timestamp}.pkl")
-            joblib.dump(self.scalers[target], scaler_path)
-            
-            print(f"Saved {target} model and scaler")
+        Y = df[targets].values.astype(float)
+        valid = Y > 0
+        rows = valid.all(axis=1) if self.mask_policy == 'complete' else valid.any(axis=1)
+        if rows.sum() < 10:
+            print("Not enough new rows for the multi-output model, keeping it")
+            return dict(base.models), {}
+        
+        train, test = holdout_split(int(rows.sum()), df[COLLECTED_AT].values[rows], mode=self.holdout)
+        X_rows, Y_rows, valid_rows = features(df[rows], base.scaler), Y[rows], valid[rows]
+        X_train, X_test, Y_train, Y_test = X_rows[train], X_rows[test], Y_rows[train], Y_rows[test]
+        valid_train, valid_test = valid_rows[train], valid_rows[test]
+        if self.mask_policy == 'impute':
+            Y_train = Y_train.copy()
+            for j in range(len(targets)):
+                column = valid_train[:, j]
+                Y_train[~column, j] = np.median(Y_train[column, j]) if column.any() else 0
+        
+        start = time.perf_counter()
+        updated = grow_forest(model, X_train, Y_train, self.incremental_trees, self.max_trees)
+        fit_time = time.perf_counter() - start
+        Y_pred, Y_previous = updated.predict(X_test), model.predict(X_test)
+        
+        results = {}
+        for j, target in enumerate(targets):
+            mask = valid_test[:, j]
+            y_test, y_pred = Y_test[mask, j], Y_pred[mask, j]
+            results[target] = {
+                'r2_score': r2_score(y_test, y_pred),
+                'mse': mean_squared_error(y_test, y_pred),
+                'mae': mean_absolute_error(y_test, y_pred),
+                'previous_r2_score': r2_score(y_test, Y_previous[mask, j]),
+                'samples_used': int(valid_train[:, j].sum()),
+                'strategy': 'forest_warm_start',
+                'fit_times': {'forest_warm_start': fit_time}
+            }
+            print(f"  {target} R² score: {results[target]['r2_score']:.4f}, "
+                  f"previously {results[target]['previous_r2_score']:.4f}")
+        return {target: updated for target in targets}, results
+    
+    def predict(self, data: Dict) -> Dict:
+        """
+        Make predictions for new data
+        """
+        version = self.registry.active
+        if not data or version is None:
+            return {}
+        
+        return version.predict(data)
+    
+    def predict_batch(self, data: List[Dict]) -> List[Dict]:
+        """
+        Make predictions for many records at once
+        
+        The records are stacked into one feature matrix and each model is
+        run once over it, so the result matches predict() per record.
+        """
+        version = self.registry.active
+        if not data or version is None:
+            return []
+        
+        return version.predict_batch(data)
+    
+    def _get_inference(self) -> CompiledInference:
+        """Compiled single-record inference plan for the active models"""
+        return self.registry.active.inference
+    
+    def _artifact_path(self, version_id: str) -> str:
+        return os.path.join(self.model_save_path, f"model_{version_id}{ARTIFACT_SUFFIX}")
+    
+    def _new_version_id(self) -> str:
+        """
+        Id for a new model version: the time to the microsecond, so trainings
+        finishing in the same second (e.g. a job and a /train call) do not
+        overwrite each other's artifact
+        """
+        while True:
+            version_id = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+            if not os.path.exists(self._artifact_path(version_id)):
+                return version_id
+    
+    def read_manifest(self) -> Dict:
+        """Index of the saved model versions: {'latest': id, 'versions': {id: entry}}"""
+        path = os.path.join(self.model_save_path, MANIFEST_NAME)
+        if not os.path.exists(path):
+            return {'latest': None, 'versions': {}}
+        with open(path) as f:
+            return json.load(f)
+    
+    def _write_atomic(self, path: str, write: Callable[[str], None]):
+        """Write a file under a temporary name and move it into place"""
+        tmp_path = f"{path}.tmp{os.getpid()}"
+        try:
+            write(tmp_path)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+    
+    def save_models(self, version: ModelVersion = None) -> Optional[str]:
+        """
+        Save a model version (the active one by default), returning its id
+        
+        The whole version goes into one uncompressed joblib artifact, so its
+        numpy arrays can be memory-mapped on load, and is then recorded in
+        the manifest. Both files are replaced atomically.
+        """
+        version = version or self.registry.active
+        if version is None:
+            print("No models to save!")
+            return None
+        
+        artifact_path = self._artifact_path(version.version_id)
+        self._write_atomic(artifact_path, lambda path: joblib.dump({
+            'format': ARTIFACT_FORMAT,
+            'version_id': version.version_id,
+            'scaling': version.scaling,
+            'scaler': version.scaler,
+            'scalers': version.scalers,
+            'feature_columns': version.feature_columns,
+            'weather_classes': version.weather_classes,
+            'output_index': version.output_index,
+            'trained_through': version.trained_through,
+            'missing': version.missing,
+            # A multi-output model is pickled once for all its targets
+            'models': version.models
+        }, path, compress=0))
+        
+        manifest = self.read_manifest()
+        manifest['versions'][version.version_id] = {
+            'artifact': os.path.basename(artifact_path),
+            'targets': list(version.models),
+            'engine': 'multi_output' if version.output_index else 'per_target',
+            'scaling': version.scaling,
+            'features': len(version.feature_columns),
+            'trained_through': version.trained_through,
+            'missing': version.missing,
+            'bytes': os.path.getsize(artifact_path),
+            'saved_at': datetime.now().isoformat()
+        }
+        manifest['latest'] = version.version_id
+        
+        def write_manifest(path):
+            with open(path, 'w') as f:
+                json.dump(manifest, f, indent=2)
+        self._write_atomic(os.path.join(self.model_save_path, MANIFEST_NAME), write_manifest)
         
-        # Save feature columns
-        feature_path = os.path.join(self.model_save_path, f"feature_columns_{timestamp}.pkl")
-        joblib.dump(self.feature_columns, feature_path)
+        print(f"Saved models {', '.join(version.models)} as version {version.version_id}")
+        return version.version_id
     
-    def load_models(self, timestamp: str = None):
-        """Load previously trained models"""
+    def load_models(self, timestamp: str = None, mmap_mode: Optional[str] = 'r'):
+        """
+        Load previously trained models and make them the active version
+        
+        Args:
+            timestamp: Version to load (default: the latest in the manifest,
+                or the newest per-file generation if there is no manifest)
+            mmap_mode: joblib mmap mode for the artifact's arrays (None reads them)
+        """
+        manifest = self.read_manifest()
         if timestamp is None:
-            # Find the most recent model
-            model_files = [f for f in os.listdir(self.model_save_path) if f.endswith('.pkl')]
-            if not model_files:
+            timestamp = manifest['latest'] or self._latest_legacy_timestamp()
+            if timestamp is None:
                 print("No saved models found!")
                 return False
-            
-            # Get the most recent timestamp
-            timestamps = set()
-            for f in model_files:
-                if '_model_' in f:
-                    ts = f.split('_model_')[1].replace('.pkl', '')
-                    timestamps.add(ts)
-            
-            if not timestamps:
-                print("No valid model files found!")
-                return False
-            
-            timestamp = max(timestamps)
         
         print(f"Loading models from {timestamp}...")
         
-        # Load feature columns
-        feature_path = os.path.join(self.model_save_path, f"feature_columns_{timestamp}.pkl")
-        if os.path.exists(feature_path):
-            self.feature_columns = joblib.load(feature_path)
+        entry = manifest['versions'].get(timestamp)
+        if entry is not None:
+            artifact = joblib.load(os.path.join(self.model_save_path, entry['artifact']), mmap_mode=mmap_mode)
+            version = ModelVersion(
+                timestamp, artifact['feature_columns'], artifact['models'], artifact['scalers'],
+                artifact['scaler'], artifact['weather_classes'], artifact['output_index'],
+                artifact['scaling'], self.target_columns, artifact.get('trained_through'),
+                artifact.get('missing', 'zero')
+            )
+        else:
+            version = self._load_legacy(timestamp)
         
-        # Load models and scalers
-        for target in self.target_columns:
-            model_path = os.path.join(self.model_save_path, f"{target}_model_{timestamp}.pkl")
-            scaler_path = os.path.join(self.model_save_path, f"{target}_scaler_{timestamp}.pkl")
-            
-            if os.path.exists(model_path) and os.path.exists(scaler_path):
-                self.models[target] = joblib.load(model_path)
-                self.scalers[target] = joblib.load(scaler_path)
-                print(f"Loaded {target} model and scaler")
+        if version is None or not version.models:
+            print(f"No models found for {timestamp}!")
+            return False
         
+        # Everything is loaded before the version replaces the active one
+        self.registry.publish(version)
+        print(f"Loaded models {', '.join(version.models)}")
         return True
     
-    def retrain_with_new_data(self, new_data: List[Dict], existing_data: List[Dict] = None):
+    def _latest_legacy_timestamp(self) -> Optional[str]:
+        """Newest generation saved as one pickle per model, before the manifest"""
+        timestamps = set()
+        for f in os.listdir(self.model_save_path):
+            if f.endswith('.pkl') and '_model_' in f:
+                timestamps.add(f.split('_model_')[1].replace('.pkl', ''))
+        return max(timestamps) if timestamps else None
+    
+    def _load_legacy(self, timestamp: str) -> Optional[ModelVersion]:
+        """Load a generation saved as one pickle per model and scaler"""
+        preprocessor_path = os.path.join(self.model_save_path, f"preprocessor_{timestamp}.pkl")
+        if os.path.exists(preprocessor_path):
+            preprocessor = joblib.load(preprocessor_path)
+            feature_columns = preprocessor['feature_columns']
+            weather_classes = preprocessor['weather_classes']
+            scaler = preprocessor['scaler']
+            output_index = preprocessor.get('output_index', {})
+            scaling = preprocessor['scaling']
+        else:
+            # Older model generations store one scaler per target and the
+            # feature columns on their own, and the weather encoding too
+            # from when it was learned (the oldest encode every condition as 0)
+            feature_path = os.path.join(self.model_save_path, f"feature_columns_{timestamp}.pkl")
+            feature_columns = joblib.load(feature_path) if os.path.exists(feature_path) else []
+            classes_path = os.path.join(self.model_save_path, f"weather_classes_{timestamp}.pkl")
+            weather_classes = joblib.load(classes_path) if os.path.exists(classes_path) else None
+            scaler = None
+            output_index = {}
+            scaling = 'per_target'
+        
+        models = {}
+        scalers = {}
+        
+        if output_index:
+            model_path = os.path.join(self.model_save_path, f"multi_output_model_{timestamp}.pkl")
+            if not os.path.exists(model_path):
+                return None
+            model = joblib.load(model_path)
+            models = {target: model for target in output_index}
+        else:
+            for target in self.target_columns:
+                model_path = os.path.join(self.model_save_path, f"{target}_model_{timestamp}.pkl")
+                scaler_path = os.path.join(self.model_save_path, f"{target}_scaler_{timestamp}.pkl")
+                
+                if not os.path.exists(model_path):
+                    continue
+                if scaling == 'per_target':
+                    if not os.path.exists(scaler_path):
+                        continue
+                    scalers[target] = joblib.load(scaler_path)
+                models[target] = joblib.load(model_path)
+        
+        return ModelVersion(
+            timestamp, feature_columns, models, scalers, scaler,
+            weather_classes, output_index, scaling, self.target_columns
+        )
+    
+    def retrain_with_new_data(self, new_data: List[Dict], existing_data: List[Dict] = None,
+                              incremental: bool = True):
         """
-        Retrain models with new data (incremental learning simulation)
+        Retrain models with new data
+        
+        With `incremental` and trained models, the models are updated with
+        the new data (see train_incremental()); otherwise they are refitted
+        on the existing and new data together.
         """
         print("Retraining models with new data...")
         
+        if incremental and self.registry.active is not None:
+            results = self.train_incremental([new_data], [existing_data or []])
+            print("Retraining completed!")
+            return results
+        
         # Combine new data with existing data
         if existing_data:
             combined_data = existing_data + new_data
@@ -326,13 +927,14 @@ class AirPollutionPredictor:
     
     def get_feature_importance(self, target: str) -> Dict:
         """Get feature importance for a specific target"""
-        if target not in self.models:
+        version = self.registry.active
+        if version is None or target not in version.models:
             return {}
         
-        model = self.models[target]
+        model = version.models[target]
         if hasattr(model, 'feature_importances_'):
             importance_dict = {}
-            for i, feature in enumerate(self.feature_columns):
+            for i, feature in enumerate(version.feature_columns):
                 importance_dict[feature] = model.feature_importances_[i]
             
             # Sort by importance
@@ -343,59 +945,58 @@ class AirPollutionPredictor:
         
         return {}
 
+
+def create_dummy_data(n_samples: int = 100):
+    """Create dummy data for testing"""
+    dummy_data = []
+    for i in range(n_samples):
+        # Create realistic dummy data
+        temp = random.uniform(10, 40)  # Temperature 10-40°C
+        humidity = random.uniform(30, 90)  # Humidity 30-90%
+
+        # Simulate pollution based on weather (simplified)
+        base_pollution = 50 + (temp - 25) * 2 + (humidity - 50) * 0.5
+
+        data_point = {
+            'current_weather': {
+                'temperature': temp,
+                'humidity': humidity,
+                'pressure': random.uniform(980, 1020),
+                'wind_speed': random.uniform(0, 15),
+                'wind_direction': random.uniform(0, 360),
+                'visibility': random.uniform(1000, 10000),
+                'weather_condition': random.choice(['Clear', 'Clouds', 'Rain', 'Mist'])
+            },
+            'current_pollution': {
+                'pm2_5': max(0, base_pollution + random.uniform(-20, 20)),
+                'pm10': max(0, base_pollution * 1.5 + random.uniform(-30, 30)),
+                'no2': max(0, base_pollution * 0.8 + random.uniform(-15, 15)),
+                'o3': max(0, base_pollution * 0.6 + random.uniform(-10, 10)),
+                'aqi': max(1, int(base_pollution + random.uniform(-20, 20)))
+            },
+            'location': {
+                'lat': 28.6139 + random.uniform(-0.1, 0.1),
+                'lon': 77.2090 + random.uniform(-0.1, 0.1)
+            },
+            'collected_at': datetime.now() - timedelta(days=random.randint(0, 30)),
+            'historical_pollution': [
+                {
+                    'pm2_5': max(0, base_pollution + random.uniform(-10, 10)),
+                    'pm10': max(0, base_pollution * 1.5 + random.uniform(-15, 15)),
+                    'no2': max(0, base_pollution * 0.8 + random.uniform(-8, 8)),
+                    'o3': max(0, base_pollution * 0.6 + random.uniform(-5, 5)),
+                    'aqi': max(1, int(base_pollution + random.uniform(-10, 10)))
+                } for _ in range(5)
+            ]
+        }
+
+        dummy_data.append(data_point)
+
+    return dummy_data
+
+
 # Example usage and testing
 if __name__ == "__main__":
-    # Create dummy data for testing
-    def create_dummy_data(n_samples: int = 100):
-        """Create dummy data for testing"""
-        import random
-        
-        dummy_data = []
-        for i in range(n_samples):
-            # Create realistic dummy data
-            temp = random.uniform(10, 40)  # Temperature 10-40°C
-            humidity = random.uniform(30, 90)  # Humidity 30-90%
-            
-            # Simulate pollution based on weather (simplified)
-            base_pollution = 50 + (temp - 25) * 2 + (humidity - 50) * 0.5
-            
-            data_point = {
-                'current_weather': {
-                    'temperature': temp,
-                    'humidity': humidity,
-                    'pressure': random.uniform(980, 1020),
-                    'wind_speed': random.uniform(0, 15),
-                    'wind_direction': random.uniform(0, 360),
-                    'visibility': random.uniform(1000, 10000),
-                    'weather_condition': random.choice(['Clear', 'Clouds', 'Rain', 'Mist'])
-                },
-                'current_pollution': {
-                    'pm2_5': max(0, base_pollution + random.uniform(-20, 20)),
-                    'pm10': max(0, base_pollution * 1.5 + random.uniform(-30, 30)),
-                    'no2': max(0, base_pollution * 0.8 + random.uniform(-15, 15)),
-                    'o3': max(0, base_pollution * 0.6 + random.uniform(-10, 10)),
-                    'aqi': max(1, int(base_pollution + random.uniform(-20, 20)))
-                },
-                'location': {
-                    'lat': 28.6139 + random.uniform(-0.1, 0.1),
-                    'lon': 77.2090 + random.uniform(-0.1, 0.1)
-                },
-                'collected_at': datetime.now() - timedelta(days=random.randint(0, 30)),
-                'historical_pollution': [
-                    {
-                        'pm2_5': max(0, base_pollution + random.uniform(-10, 10)),
-                        'pm10': max(0, base_pollution * 1.5 + random.uniform(-15, 15)),
-                        'no2': max(0, base_pollution * 0.8 + random.uniform(-8, 8)),
-                        'o3': max(0, base_pollution * 0.6 + random.uniform(-5, 5)),
-                        'aqi': max(1, int(base_pollution + random.uniform(-10, 10)))
-                    } for _ in range(5)
-                ]
-            }
-            
-            dummy_data.append(data_point)
-        
-        return dummy_data
-    
     # Test the model
     print("Creating dummy data...")
     training_data = create_dummy_data(200)
@@ -0,0 +1,224 @@
+import struct
+from itertools import chain
+from operator import itemgetter
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from typing import Dict, List, Optional, Union
+
+# Column layout of every feature section: (column name, source key, default).
+# The order of the sections and of the fields inside them matches the order in
+# which the original per-record builder inserted keys, so the resulting frame
+# has the same column order.
+WEATHER_FIELDS = [
+    ('temperature', 'temperature', 0),
+    ('humidity', 'humidity', 0),
+    ('pressure', 'pressure', 0),
+    ('wind_speed', 'wind_speed', 0),
+    ('wind_direction', 'wind_direction', 0),
+    ('visibility', 'visibility', 10000),
+]
+
+POLLUTION_FIELDS = [
+    ('pm2_5', 'pm2_5', 0),
+    ('pm10', 'pm10', 0),
+    ('no2', 'no2', 0),
+    ('o3', 'o3', 0),
+    ('co', 'co', 0),
+    ('so2', 'so2', 0),
+    ('aqi', 'aqi', 0),
+]
+
+# Satellite and surface values are coerced with `or 0`, so None becomes 0
+SATELLITE_FIELDS = [
+    ('sat_no2', 'no2'),
+    ('sat_o3', 'o3'),
+    ('sat_so2', 'so2'),
+    ('sat_co', 'co'),
+    ('sat_aerosol', 'aerosol'),
+]
+
+SURFACE_FIELDS = [
+    ('ndvi', 'ndvi'),
+    ('surface_temp', 'surface_temperature'),
+    ('vegetation_health', 'vegetation_health'),
+]
+
+LOCATION_FIELDS = [
+    ('latitude', 'lat', 0),
+    ('longitude', 'lon', 0),
+]
+
+TIME_COLUMNS = ['hour', 'day_of_week', 'month', 'is_weekend']
+
+HISTORY_FIELDS = [
+    ('hist_pm2_5_avg', 'pm2_5'),
+    ('hist_pm10_avg', 'pm10'),
+    ('hist_no2_avg', 'no2'),
+    ('hist_o3_avg', 'o3'),
+    ('hist_aqi_avg', 'aqi'),
+]
+
+SECTION_COLUMNS = [
+    [name for name, _, _ in WEATHER_FIELDS] + ['weather_condition'],
+    [name for name, _, _ in POLLUTION_FIELDS],
+    [name for name, _ in SATELLITE_FIELDS],
+    [name for name, _ in SURFACE_FIELDS],
+    [name for name, _, _ in LOCATION_FIELDS],
+    TIME_COLUMNS,
+    [name for name, _ in HISTORY_FIELDS],
+]
+
+# Bit of each section in Observation.present, in SECTION_COLUMNS order
+WEATHER, POLLUTION, SATELLITE, SURFACE, LOCATION, TIME, HISTORY = range(7)
+
+# Sections stored in Observation.values: (bit, fields, offset)
+VALUE_SECTIONS = []
+_offset = 0
+for _bit, _fields in ((WEATHER, WEATHER_FIELDS), (POLLUTION, POLLUTION_FIELDS),
+                      (SATELLITE, SATELLITE_FIELDS), (SURFACE, SURFACE_FIELDS),
+                      (LOCATION, LOCATION_FIELDS)):
+    VALUE_SECTIONS.append((_bit, _fields, _offset))
+    _offset += len(_fields)
+N_VALUES = _offset
+
+# Columns of Observation.values, in order
+VALUE_COLUMNS = [field[0] for _, fields, _ in VALUE_SECTIONS for field in fields]
+
+# Values of one hourly history entry, in HISTORY_FIELDS order
+_history_row = itemgetter(*(key for _, key in HISTORY_FIELDS))
+
+_HEADER = struct.Struct('<BqHH')
+_NO_TIMESTAMP = -2 ** 63
+_NAN = float('nan')
+
+
+def _timestamp_ns(value) -> int:
+    """Wall-clock time of a timestamp as nanoseconds since the epoch"""
+    if isinstance(value, datetime) and value.tzinfo is None:
+        return int(np.datetime64(value, 'ns').astype(np.int64))
+    timestamp = pd.Timestamp(value)
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.tz_localize(None)
+    return timestamp.value
+
+
+class Observation:
+    """
+    Compact form of one collected record, holding only what the models use.
+
+    The flat weather, pollution, satellite, surface and location fields live
+    in one float64 vector (NaN where a value was None, defaults applied
+    where a key was missing), the hourly history in an (hours, 5) float32
+    block and the sections the record had in the `present` bit mask. This
+    replaces the nested dicts, datetime objects and ~168 hourly dicts of a
+    collected record.
+    """
+
+    __slots__ = ('present', 'values', 'condition', 'timestamp', 'history')
+
+    def __init__(self, present: int, values: np.ndarray, condition: Optional[str] = None,
+                 timestamp: Optional[int] = None, history: Optional[np.ndarray] = None):
+        self.present = present
+        self.values = values
+        self.condition = condition
+        self.timestamp = timestamp
+        self.history = history
+
+    @classmethod
+    def from_record(cls, item: Dict) -> 'Observation':
+        """Convert a record as returned by the data collection clients"""
+        present = 0
+        values = np.full(N_VALUES, np.nan)
+        condition = None
+        timestamp = None
+        history = None
+
+        sections = (
+            (WEATHER, item['current_weather'] if 'current_weather' in item else None),
+            (POLLUTION, item['current_pollution'] if 'current_pollution' in item else None),
+            (SATELLITE, item['atmospheric']['satellite_data'] if item.get('atmospheric') else None),
+            (SURFACE, item['surface'] if item.get('surface') else None),
+            (LOCATION, item['location'] if 'location' in item else None),
+        )
+        for bit, source in sections:
+            if source is None:
+                continue
+            present |= 1 << bit
+            _, fields, offset = VALUE_SECTIONS[bit]
+            for j, field in enumerate(fields):
+                if len(field) > 2:
+                    value = source.get(field[1], field[2])
+                    values[offset + j] = _NAN if value is None else value
+                else:
+                    values[offset + j] = source.get(field[1], 0) or 0
+
+        if present >> WEATHER & 1:
+            condition = item['current_weather'].get('weather_condition', 'Clear')
+
+        if 'collected_at' in item:
+            present |= 1 << TIME
+            timestamp = _timestamp_ns(item['collected_at'])
+
+        hist = item.get('historical_pollution')
+        if hist and any(hist):
+            present |= 1 << HISTORY
+            try:
+                flat = list(chain.from_iterable(map(_history_row, hist)))
+            except KeyError:
+                flat = [entry.get(key) for entry in hist for _, key in HISTORY_FIELDS]
+            history = np.array(flat, dtype=np.float32).reshape(len(hist), len(HISTORY_FIELDS))
+
+        return cls(present, values, condition, timestamp, history)
+
+    def has(self, bit: int) -> bool:
+        return bool(self.present >> bit & 1)
+
+    @property
+    def collected_at(self) -> Optional[str]:
+        if self.timestamp is None:
+            return None
+        return pd.Timestamp(self.timestamp).isoformat()
+
+    @property
+    def location(self) -> Dict[str, float]:
+        _, _, offset = VALUE_SECTIONS[LOCATION]
+        return {'lat': float(self.values[offset]), 'lon': float(self.values[offset + 1])}
+
+    def to_bytes(self) -> bytes:
+        """Binary encoding used by the observation store"""
+        condition = b'' if self.condition is None else str(self.condition).encode()
+        hours = 0 if self.history is None else len(self.history)
+        header = _HEADER.pack(
+            self.present, _NO_TIMESTAMP if self.timestamp is None else self.timestamp,
+            0xFFFF if self.condition is None else len(condition), hours
+        )
+        history = b'' if self.history is None else self.history.astype('<f4').tobytes()
+        return header + condition + self.values.astype('<f8').tobytes() + history
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'Observation':
+        present, timestamp, condition_length, hours = _HEADER.unpack_from(data)
+        offset = _HEADER.size
+        condition = None
+        if condition_length != 0xFFFF:
+            condition = data[offset:offset + condition_length].decode()
+            offset += condition_length
+        values = np.frombuffer(data, dtype='<f8', count=N_VALUES, offset=offset).astype(np.float64)
+        offset += N_VALUES * 8
+        history = None
+        if present >> HISTORY & 1:
+            history = np.frombuffer(data, dtype='<f4', count=hours * len(HISTORY_FIELDS), offset=offset)
+            history = history.reshape(hours, len(HISTORY_FIELDS)).astype(np.float32)
+        return cls(present, values, condition, None if timestamp == _NO_TIMESTAMP else timestamp, history)
+
+    def __sizeof__(self) -> int:
+        size = object.__sizeof__(self) + self.values.nbytes
+        if self.history is not None:
+            size += self.history.nbytes
+        return size
+
+
+def as_observations(data: List[Union[Dict, Observation]]) -> List[Observation]:
+    """Observations for a list of records, converting the ones that are dicts"""
+    return [item if isinstance(item, Observation) else Observation.from_record(item) for item in data]
@@ -0,0 +1,96 @@
+import os
+import sys
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional
+
+# Add the src directory to the path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from ml_models.inference import CompiledInference
+
+
+class ModelVersion:
+    """
+    One complete, trained model set: models, scalers, feature layout and
+    weather encoding, with the compiled inference plan built from them.
+
+    A version is never changed after it is created. Callers that take a
+    reference to it keep predicting with a consistent set even when a
+    newer version is published in the meantime.
+    """
+
+    def __init__(self, version_id: str, feature_columns: List[str], models: Dict,
+                 scalers: Optional[Dict] = None, scaler=None, weather_classes: Optional[List[str]] = None,
+                 output_index: Optional[Dict[str, int]] = None, scaling: str = 'shared',
+                 target_columns: Optional[List[str]] = None, trained_through: Optional[str] = None,
+                 missing: str = 'zero'):
+        self.version_id = version_id
+        self.feature_columns = list(feature_columns)
+        self.scalers = dict(scalers or {})
+        self.scaler = scaler
+        self.weather_classes = weather_classes
+        self.output_index = dict(output_index or {})
+        self.scaling = scaling
+        self.missing = missing
+        # Observations collected up to this time went into the models
+        self.trained_through = trained_through
+        self.created_at = datetime.now().isoformat()
+
+        order = target_columns or list(models)
+        self.models = {t: models[t] for t in order if t in models}
+        self.inference = CompiledInference(
+            self.feature_columns, self.models,
+            {t: self.scalers.get(t, scaler) for t in self.models},
+            weather_classes, self.output_index, missing
+        )
+
+    def predict(self, data: Dict) -> Dict:
+        if not data:
+            return {}
+        return self.inference.predict_record(data)
+
+    def predict_batch(self, data: List[Dict]) -> List[Dict]:
+        if not data:
+            return []
+        return self.inference.predict_records(data)
+
+
+class ModelRegistry:
+    """
+    Published model versions and the one that is active.
+
+    publish() makes a fully built version active with a single reference
+    assignment, so a reader sees either the old or the new version, never a
+    mix. The `keep` most recent versions stay registered for activate().
+    """
+
+    def __init__(self, keep: int = 3):
+        self.keep = keep
+        self.active: Optional[ModelVersion] = None
+        self._versions: 'OrderedDict[str, ModelVersion]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def publish(self, version: ModelVersion) -> ModelVersion:
+        with self._lock:
+            self._versions.pop(version.version_id, None)
+            self._versions[version.version_id] = version
+            while len(self._versions) > self.keep:
+                self._versions.popitem(last=False)
+            self.active = version
+        return version
+
+    def activate(self, version_id: str) -> ModelVersion:
+        """Make a registered version active again (e.g. to roll back)"""
+        with self._lock:
+            if version_id not in self._versions:
+                raise KeyError(f"Unknown model version: {version_id}")
+            self.active = self._versions[version_id]
+        return self.active
+
+    def get(self, version_id: str) -> Optional[ModelVersion]:
+        return self._versions.get(version_id)
+
+    def versions(self) -> List[str]:
+        return list(self._versions)
@@ -0,0 +1,84 @@
+import math
+import numpy as np
+from sklearn.metrics import r2_score
+from sklearn.model_selection import train_test_split
+from typing import List, Optional, Tuple
+
+# How training rows are held out to select and score models
+HOLDOUT_MODES = ('time', 'random')
+
+
+def holdout_split(n: int, collected_at: Optional[np.ndarray] = None, test_size: float = 0.2,
+                  mode: str = 'time') -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Indices of the training rows and the holdout rows.
+
+    'time' holds out the most recently collected `test_size` of the rows, so
+    models are selected on data collected after everything they were fitted
+    on; the training indices are in collection order. Rows without a
+    timestamp count as the oldest, and without timestamps the last rows are
+    held out. 'random' is the shuffled split of train_test_split.
+    """
+    if mode == 'random':
+        return train_test_split(np.arange(n), test_size=test_size, random_state=42)
+    n_test = math.ceil(n * test_size)
+    if collected_at is None:
+        order = np.arange(n)
+    else:
+        order = np.argsort(np.nan_to_num(np.asarray(collected_at, dtype=float), nan=-np.inf), kind='stable')
+    return order[:n - n_test], order[n - n_test:]
+
+
+def fit_early_stopped(model, stages: str, X: np.ndarray, y: np.ndarray, validation_fraction: float = 0.1,
+                      step: int = 10, patience: int = 3):
+    """
+    Fit a boosting model `step` stages at a time, until the R² on the last
+    `validation_fraction` of the rows has not improved for `patience` steps.
+
+    `stages` is the parameter that sets the number of stages (e.g. max_iter);
+    its value on the model is the most that are fitted. The model keeps the
+    stages fitted while waiting for an improvement, as scikit-learn's own
+    early stopping does. Rows are expected in collection order, so the
+    model stops on the most recent data.
+    """
+    n_val = int(len(X) * validation_fraction)
+    if n_val < 10 or len(X) - n_val < 10:
+        return model.fit(X, y)
+    X_fit, y_fit, X_val, y_val = X[:-n_val], y[:-n_val], X[-n_val:], y[-n_val:]
+
+    max_stages = model.get_params()[stages]
+    best, waited = float('-inf'), 0
+    n_stages = min(step, max_stages)
+    model.set_params(warm_start=True, **{stages: n_stages})
+    while True:
+        model.fit(X_fit, y_fit)
+        score = r2_score(y_val, model.predict(X_val))
+        if score > best:
+            best, waited = score, 0
+        else:
+            waited += 1
+        if waited >= patience or n_stages >= max_stages:
+            break
+        n_stages = min(n_stages + step, max_stages)
+        model.set_params(**{stages: n_stages})
+    model.set_params(warm_start=False)
+    return model
+
+
+def halving_rounds(n_configs: int, n_rows: int, eta: int = 3, min_rows: int = 500) -> List[Tuple[int, int]]:
+    """
+    (configurations fitted, training rows) per round of successive halving.
+
+    Each round keeps the best 1/eta of the configurations of the round
+    before and fits them on eta times as many rows, so that the last round
+    fits a single configuration on all rows. Rounds use at least `min_rows`
+    rows (or all of them). With eta <= 1 there is one round of every
+    configuration on all rows.
+    """
+    if eta <= 1 or n_configs <= 1:
+        return [(n_configs, n_rows)]
+    counts = [n_configs]
+    while counts[-1] > 1:
+        counts.append(math.ceil(counts[-1] / eta))
+    last = len(counts) - 1
+    return [(count, min(n_rows, max(min_rows, n_rows // eta ** (last - i)))) for i, count in enumerate(counts)]